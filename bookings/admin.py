@@ -2,5 +2,14 @@ from django.contrib import admin
 from .models import Booking, Team
 
 
-admin.site.register(Booking)
+@admin.register(Booking)
+class BookingAdmin(admin.ModelAdmin):
+    def get_readonly_fields(self, request, obj=None):
+        # Seat counters follow cancellations and deletes only: moving a booking,
+        # or reactivating a cancelled one, would need its seats claimed again.
+        if obj is None:
+            return ()
+        return ('room', 'start_time', 'end_time') + (('status',) if obj.status == 'CANCELLED' else ())
+
+
 admin.site.register(Team)
@@ -0,0 +1,90 @@
+"""
+Archival of past and cancelled bookings.
+
+Bookings that ended, or were cancelled (created), before a horizon are moved
+from ``Booking`` to ``ArchivedBooking``, keeping their ids. Each batch is
+copied and deleted in its own short transaction, so a run over years of
+history never holds the table for longer than one batch.
+
+Moving a booking is not a booking change: no ``bookings_changed`` is sent,
+since availability and conflicts only concern bookings that have not ended,
+and the utilization rollups read both tables. Only the listing version is
+bumped, for the ETags of ``GET /bookings/``. The seats the moved active
+bookings held are taken off the ``RoomSlotOccupancy`` counters in the same
+transaction, and counter rows left empty are deleted, so that table stays
+as small as the bookings that have not been archived.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from roombooking.versioning import bump_on_commit
+from .intervals import buckets
+from .models import ArchivedBooking, Booking, RoomSlotOccupancy
+from .services import CLAIM_BATCH_SIZE
+
+BATCH_SIZE = 500
+FIELDS = [
+    'id', 'room_id', 'user_id', 'team_id', 'start_time', 'end_time', 'booking_type', 'status', 'series_id',
+    'created_at',
+]
+
+
+def horizon(days=None, now=None):
+    """Bookings older than this are archived: ``days`` (``BOOKING_ARCHIVE_AFTER_DAYS`` by default) before now."""
+    days = settings.BOOKING_ARCHIVE_AFTER_DAYS if days is None else days
+    return (now or timezone.now()) - timedelta(days=days)
+
+
+def archivable(before):
+    """Bookings that ended before ``before``, and cancelled bookings created before it."""
+    return Booking.objects.filter(Q(end_time__lt=before) | Q(status="CANCELLED", created_at__lt=before))
+
+
+def archive_batch(before, batch_size=BATCH_SIZE):
+    """
+    Move up to ``batch_size`` archivable bookings, lowest ids first, in one transaction.
+
+    Returns:
+        int: Bookings moved; 0 once nothing is left to archive.
+    """
+    with transaction.atomic():
+        rows = list(archivable(before).order_by('id').values(*FIELDS)[:batch_size])
+        if not rows:
+            return 0
+        ArchivedBooking.objects.bulk_create(ArchivedBooking(**row) for row in rows)
+        ids = [row['id'] for row in rows]
+        # A plain DELETE: QuerySet.delete() would load every row to send post_delete.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {connection.ops.quote_name(Booking._meta.db_table)} "
+                f"WHERE id IN ({', '.join(['%s'] * len(ids))})",
+                ids,
+            )
+        _release_counters(rows)
+        bump_on_commit('bookings')
+    return len(rows)
+
+
+def _release_counters(rows):
+    held = Counter(
+        (row['room_id'], bucket)
+        for row in rows if row['status'] == 'ACTIVE'
+        for bucket in buckets(row['start_time'], row['end_time'])
+    )
+    # One DELETE and one UPDATE per room and number of seats given back.
+    by_seats = defaultdict(lambda: defaultdict(list))
+    for (room_id, bucket), seats in held.items():
+        by_seats[seats][room_id].append(bucket)
+    for seats, rooms in by_seats.items():
+        for room_id, room_buckets in rooms.items():
+            for offset in range(0, len(room_buckets), CLAIM_BATCH_SIZE):
+                counters = RoomSlotOccupancy.objects.filter(
+                    room_id=room_id, start_time__in=room_buckets[offset:offset + CLAIM_BATCH_SIZE],
+                )
+                counters.filter(used__lte=seats).delete()
+                counters.update(used=F('used') - seats)
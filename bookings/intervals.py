@@ -0,0 +1,132 @@
+"""
+Booking intervals and overlap detection.
+
+A booking covers the half-open interval ``[start_time, end_time)``, so one
+ending at 10:30 does not overlap one starting at 10:30. Starts and lengths
+are multiples of ``GRANULARITY`` and lengths are at most ``MAX_DURATION``.
+That bound is what keeps overlap checks cheap: a booking overlapping
+``[start, end)`` must start after ``start - MAX_DURATION``, so both the
+range query (``overlapping``) and the in-memory ``IntervalSet`` only look at
+a bounded slice of the bookings, ordered by start.
+
+Seat counters (``RoomSlotOccupancy``) and the occupancy index keep one cell
+per ``GRANULARITY`` bucket; a booking takes a seat in every bucket it covers.
+"""
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Q
+from django.utils import timezone
+
+GRANULARITY = timedelta(minutes=15)
+DEFAULT_DURATION = timedelta(hours=1)
+MAX_DURATION = timedelta(hours=8)
+
+_EPOCH = datetime(2000, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def as_aware(moment):
+    """Aware datetime; naive values are read in the default time zone, as the ORM does."""
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+def is_aligned(moment):
+    return (as_aware(moment) - _EPOCH) % GRANULARITY == timedelta(0)
+
+
+def floor_bucket(moment):
+    moment = as_aware(moment)
+    return moment - (moment - _EPOCH) % GRANULARITY
+
+
+def buckets(start_time, end_time):
+    """Start of every ``GRANULARITY`` bucket that ``[start_time, end_time)`` touches."""
+    bucket, end_time = floor_bucket(start_time), as_aware(end_time)
+    found = []
+    while bucket < end_time:
+        found.append(bucket)
+        bucket += GRANULARITY
+    return found
+
+
+def overlapping(queryset, start_time, end_time):
+    """
+    Narrow a Booking queryset to the bookings overlapping ``[start_time, end_time)``.
+
+    ``start_time`` is bounded on both sides, so the ``(…, start_time)``
+    indexes answer it with a range scan instead of reading every earlier booking.
+    """
+    return queryset.filter(overlap_q(start_time, end_time))
+
+
+def overlapping_any(queryset, windows):
+    """``overlapping()`` for several ``(start_time, end_time)`` windows at once, one range per merged window."""
+    merged = []
+    for start_time, end_time in sorted((as_aware(s), as_aware(e)) for s, e in windows):
+        if merged and start_time - MAX_DURATION <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end_time)
+        else:
+            merged.append([start_time, end_time])
+    condition = Q(pk__in=[])
+    for start_time, end_time in merged:
+        condition |= overlap_q(start_time, end_time)
+    return queryset.filter(condition)
+
+
+def overlap_q(start_time, end_time, prefix=""):
+    """The ``overlapping()`` condition, on the booking fields under ``prefix`` (e.g. ``"booking__"`` from Room)."""
+    return Q(**{
+        f"{prefix}start_time__lt": end_time,
+        f"{prefix}start_time__gt": start_time - MAX_DURATION,
+        f"{prefix}end_time__gt": start_time,
+    })
+
+
+class IntervalSet:
+    """
+    Intervals sorted by start, answering overlap and concurrency questions in O(log n + k).
+
+    ``k`` is the number of intervals starting within ``MAX_DURATION`` before
+    the probe's end, which stays small however many the set holds (for one
+    room, at most one working day of bookings).
+    """
+
+    def __init__(self, intervals=()):
+        pairs = sorted((as_aware(start), as_aware(end)) for start, end in intervals)
+        self._starts = [start for start, _ in pairs]
+        self._ends = [end for _, end in pairs]
+
+    def __len__(self):
+        return len(self._starts)
+
+    def add(self, start_time, end_time):
+        start_time = as_aware(start_time)
+        position = bisect_right(self._starts, start_time)
+        self._starts.insert(position, start_time)
+        self._ends.insert(position, as_aware(end_time))
+
+    def overlapping(self, start_time, end_time):
+        """``(start, end)`` of every interval overlapping ``[start_time, end_time)``."""
+        start_time, end_time = as_aware(start_time), as_aware(end_time)
+        first = bisect_right(self._starts, start_time - MAX_DURATION)
+        last = bisect_left(self._starts, end_time)
+        return [
+            (self._starts[i], self._ends[i])
+            for i in range(first, last)
+            if self._ends[i] > start_time
+        ]
+
+    def max_overlap(self, start_time, end_time):
+        """Most intervals covering any one instant of ``[start_time, end_time)``."""
+        start_time, end_time = as_aware(start_time), as_aware(end_time)
+        events = []
+        for start, end in self.overlapping(start_time, end_time):
+            events.append((max(start, start_time), 1))
+            events.append((min(end, end_time), -1))
+        # Ends sort before starts at the same instant: the intervals are half-open.
+        events.sort()
+        current = peak = 0
+        for _, change in events:
+            current += change
+            peak = max(peak, current)
+        return peak
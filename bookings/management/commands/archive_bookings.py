@@ -0,0 +1,45 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from bookings.archive import BATCH_SIZE, archivable, archive_batch, horizon
+
+
+class Command(BaseCommand):
+    help = (
+        'Move bookings that ended, and cancelled bookings created, more than --days ago from the bookings '
+        'table to the archive, one short transaction per batch.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.BOOKING_ARCHIVE_AFTER_DAYS,
+            help=f'Archive horizon in days (default: BOOKING_ARCHIVE_AFTER_DAYS, {settings.BOOKING_ARCHIVE_AFTER_DAYS}).',
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help=f'Rows per transaction (default: {BATCH_SIZE}).')
+        parser.add_argument('--pause', type=float, default=0, help='Seconds to sleep between batches (default: 0).')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the bookings that would be moved.')
+
+    def handle(self, *args, **options):
+        before = horizon(options['days'])
+        if options['dry_run']:
+            self.stdout.write(f'{archivable(before).count()} bookings would be archived (before {before.isoformat()}).')
+            return
+
+        started = time.perf_counter()
+        moved = 0
+        while True:
+            batch = archive_batch(before, max(1, options['batch_size']))
+            if not batch:
+                break
+            moved += batch
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'Moved {moved} bookings ({moved / elapsed if elapsed else 0:.0f} rows/s)')
+            if options['pause']:
+                time.sleep(options['pause'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {moved} bookings older than {before.isoformat()} in {elapsed:.1f}s '
+            f'({moved / elapsed if elapsed else 0:.0f} rows/s).'
+        ))
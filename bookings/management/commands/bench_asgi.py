@@ -0,0 +1,117 @@
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User as AuthUser
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the WSGI (gunicorn, sync views) and ASGI (uvicorn, async views) deployments on the read '
+        'endpoints. Starts each server in turn against the configured database and replays the same '
+        'read-only traffic at --clients concurrent clients through replay_requests.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=5000, help='Requests per server (default: 5000).')
+        parser.add_argument('--clients', type=int, default=200, help='Concurrent clients (default: 200).')
+        parser.add_argument('--client-processes', type=int, default=4,
+                            help='Processes the clients are spread over (default: 4).')
+        parser.add_argument('--workers', type=int, default=4, help='Server worker processes (default: 4).')
+        parser.add_argument('--wsgi-threads', type=int, default=8, help='Threads per gunicorn worker (default: 8).')
+        parser.add_argument('--port', type=int, default=8765, help='Port the servers listen on (default: 8765).')
+        parser.add_argument('--output', help='Write both replay reports to this JSON file.')
+
+    def handle(self, *args, **options):
+        admin, _ = AuthUser.objects.get_or_create(username='admin')
+        token, _ = Token.objects.get_or_create(user=admin)
+        url = f'http://127.0.0.1:{options["port"]}'
+        workers = str(options['workers'])
+        servers = {
+            'wsgi': (
+                ['gunicorn', 'roombooking.wsgi', '--workers', workers, '--threads', str(options['wsgi_threads']),
+                 '--bind', f'127.0.0.1:{options["port"]}', '--log-level', 'warning'],
+                {},
+            ),
+            'asgi': (
+                ['uvicorn', 'roombooking.asgi:application', '--workers', workers,
+                 '--host', '127.0.0.1', '--port', str(options['port']), '--log-level', 'warning', '--no-access-log'],
+                {'ASYNC_VIEWS_ENABLED': '1'},
+            ),
+        }
+
+        reports = {}
+        with tempfile.TemporaryDirectory() as tmp:
+            requests_file = Path(tmp) / 'reads.jsonl'
+            self.write_reads(requests_file, options['requests'])
+            for name, (command, env) in servers.items():
+                self.stderr.write(f'Benchmarking {name}: {" ".join(command)}')
+                with _Server(command, env, options['port']):
+                    report_file = Path(tmp) / f'{name}.json'
+                    call_command(
+                        'replay_requests', file=str(requests_file), url=url, token=token.key,
+                        threads=max(1, options['clients'] // options['client_processes']),
+                        processes=options['client_processes'], output=str(report_file), stdout=io.StringIO(),
+                    )
+                    reports[name] = json.loads(report_file.read_text())
+
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(reports, fh, indent=2, sort_keys=True)
+                fh.write('\n')
+
+        self.stdout.write(f'{"server":<8}{"rps":>10}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"errors":>8}')
+        for name, report in reports.items():
+            total = report['total']
+            latency = total['latency_ms']
+            self.stdout.write(
+                f'{name:<8}{total["throughput_rps"]:>10.1f}{latency["p50"]:>10.1f}'
+                f'{latency["p95"]:>10.1f}{latency["p99"]:>10.1f}{total["errors"]:>8}'
+            )
+
+    def write_reads(self, path, count):
+        """The replay_requests traffic mix without its writes, so both servers see the same data."""
+        call_command('replay_requests', file=str(path), generate=count * 2, stdout=io.StringIO())
+        lines = [line for line in path.read_text().splitlines() if json.loads(line)['method'] == 'GET']
+        path.write_text('\n'.join(lines[:count]) + '\n')
+
+
+class _Server:
+    """Context manager running a server subprocess from the project directory until the port answers."""
+
+    def __init__(self, command, env, port):
+        self.command = [sys.executable, '-m', *command]
+        self.env = {**os.environ, **env}
+        self.port = port
+
+    def __enter__(self):
+        self.process = subprocess.Popen(self.command, cwd=settings.BASE_DIR, env=self.env)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise CommandError(f'{self.command[2]} exited with status {self.process.returncode}.')
+            try:
+                socket.create_connection(('127.0.0.1', self.port), timeout=1).close()
+                return self
+            except OSError:
+                time.sleep(0.2)
+        self.__exit__(None, None, None)
+        raise CommandError(f'{self.command[2]} did not start listening on port {self.port}.')
+
+    def __exit__(self, *exc_info):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
@@ -0,0 +1,82 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User as AuthUser
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from bookings.models import Booking
+from bookings.views import BookingsView
+from roombooking.utils import KeysetPagination
+from roombooking.versioning import bump_on_commit
+from rooms.models import Room
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Compare deep-page latency of page-number and cursor pagination on GET /api/v1/bookings/.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page', type=int, default=100_000, help='Page to fetch (default: 100000).')
+        parser.add_argument('--page-size', type=int, default=10, help='Rows per page (default: 10).')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed requests per paginator (default: 5).')
+        parser.add_argument('--keep', action='store_true', help='Keep the synthetic bookings instead of rolling back.')
+
+    def handle(self, *args, **options):
+        page, page_size = options['page'], options['page_size']
+        with transaction.atomic():
+            self.seed(page * page_size)
+            view = BookingsView.as_view()
+            offset_ms = self.time_requests(view, {'page': page, 'page_size': page_size}, options['repeat'])
+
+            last_row = (
+                Booking.objects.order_by(*BookingsView.ordering)
+                .values('created_at', 'id')[(page - 1) * page_size - 1]
+            )
+            cursor = KeysetPagination.encode_cursor([last_row['created_at'], last_row['id']])
+            cursor_ms = self.time_requests(view, {'cursor': cursor, 'page_size': page_size}, options['repeat'])
+
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+        self.stdout.write(f'page {page} x {page_size} rows over {page * page_size} bookings')
+        self.stdout.write(f'  page-number: median {statistics.median(offset_ms):.2f} ms, min {min(offset_ms):.2f} ms')
+        self.stdout.write(f'  cursor:      median {statistics.median(cursor_ms):.2f} ms, min {min(cursor_ms):.2f} ms')
+        self.stdout.write(self.style.SUCCESS(
+            f'cursor is {statistics.median(offset_ms) / statistics.median(cursor_ms):.1f}x faster at this depth'
+        ))
+
+    def seed(self, rows, batch_size=10_000):
+        missing = rows - Booking.objects.count()
+        if missing <= 0:
+            return
+        self.stdout.write(f'Seeding {missing} synthetic bookings...')
+        room, _ = Room.objects.get_or_create(room_number='BENCH', defaults={'room_type': 'SHARED', 'capacity': 1})
+        user, _ = User.objects.get_or_create(name='bench', defaults={'age': 30})
+        start = timezone.now() - timedelta(days=365)
+        for offset in range(0, missing, batch_size):
+            Booking.objects.bulk_create(
+                Booking(
+                    room=room, user=user, booking_type='INDIVIDUAL', status='CANCELLED',
+                    start_time=start + timedelta(hours=i), end_time=start + timedelta(hours=i + 1),
+                )
+                for i in range(offset, min(offset + batch_size, missing))
+            )
+        bump_on_commit('bookings')
+
+    def time_requests(self, view, params, repeat):
+        factory = APIRequestFactory()
+        timings = []
+        for _ in range(repeat):
+            request = factory.get('/api/v1/bookings/', params)
+            force_authenticate(request, user=AuthUser(username='admin'))
+            started = time.perf_counter()
+            response = view(request)
+            response.render()
+            timings.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                raise RuntimeError(f'{params}: HTTP {response.status_code}')
+        return timings
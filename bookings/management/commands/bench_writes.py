@@ -0,0 +1,94 @@
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure booking write throughput under contention on one or more databases. For each '
+        '--database-url the schema is migrated, rooms are seeded, and concurrent POST /api/v1/bookings/ '
+        'requests are replayed in-process with replay_requests. Use scratch databases: the bookings are kept.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database-url', action='append', dest='database_urls', metavar='URL',
+                            help='Database to benchmark; repeat to compare (default: the configured one).')
+        parser.add_argument('--requests', type=int, default=2000, help='Booking requests (default: 2000).')
+        parser.add_argument('--threads', type=int, default=16, help='Concurrent writer threads (default: 16).')
+        parser.add_argument('--processes', type=int, default=1, help='Writer processes (default: 1).')
+        parser.add_argument('--output', help='Write the replay reports to this JSON file.')
+
+    def handle(self, *args, **options):
+        targets = options['database_urls'] or [os.environ.get('DATABASE_URL', '')]
+        reports = {}
+        with tempfile.TemporaryDirectory() as tmp:
+            requests_file = Path(tmp) / 'writes.jsonl'
+            self.write_bookings(requests_file, options['requests'])
+            for url in targets:
+                label = self.label(url)
+                self.stderr.write(f'Benchmarking {label}')
+                env = {**os.environ, 'DATABASE_URL': url}
+                report_file = Path(tmp) / 'report.json'
+                self.manage(env, 'migrate', '--noinput')
+                self.manage(env, 'seed_rooms')
+                self.manage(
+                    env, 'replay_requests', '--file', str(requests_file), '--threads', str(options['threads']),
+                    '--processes', str(options['processes']), '--output', str(report_file),
+                )
+                reports[label] = json.loads(report_file.read_text())
+
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(reports, fh, indent=2, sort_keys=True)
+                fh.write('\n')
+
+        self.stdout.write(f'{"database":<40}{"rps":>10}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}'
+                          f'{"201":>7}{"400":>7}{"5xx":>7}')
+        for label, report in reports.items():
+            total = report['total']
+            latency = total['latency_ms']
+            statuses = total['statuses']
+            self.stdout.write(
+                f'{label:<40}{total["throughput_rps"]:>10.1f}{latency["p50"]:>10.1f}{latency["p95"]:>10.1f}'
+                f'{latency["p99"]:>10.1f}{statuses.get("201", 0):>7}{statuses.get("400", 0):>7}{total["errors"]:>7}'
+            )
+
+    def write_bookings(self, path, count):
+        """Individual bookings by distinct users, spread over the next 30 days' slots."""
+        rng = random.Random(0)
+        run = uuid.uuid4().hex[:8]
+        tomorrow = (datetime.now() + timedelta(days=1)).date()
+        with open(path, 'w') as fh:
+            for i in range(count):
+                day = tomorrow + timedelta(days=rng.randrange(30))
+                entry = {'method': 'POST', 'path': '/api/v1/bookings/',
+                         'body': {'user': {'name': f'bench-{run}-{i}', 'age': 30},
+                                  'room_type': rng.choice(['PRIVATE', 'SHARED']),
+                                  'slot': f'{day.isoformat()}T{rng.randrange(9, 18):02d}:00'}}
+                fh.write(json.dumps(entry) + '\n')
+
+    def manage(self, env, *args):
+        result = subprocess.run(
+            [sys.executable, 'manage.py', *args], cwd=settings.BASE_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+        )
+        if result.returncode:
+            raise CommandError(f'manage.py {args[0]} failed:\n{result.stderr}')
+
+    @staticmethod
+    def label(url):
+        if not url:
+            return str(settings.DATABASES['default']['NAME'])
+        parts = urlsplit(url)
+        # Drop credentials from the printed URL.
+        return f'{parts.scheme}://{parts.hostname or ""}{parts.path}'
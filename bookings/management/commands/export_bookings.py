@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bookings.export import CHUNK_SIZE, LINE_WRITERS, export_rows, parse_filters
+
+
+class Command(BaseCommand):
+    help = 'Stream bookings to a CSV or NDJSON file (or stdout) with constant memory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(LINE_WRITERS), default='csv', dest='export_format')
+        parser.add_argument('--status', help='active or cancelled (default: both).')
+        parser.add_argument('--start', help='Earliest start_time, YYYY-MM-DD or ISO 8601 datetime.')
+        parser.add_argument('--end', help='Latest start_time; a date includes the whole day.')
+        parser.add_argument('--archived', action='store_true', help='Also export archived bookings.')
+        parser.add_argument('--output', help='File to write (default: stdout).')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help=f'Rows per fetch (default: {CHUNK_SIZE}).')
+
+    def handle(self, *args, **options):
+        filters, error = parse_filters(options['status'], options['start'], options['end'])
+        if error:
+            raise CommandError(error)
+
+        lines = LINE_WRITERS[options['export_format']](export_rows(filters, options['chunk_size'], options['archived']))
+        started = time.perf_counter()
+        written = 0
+        if options['output']:
+            with open(options['output'], 'w', newline='') as fh:
+                for line in lines:
+                    fh.write(line)
+                    written += 1
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
+                written += 1
+
+        rows = written - 1 if options['export_format'] == 'csv' else written
+        elapsed = time.perf_counter() - started
+        self.stderr.write(f'Exported {rows} bookings in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:.0f} rows/s).')
@@ -0,0 +1,26 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from bookings.series import materialize_due
+
+
+class Command(BaseCommand):
+    help = (
+        'Create the bookings of recurring series starting within the next '
+        'BOOKING_SERIES_WINDOW_DAYS days. Run it daily (e.g. from cron).'
+    )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        totals = materialize_due()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Materialized {totals['bookings']} bookings for {totals['series']} series "
+            f"({settings.BOOKING_SERIES_WINDOW_DAYS}-day window) in {elapsed:.2f}s"
+        ))
+        if totals['skipped']:
+            self.stdout.write(self.style.WARNING(
+                f"Skipped {totals['skipped']} occurrences that would double-book their user; their seats were freed."
+            ))
@@ -0,0 +1,287 @@
+import json
+import multiprocessing
+import random
+import subprocess
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth.models import User as AuthUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import Resolver404, resolve
+from rest_framework.test import APIClient
+
+ENDPOINTS = {
+    'bookings': 'bookings',
+    'booking-cancel': 'bookings/cancel',
+    'booked-rooms': 'rooms',
+    'room-availability': 'rooms/available',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay a JSONL file of API requests against the Django test client or a running server and '
+        'report latency percentiles, throughput and DB query counts per endpoint.\n\n'
+        'Each line is {"method": "GET", "path": "/api/v1/rooms/available", "params": {...}, "body": {...}}. '
+        '"{last_booking_id}" in a path is replaced by the id of the last booking created by the same '
+        'worker. Lines without a "path" are skipped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=str(settings.BASE_DIR / 'replay.jsonl'), help='JSONL file to replay (default: replay.jsonl).')
+        parser.add_argument('--generate', type=int, metavar='N', help='Write N synthetic requests to --file and exit.')
+        parser.add_argument('--url', help='Base URL of a running server (e.g. http://127.0.0.1:8000); '
+                                          'default replays in-process through the Django test client.')
+        parser.add_argument('--token', help='API token for --url mode.')
+        parser.add_argument('--username', default='admin', help='User to authenticate as in-process (default: admin).')
+        parser.add_argument('--threads', type=int, default=4, help='Concurrent threads per process (default: 4).')
+        parser.add_argument('--processes', type=int, default=1, help='Worker processes (default: 1).')
+        parser.add_argument('--repeat', type=int, default=1, help='Replay the file this many times (default: 1).')
+        parser.add_argument('--output', help='Write the JSON report to this file.')
+
+    def handle(self, *args, **options):
+        if options['generate']:
+            self.generate(options['file'], options['generate'])
+            return
+
+        requests, skipped = self.load(options['file'])
+        if not requests:
+            raise CommandError(f'No replayable requests in {options["file"]} ({skipped} lines skipped).')
+        requests = requests * options['repeat']
+        output = options['output']
+
+        options = {key: options[key] for key in ('url', 'token', 'username', 'threads', 'processes')}
+        processes = max(1, options['processes'])
+        shards = [requests[i::processes] for i in range(processes)]
+        started = time.perf_counter()
+        if processes == 1:
+            samples = replay_shard(shards[0], options)
+        else:
+            # Children must not inherit open connections.
+            connections.close_all()
+            with multiprocessing.get_context('fork').Pool(processes) as pool:
+                samples = [sample for shard in pool.starmap(replay_shard, [(shard, options) for shard in shards])
+                           for sample in shard]
+        elapsed = time.perf_counter() - started
+
+        report = build_report(samples, elapsed, skipped, options)
+        text = json.dumps(report, indent=2, sort_keys=True)
+        if output:
+            with open(output, 'w') as fh:
+                fh.write(text + '\n')
+        self.stdout.write(text)
+
+    def load(self, path):
+        requests, skipped = [], 0
+        with open(path) as fh:
+            for line in fh:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    skipped += 1
+                    continue
+                if not isinstance(entry, dict) or not isinstance(entry.get('path'), str):
+                    skipped += 1
+                    continue
+                entry.setdefault('method', 'GET')
+                requests.append(entry)
+        return requests, skipped
+
+    def generate(self, path, count):
+        """Write a traffic mix shaped like production: mostly availability polling, some bookings."""
+        rng = random.Random(0)
+        tomorrow = (datetime.now() + timedelta(days=1)).date()
+
+        def slot():
+            day = tomorrow + timedelta(days=rng.randrange(30))
+            return f'{day.isoformat()}T{rng.randrange(9, 18):02d}:00'
+
+        with open(path, 'w') as fh:
+            for i in range(count):
+                roll = rng.random()
+                if roll < 0.40:
+                    entry = {'method': 'GET', 'path': '/api/v1/rooms/available',
+                             'params': {'room_type': rng.choice(['PRIVATE', 'CONFERENCE', 'SHARED']), 'slot': slot()}}
+                elif roll < 0.55:
+                    entry = {'method': 'GET', 'path': '/api/v1/rooms/'}
+                elif roll < 0.75:
+                    entry = {'method': 'GET', 'path': '/api/v1/bookings/', 'params': {'page': rng.randint(1, 2)}}
+                elif roll < 0.95:
+                    entry = {'method': 'POST', 'path': '/api/v1/bookings/',
+                             'body': {'user': {'name': f'load-user-{i}', 'age': 30},
+                                      'room_type': rng.choice(['PRIVATE', 'SHARED']), 'slot': slot()}}
+                else:
+                    entry = {'method': 'POST', 'path': '/api/v1/bookings/cancel/{last_booking_id}'}
+                fh.write(json.dumps(entry) + '\n')
+        self.stdout.write(self.style.SUCCESS(f'Wrote {count} requests to {path}.'))
+
+
+def replay_shard(requests, options):
+    """Replay ``requests`` on a thread pool; returns one sample dict per request."""
+    threads = max(1, options['threads'])
+    chunks = [requests[i::threads] for i in range(threads)]
+    with ThreadPoolExecutor(threads) as pool:
+        return [sample for chunk in pool.map(lambda chunk: replay_chunk(chunk, options), chunks) for sample in chunk]
+
+
+def replay_chunk(requests, options):
+    send = HttpSender(options) if options['url'] else ClientSender(options)
+    samples = []
+    last_booking_id = None
+    try:
+        for entry in requests:
+            path = entry['path']
+            if '{last_booking_id}' in path:
+                if last_booking_id is None:
+                    continue
+                path = path.replace('{last_booking_id}', str(last_booking_id))
+            sample = send(entry['method'].upper(), path, entry.get('params'), entry.get('body'))
+            sample['endpoint'] = endpoint_name(entry['method'].upper(), entry['path'])
+            created_id = sample.pop('created_id', None)
+            if created_id is not None:
+                last_booking_id = created_id
+            samples.append(sample)
+    finally:
+        connections.close_all()
+    return samples
+
+
+class ClientSender:
+    """In-process requests through the Django test client, with DB query counts."""
+
+    def __init__(self, options):
+        # Server errors are measured like any other response instead of aborting the run.
+        self.client = APIClient(raise_request_exception=False)
+        self.client.force_authenticate(AuthUser(username=options['username']))
+
+    def __call__(self, method, path, params, body):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            if method == 'GET':
+                response = self.client.get(path, params or {})
+            else:
+                response = self.client.generic(method, self.with_query(path, params), json.dumps(body or {}),
+                                               content_type='application/json')
+            latency = time.perf_counter() - started
+        sample = {'status': response.status_code, 'latency': latency, 'queries': len(queries)}
+        data = getattr(response, 'data', None)
+        if isinstance(data, dict) and 'booking_id' in data:
+            sample['created_id'] = data['booking_id']
+        return sample
+
+    @staticmethod
+    def with_query(path, params):
+        return f'{path}?{urlencode(params)}' if params else path
+
+
+class HttpSender:
+    """Requests against a running server; query counts are not observable from outside."""
+
+    def __init__(self, options):
+        self.base_url = options['url'].rstrip('/')
+        self.headers = {'Content-Type': 'application/json'}
+        if options['token']:
+            self.headers['Authorization'] = f'Token {options["token"]}'
+
+    def __call__(self, method, path, params, body):
+        url = self.base_url + ClientSender.with_query(path, params)
+        data = json.dumps(body).encode() if body is not None else (b'' if method != 'GET' else None)
+        request = urllib.request.Request(url, data=data, method=method, headers=self.headers)
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                status, payload = response.status, response.read()
+        except urllib.error.HTTPError as error:
+            status, payload = error.code, error.read()
+        except OSError:
+            status, payload = None, b''
+        latency = time.perf_counter() - started
+        sample = {'status': status, 'latency': latency, 'queries': None}
+        if status == 201:
+            try:
+                sample['created_id'] = json.loads(payload)['booking_id']
+            except (ValueError, KeyError, TypeError):
+                pass
+        return sample
+
+
+def endpoint_name(method, path):
+    try:
+        name = ENDPOINTS.get(resolve(path.split('?')[0].replace('{last_booking_id}', '0')).url_name)
+    except Resolver404:
+        name = None
+    return f'{method} {name or path}'
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return None
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(samples, elapsed):
+    latencies = sorted(sample['latency'] * 1000 for sample in samples)
+    queries = [sample['queries'] for sample in samples if sample['queries'] is not None]
+    statuses = defaultdict(int)
+    for sample in samples:
+        statuses[str(sample['status'])] += 1
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for sample in samples if sample['status'] is None or sample['status'] >= 500),
+        'statuses': dict(statuses),
+        'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else None,
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies), 3),
+            'p50': round(percentile(latencies, 0.50), 3),
+            'p95': round(percentile(latencies, 0.95), 3),
+            'p99': round(percentile(latencies, 0.99), 3),
+            'max': round(latencies[-1], 3),
+        },
+        'queries': {
+            'mean': round(sum(queries) / len(queries), 2),
+            'max': max(queries),
+        } if queries else None,
+    }
+
+
+def build_report(samples, elapsed, skipped, options):
+    by_endpoint = defaultdict(list)
+    for sample in samples:
+        by_endpoint[sample['endpoint']].append(sample)
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'mode': 'http' if options['url'] else 'in-process',
+            'target': options['url'] or settings.DATABASES['default']['ENGINE'],
+            'threads': options['threads'],
+            'processes': options['processes'],
+            'skipped_lines': skipped,
+            'wall_time_s': round(elapsed, 3),
+        },
+        'total': summarize(samples, elapsed),
+        # Per-endpoint throughput is that endpoint's share of the whole run.
+        'endpoints': {name: summarize(group, elapsed) for name, group in by_endpoint.items()},
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
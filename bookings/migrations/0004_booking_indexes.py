@@ -0,0 +1,35 @@
+# Generated by Django 5.0.2 on 2026-10-17 11:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0003_alter_booking_status'),
+        ('rooms', '0002_room_type_index'),
+        ('users', '0006_alter_user_role'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status', 'ACTIVE')), fields=['room', 'start_time'], name='booking_active_room_slot_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status', 'ACTIVE')), fields=['user', 'start_time'], name='booking_active_user_slot_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status', 'ACTIVE')), fields=['start_time', 'end_time'], name='booking_active_range_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['-created_at'], name='booking_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status', 'CANCELLED')), fields=['-created_at'], name='booking_cancelled_created_idx'),
+        ),
+    ]
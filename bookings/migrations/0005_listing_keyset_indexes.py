@@ -0,0 +1,31 @@
+# Generated by Django 5.0.2 on 2026-10-17 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0004_booking_indexes'),
+        ('rooms', '0002_room_type_index'),
+        ('users', '0006_alter_user_role'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='booking_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='booking_cancelled_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['-created_at', '-id'], name='booking_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status', 'CANCELLED')), fields=['-created_at', '-id'], name='booking_cancelled_created_idx'),
+        ),
+    ]
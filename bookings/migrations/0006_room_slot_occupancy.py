@@ -0,0 +1,44 @@
+# Generated by Django 5.0.2 on 2026-10-17 12:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_occupancy(apps, schema_editor):
+    Booking = apps.get_model('bookings', 'Booking')
+    RoomSlotOccupancy = apps.get_model('bookings', 'RoomSlotOccupancy')
+    slots = (
+        Booking.objects.filter(status='ACTIVE')
+        .values('room_id', 'start_time')
+        .annotate(used=models.Count('id'))
+        .order_by()
+    )
+    RoomSlotOccupancy.objects.bulk_create(
+        (RoomSlotOccupancy(room_id=slot['room_id'], start_time=slot['start_time'], used=slot['used']) for slot in slots),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0005_listing_keyset_indexes'),
+        ('rooms', '0002_room_type_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomSlotOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_time', models.DateTimeField()),
+                ('used', models.PositiveIntegerField(default=0)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='rooms.room')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='roomslotoccupancy',
+            constraint=models.UniqueConstraint(fields=('room', 'start_time'), name='room_slot_occupancy_unique'),
+        ),
+        migrations.RunPython(backfill_occupancy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta, timezone
+
+from django.db import migrations
+
+BUCKET = timedelta(minutes=15)
+EPOCH = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+
+def cancel_user_overlaps(apps, schema_editor):
+    """
+    Cancel the active bookings that overlap an earlier active booking of the same user.
+
+    Nothing enforced that before, and booking_user_no_overlap below cannot be
+    added while such rows exist. The booking starting first (then the oldest)
+    is kept; the cancelled ids are reported.
+    """
+    Booking = apps.get_model('bookings', 'Booking')
+    cancelled = []
+    user_id, kept_until = None, None
+    for pk, user, start_time, end_time in (
+        Booking.objects.filter(status='ACTIVE', user__isnull=False)
+        .order_by('user_id', 'start_time', 'id').values_list('pk', 'user_id', 'start_time', 'end_time').iterator()
+    ):
+        if user == user_id and start_time < kept_until:
+            cancelled.append(pk)
+            continue
+        if user != user_id:
+            user_id, kept_until = user, end_time
+        else:
+            kept_until = max(kept_until, end_time)
+    for offset in range(0, len(cancelled), 1000):
+        Booking.objects.filter(pk__in=cancelled[offset:offset + 1000]).update(status='CANCELLED')
+    if cancelled:
+        print(f"\n  Cancelled {len(cancelled)} bookings overlapping another booking of their user: {cancelled}")
+
+
+def bucket_occupancy(apps, schema_editor):
+    """Seat counters move from one row per hourly slot to one row per 15-minute bucket."""
+    Booking = apps.get_model('bookings', 'Booking')
+    RoomSlotOccupancy = apps.get_model('bookings', 'RoomSlotOccupancy')
+    used = {}
+    for room_id, start_time, end_time in (
+        Booking.objects.filter(status='ACTIVE').values_list('room_id', 'start_time', 'end_time').iterator()
+    ):
+        bucket = start_time - (start_time - EPOCH) % BUCKET
+        while bucket < end_time:
+            used[room_id, bucket] = used.get((room_id, bucket), 0) + 1
+            bucket += BUCKET
+    RoomSlotOccupancy.objects.all().delete()
+    RoomSlotOccupancy.objects.bulk_create(
+        (RoomSlotOccupancy(room_id=room_id, start_time=bucket, used=count) for (room_id, bucket), count in used.items()),
+        batch_size=1000,
+    )
+
+
+def hourly_occupancy(apps, schema_editor):
+    Booking = apps.get_model('bookings', 'Booking')
+    RoomSlotOccupancy = apps.get_model('bookings', 'RoomSlotOccupancy')
+    used = {}
+    for room_id, start_time in Booking.objects.filter(status='ACTIVE').values_list('room_id', 'start_time').iterator():
+        used[room_id, start_time] = used.get((room_id, start_time), 0) + 1
+    RoomSlotOccupancy.objects.all().delete()
+    RoomSlotOccupancy.objects.bulk_create(
+        (RoomSlotOccupancy(room_id=room_id, start_time=slot, used=count) for (room_id, slot), count in used.items()),
+        batch_size=1000,
+    )
+
+
+def add_user_exclusion(apps, schema_editor):
+    # Only PostgreSQL can enforce non-overlapping ranges; elsewhere the
+    # overlap checks in the booking services are the only guard.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    schema_editor.execute(
+        'ALTER TABLE bookings_booking ADD CONSTRAINT booking_user_no_overlap '
+        "EXCLUDE USING gist (user_id WITH =, tstzrange(start_time, end_time, '[)') WITH &&) "
+        "WHERE (status = 'ACTIVE' AND user_id IS NOT NULL)"
+    )
+
+
+def drop_user_exclusion(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('ALTER TABLE bookings_booking DROP CONSTRAINT IF EXISTS booking_user_no_overlap')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0006_room_slot_occupancy'),
+    ]
+
+    operations = [
+        migrations.RunPython(cancel_user_overlaps, migrations.RunPython.noop),
+        migrations.RunPython(bucket_occupancy, hourly_occupancy),
+        migrations.RunPython(add_user_exclusion, drop_user_exclusion),
+    ]
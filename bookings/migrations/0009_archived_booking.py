@@ -0,0 +1,35 @@
+# Generated by Django 5.0.2 on 2026-10-17 13:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0008_booking_series'),
+        ('rooms', '0003_utilization_rollups'),
+        ('users', '0006_alter_user_role'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedBooking',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('start_time', models.DateTimeField()),
+                ('end_time', models.DateTimeField()),
+                ('booking_type', models.CharField(choices=[('INDIVIDUAL', 'Individual'), ('TEAM', 'Team')], max_length=10)),
+                ('status', models.CharField(choices=[('ACTIVE', 'Active'), ('CANCELLED', 'Cancelled')], max_length=10)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='rooms.room')),
+                ('series', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_occurrences', to='bookings.bookingseries')),
+                ('team', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='bookings.team')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='users.user')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-created_at', '-id'], name='archived_created_idx'), models.Index(condition=models.Q(('status', 'CANCELLED')), fields=['-created_at', '-id'], name='archived_cancelled_created_idx'), models.Index(condition=models.Q(('status', 'ACTIVE')), fields=['room', 'start_time'], name='archived_active_room_slot_idx')],
+            },
+        ),
+    ]
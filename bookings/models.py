@@ -26,7 +26,147 @@ class Booking(models.Model):
     end_time = models.DateTimeField()
     booking_type = models.CharField(max_length=10, choices=BOOKING_TYPE_CHOICES)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="ACTIVE")
+    series = models.ForeignKey(
+        "BookingSeries", null=True, blank=True, on_delete=models.SET_NULL, related_name="occurrences",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Room occupancy: active bookings of a room overlapping an interval.
+            models.Index(
+                fields=["room", "start_time"],
+                condition=models.Q(status="ACTIVE"),
+                name="booking_active_room_slot_idx",
+            ),
+            # Per-user overlap checks.
+            models.Index(
+                fields=["user", "start_time"],
+                condition=models.Q(status="ACTIVE"),
+                name="booking_active_user_slot_idx",
+            ),
+            # Current occupancy: active bookings spanning a point in time.
+            models.Index(
+                fields=["start_time", "end_time"],
+                condition=models.Q(status="ACTIVE"),
+                name="booking_active_range_idx",
+            ),
+            # Listings, newest first, and the cancelled-only listing.
+            models.Index(fields=["-created_at", "-id"], name="booking_created_idx"),
+            models.Index(
+                fields=["-created_at", "-id"],
+                condition=models.Q(status="CANCELLED"),
+                name="booking_cancelled_created_idx",
+            ),
+        ]
+
     def __str__(self):
         return f"{self.room} | {self.start_time} - {self.end_time}"
+
+
+class ArchivedBooking(models.Model):
+    """
+    A booking moved out of the hot ``Booking`` table by ``manage.py archive_bookings``.
+
+    Same columns and ids as ``Booking``, so listings can union both tables
+    (``BookingsView`` with ``archived=1``). Only past and cancelled bookings
+    are archived, so availability and conflict checks never need to read it.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    room = models.ForeignKey(Room, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, null=True, blank=True, on_delete=models.CASCADE)
+    team = models.ForeignKey(Team, null=True, blank=True, on_delete=models.CASCADE)
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField()
+    booking_type = models.CharField(max_length=10, choices=Booking.BOOKING_TYPE_CHOICES)
+    status = models.CharField(max_length=10, choices=Booking.STATUS_CHOICES)
+    series = models.ForeignKey(
+        "BookingSeries", null=True, blank=True, on_delete=models.SET_NULL, related_name="archived_occurrences",
+    )
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Listings, as on Booking.
+            models.Index(fields=["-created_at", "-id"], name="archived_created_idx"),
+            models.Index(
+                fields=["-created_at", "-id"],
+                condition=models.Q(status="CANCELLED"),
+                name="archived_cancelled_created_idx",
+            ),
+            # Utilization recounts of archived days.
+            models.Index(
+                fields=["room", "start_time"],
+                condition=models.Q(status="ACTIVE"),
+                name="archived_active_room_slot_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.room} | {self.start_time} - {self.end_time} (archived)"
+
+
+class RoomSlotOccupancy(models.Model):
+    """
+    Seats taken in a room during one 15-minute bucket, kept next to the Booking rows.
+
+    Bookings claim a seat in every bucket they cover with a single conditional
+    ``UPDATE ... WHERE used < limit`` so concurrent requests can never
+    over-book a room, whatever the backend.
+    """
+    room = models.ForeignKey(Room, on_delete=models.CASCADE)
+    start_time = models.DateTimeField()
+    used = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["room", "start_time"], name="room_slot_occupancy_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.room} | {self.start_time}: {self.used}"
+
+
+class BookingSeries(models.Model):
+    """
+    A recurring booking: one room, one user or team, every ``interval`` days or weeks.
+
+    Every occurrence takes its seats in ``RoomSlotOccupancy`` when the series
+    is created, so the room stays reserved for all of them. ``Booking`` rows
+    are only written for occurrences starting before ``materialized_until``,
+    which moves forward in rolling windows (``bookings/series.py``).
+    """
+    FREQUENCY_CHOICES = [
+        ("DAILY", "Daily"),
+        ("WEEKLY", "Weekly"),
+    ]
+    room = models.ForeignKey(Room, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, null=True, blank=True, on_delete=models.CASCADE)
+    team = models.ForeignKey(Team, null=True, blank=True, on_delete=models.CASCADE)
+    booking_type = models.CharField(max_length=10, choices=Booking.BOOKING_TYPE_CHOICES)
+    start_time = models.DateTimeField()
+    duration = models.DurationField()
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES)
+    interval = models.PositiveSmallIntegerField(default=1)
+    # Comma-separated RRULE weekday codes (MO,TU,...); empty means every day (DAILY) or the start's weekday (WEEKLY).
+    weekdays = models.CharField(max_length=20, blank=True, default="")
+    until = models.DateField(null=True, blank=True)
+    count = models.PositiveIntegerField(null=True, blank=True)
+    last_start = models.DateTimeField()
+    materialized_until = models.DateTimeField()
+    status = models.CharField(max_length=10, choices=Booking.STATUS_CHOICES, default="ACTIVE")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Series with occurrences still to materialize.
+            models.Index(
+                fields=["materialized_until"],
+                condition=models.Q(status="ACTIVE"),
+                name="series_active_pending_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.room} | {self.frequency} from {self.start_time}"
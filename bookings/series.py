@@ -0,0 +1,284 @@
+"""
+Recurring booking series.
+
+A series is checked and allocated once, for all of its occurrences. Member
+conflicts and room occupancy are each read with one range query. The first
+room free for every occurrence is picked, so the whole series uses one room,
+and its seats are claimed in ``RoomSlotOccupancy`` for every occurrence.
+
+``Booking`` rows are written lazily with ``bulk_create``, one rolling window
+(``settings.BOOKING_SERIES_WINDOW_DAYS``) at a time: on creation, then by the
+``materialize_series`` command. Occurrences not materialized yet hold their
+seats but have no Booking row, so a single booking made meanwhile by the same
+user (or a member of the team) is not refused; the materializer then skips
+that occurrence and frees its seat instead of double-booking them.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from itertools import count, islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from rooms.models import Room
+from .intervals import MAX_DURATION, IntervalSet, as_aware, overlapping_any
+from .models import Booking, BookingSeries
+from .serializers import RecurrenceSerializer
+from .services import (
+    _BulkItem, _conflict_message, _resolve_people, _validate_items, booking_rule_error, claim_seats, create_bookings,
+    release_seats, seat_claims,
+)
+from .signals import bookings_changed, seats_held
+
+MAX_OCCURRENCES = 366
+
+
+def expand(series):
+    """Start of every occurrence of ``series`` in order, at the local wall-clock time of the first one."""
+    first = timezone.localtime(series.start_time)
+    weekdays = sorted(RecurrenceSerializer.WEEKDAYS.index(code) for code in series.weekdays.split(",") if code)
+    if series.frequency == "WEEKLY":
+        monday = first.date() - timedelta(days=first.weekday())
+        days = (
+            monday + timedelta(weeks=series.interval * week, days=weekday)
+            for week in count()
+            for weekday in weekdays or [first.weekday()]
+        )
+    else:
+        # Whole-week steps only ever land on the first weekday: no occurrence when it is not listed.
+        if weekdays and series.interval % 7 == 0 and first.weekday() not in weekdays:
+            return
+        days = (first.date() + timedelta(days=series.interval * n) for n in count())
+        if weekdays:
+            days = (day for day in days if day.weekday() in weekdays)
+
+    found = 0
+    for day in days:
+        if day < first.date():
+            continue
+        if series.until and day > series.until or series.count and found >= series.count:
+            return
+        yield timezone.make_aware(datetime.combine(day, first.time()))
+        found += 1
+
+
+def horizon(now=None):
+    """End of the rolling window: occurrences starting before it get Booking rows."""
+    return (now or timezone.now()) + timedelta(days=settings.BOOKING_SERIES_WINDOW_DAYS)
+
+
+def create_series(payload):
+    """
+    Validate a series request, reserve one room for every occurrence and materialize the first window.
+
+    ``payload`` is a ``POST /bookings/`` body (its slot and duration give the
+    first occurrence) with a ``recurrence`` (``RecurrenceSerializer``).
+
+    Returns:
+        tuple: ``(series, None, None)`` or ``(None, error message, details)``.
+        The series carries ``occurrence_count`` and ``materialized_count``.
+    """
+    item = _BulkItem(0)
+    _validate_items([item], [payload])
+    if item.error:
+        return None, item.error, item.details
+    recurrence = RecurrenceSerializer(data=payload.get("recurrence"))
+    if not recurrence.is_valid():
+        return None, "Invalid recurrence.", recurrence.errors
+
+    rule = recurrence.validated_data
+    # Slots without an offset are read in the default time zone, as for single bookings.
+    item.start_time, item.end_time = as_aware(item.start_time), as_aware(item.end_time)
+    series = BookingSeries(
+        start_time=item.start_time, duration=item.end_time - item.start_time, booking_type=item.booking_type,
+        frequency=rule["frequency"], interval=rule["interval"], weekdays=",".join(rule.get("weekdays", ())),
+        until=rule.get("until"), count=rule.get("count"),
+    )
+    starts = list(islice(expand(series), MAX_OCCURRENCES + 1))
+    if not starts:
+        return None, "The recurrence has no occurrences.", None
+    if len(starts) > MAX_OCCURRENCES:
+        return None, f"A series has at most {MAX_OCCURRENCES} occurrences.", None
+    windows = [(start, start + series.duration) for start in starts]
+
+    with transaction.atomic():
+        _resolve_people([item])
+        error = booking_rule_error(item.room_type, item.booking_type, item.members)
+        details = None
+        if not error:
+            error, details = _member_conflict(item, windows)
+        if not error:
+            series.room = _reserve_room(item.room_type, windows)
+            if series.room is None:
+                error = "No room is free for every occurrence of the series."
+        if error:
+            transaction.set_rollback(True)
+            return None, error, details
+
+        series.user, series.team = item.user, item.team
+        series.last_start = starts[-1]
+        series.materialized_until = series.start_time
+        series.save()
+        series.occurrence_count = len(starts)
+        series.materialized_count, _ = _materialize(series, starts, horizon())
+        _send_held(series, [window for window in windows if window[0] >= series.materialized_until])
+    return series, None, None
+
+
+def _member_conflict(item, windows):
+    """The error and occurrence of the first clash with a member's bookings, or ``(None, None)``."""
+    users = [item.user] if item.user else item.members
+    user_ids = [user.pk for user in users]
+    taken = defaultdict(IntervalSet)
+    bookings = overlapping_any(Booking.objects.filter(user_id__in=user_ids, status="ACTIVE"), windows)
+    for user_id, start_time, end_time in bookings.values_list("user_id", "start_time", "end_time"):
+        taken[user_id].add(start_time, end_time)
+    # Occurrences of the members' other series, their own or their teams', that have no Booking row yet.
+    others = BookingSeries.objects.filter(
+        Q(user_id__in=user_ids) | Q(team__members__in=user_ids), status="ACTIVE",
+        materialized_until__lt=windows[-1][1], last_start__gt=windows[0][0] - MAX_DURATION,
+    ).distinct().prefetch_related("team__members")
+    for other in others:
+        owners = [other.user_id] if other.user_id else [m.pk for m in other.team.members.all() if m.pk in user_ids]
+        for start in expand(other):
+            if start >= windows[-1][1]:
+                break
+            if start >= other.materialized_until:
+                for owner in owners:
+                    taken[owner].add(start, start + other.duration)
+
+    for start_time, end_time in windows:
+        busy = [user for user in users if user.pk in taken and taken[user.pk].overlapping(start_time, end_time)]
+        if busy:
+            error = "User already has a booking in this slot." if item.user else _conflict_message([u.name for u in busy])
+            return error, {"occurrence": start_time.isoformat()}
+    return None, None
+
+
+def _reserve_room(room_type, windows):
+    """First room of ``room_type`` free for every window whose seats could all be claimed, or None."""
+    occupied = defaultdict(IntervalSet)
+    bookings = overlapping_any(Booking.objects.filter(room__room_type=room_type, status="ACTIVE"), windows)
+    for room_id, start_time, end_time in bookings.values_list("room_id", "start_time", "end_time"):
+        occupied[room_id].add(start_time, end_time)
+
+    for room in Room.objects.filter(room_type=room_type).order_by("id"):
+        intervals = occupied.get(room.pk)
+        if intervals and any(intervals.max_overlap(start, end) >= room.seat_limit for start, end in windows):
+            continue
+        claims = {}
+        for start_time, end_time in windows:
+            claims.update(seat_claims(room, start_time, end_time))
+        # Fails when a concurrent booking, or another series' unmaterialized occurrence, holds a seat.
+        if claim_seats(claims):
+            return room
+    return None
+
+
+def _materialize(series, starts, until):
+    """
+    Write the Booking rows of the occurrences in ``starts`` from ``materialized_until`` up to ``until``.
+
+    Returns:
+        tuple: ``(bookings created, occurrences skipped)``; 0, 0 when
+        another process moved the window first.
+    """
+    since = series.materialized_until
+    if until <= since:
+        return 0, 0
+    # Conditional update so concurrent materializers write each window only once.
+    moved = BookingSeries.objects.filter(
+        pk=series.pk, status="ACTIVE", materialized_until=since,
+    ).update(materialized_until=until)
+    if not moved:
+        return 0, 0
+    series.materialized_until = until
+
+    windows = [(start, start + series.duration) for start in starts if since <= start < until]
+    skipped = []
+    user_ids = [series.user_id] if series.user_id else list(series.team.members.values_list("pk", flat=True))
+    if user_ids and windows:
+        taken = IntervalSet(
+            overlapping_any(Booking.objects.filter(user_id__in=user_ids, status="ACTIVE"), windows)
+            .values_list("start_time", "end_time")
+        )
+        skipped = [window for window in windows if taken.overlapping(*window)]
+        if skipped:
+            release_seats(series.room_id, skipped)
+            _send_held(series, skipped)
+            windows = [window for window in windows if window not in skipped]
+
+    bookings, rejected = create_bookings([
+        Booking(
+            room=series.room, user=series.user, team=series.team, series=series,
+            start_time=start_time, end_time=end_time, booking_type=series.booking_type, status="ACTIVE",
+        )
+        for start_time, end_time in windows
+    ])
+    if rejected:
+        # A member booked one of these slots concurrently: skip it like the ones found above.
+        clashes = [(booking.start_time, booking.end_time) for booking in rejected]
+        release_seats(series.room_id, clashes)
+        _send_held(series, clashes)
+        skipped += clashes
+    if bookings:
+        bookings_changed.send(sender=Booking, bookings=bookings)
+    return len(bookings), len(skipped)
+
+
+def materialize_due(now=None):
+    """
+    Move every active series' window forward to ``horizon(now)``.
+
+    Returns:
+        dict: ``series``, ``bookings`` created and ``skipped`` occurrences.
+    """
+    until = horizon(now)
+    totals = {"series": 0, "bookings": 0, "skipped": 0}
+    pending = BookingSeries.objects.filter(
+        status="ACTIVE", materialized_until__lt=until, materialized_until__lte=F("last_start"),
+    ).select_related("room", "user", "team")
+    for series in pending.iterator(chunk_size=500):
+        with transaction.atomic():
+            created, skipped = _materialize(series, expand(series), until)
+        totals["series"] += 1
+        totals["bookings"] += created
+        totals["skipped"] += skipped
+    return totals
+
+
+def cancel_series(series_id):
+    """
+    Cancel a series: its upcoming bookings are cancelled and the seats of every unmaterialized occurrence freed.
+
+    Returns:
+        int or None: Occurrences cancelled, or None when there is no active series ``series_id``.
+    """
+    with transaction.atomic():
+        if not BookingSeries.objects.filter(pk=series_id, status="ACTIVE").update(status="CANCELLED"):
+            return None
+        series = BookingSeries.objects.get(pk=series_id)
+        upcoming = list(
+            Booking.objects.filter(series=series, status="ACTIVE", start_time__gte=timezone.now()).select_related("room")
+        )
+        Booking.objects.filter(pk__in=[booking.pk for booking in upcoming]).update(status="CANCELLED")
+        pending = [
+            (start, start + series.duration) for start in expand(series) if start >= series.materialized_until
+        ]
+        release_seats(series.room_id, [(booking.start_time, booking.end_time) for booking in upcoming] + pending)
+        for booking in upcoming:
+            booking.status = "CANCELLED"
+        if upcoming:
+            bookings_changed.send(sender=Booking, bookings=upcoming)
+        _send_held(series, pending)
+        return len(upcoming) + len(pending)
+
+
+def _send_held(series, windows):
+    """Announce that the seats of ``series.room`` for ``windows`` were claimed or released without Booking rows."""
+    if windows:
+        seats_held.send(sender=BookingSeries, bookings=[
+            Booking(room=series.room, start_time=start_time, end_time=end_time) for start_time, end_time in windows
+        ])
@@ -0,0 +1,552 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.lookups import LessThanOrEqual
+from django.utils.dateparse import parse_datetime
+
+from roombooking.versioning import bump_on_commit
+from rooms.availability import room_availability
+from rooms.models import Room
+from rooms.occupancy import available_rooms
+from users.models import User
+from users.serializers import UserSerializer
+from .intervals import DEFAULT_DURATION, GRANULARITY, MAX_DURATION, IntervalSet, buckets, is_aligned, overlapping, overlapping_any
+from .models import Booking, RoomSlotOccupancy, Team
+from .signals import bookings_changed
+
+ROOM_TYPES = ["PRIVATE", "CONFERENCE", "SHARED"]
+CONFERENCE_MIN_HEADCOUNT = 3
+MAX_BULK_BOOKINGS = 1000
+# Bulk bookings queued as a background job (``"background": true``) may be larger.
+MAX_BACKGROUND_BULK_BOOKINGS = 20000
+# Seat claims applied per UPDATE, keeping statements under SQLite's parameter limit.
+CLAIM_BATCH_SIZE = 2000
+
+
+def parse_slot(room_type, slot):
+    """
+    Validate the room type and slot of a booking request.
+
+    Returns:
+        tuple: ``(start_time, None)`` or ``(None, error message)``.
+    """
+    if room_type not in ROOM_TYPES:
+        return None, "Invalid room type. Must be one of: PRIVATE, CONFERENCE, SHARED"
+    if not slot or not isinstance(slot, str):
+        return None, "Slot is invalid, must be a string in the format YYYY-MM-DDTHH:MM."
+    try:
+        start_time = parse_datetime(slot)
+    except ValueError:
+        start_time = None
+    if not start_time:
+        return None, "Invalid slot format. Use ISO 8601."
+    if not is_aligned(start_time):
+        return None, "Slot must start on a 15-minute boundary."
+    return start_time, None
+
+
+def parse_duration(value):
+    """
+    Validate the optional ``duration`` of a booking request, in minutes.
+
+    Returns:
+        tuple: ``(timedelta, None)`` or ``(None, error message)``; one hour when ``value`` is None.
+    """
+    if value is None or value == "":
+        return DEFAULT_DURATION, None
+    error = "Duration must be a whole number of minutes, a multiple of 15 up to 480."
+    if isinstance(value, bool) or isinstance(value, float) and not value.is_integer():
+        return None, error
+    try:
+        duration = timedelta(minutes=int(value))
+    except (TypeError, ValueError, OverflowError):
+        return None, error
+    if duration <= timedelta(0) or duration > MAX_DURATION or duration % GRANULARITY:
+        return None, error
+    return duration, None
+
+
+def headcount(members):
+    """Seats taken by a group of users; children (under 10) don't occupy one."""
+    return sum(1 for member in members if member.age >= 10)
+
+
+def booking_rule_error(room_type, booking_type, members=()):
+    """
+    Check the room-type rules for an individual or team booking.
+
+    Returns:
+        str or None: The error message of the first rule broken.
+    """
+    if booking_type == "TEAM" and room_type == "CONFERENCE" and headcount(members) < CONFERENCE_MIN_HEADCOUNT:
+        return "Conference rooms require at least 3 team members (excluding children)."
+    if room_type == "PRIVATE" and booking_type != "INDIVIDUAL":
+        return "Private rooms can only be booked by individuals."
+    if room_type == "CONFERENCE" and booking_type != "TEAM":
+        return "Conference rooms can only be booked by teams."
+    if room_type == "SHARED" and booking_type != "INDIVIDUAL":
+        return "Shared desks can only be booked by individuals."
+    return None
+
+
+def team_conflict_error(members, start_time, end_time):
+    """
+    Check every team member for an active booking overlapping ``[start_time, end_time)`` with one query.
+
+    Returns:
+        str or None: An error naming all conflicting members, in team order.
+    """
+    busy = set(
+        overlapping(
+            Booking.objects.filter(user_id__in=[member.pk for member in members], status="ACTIVE"),
+            start_time, end_time,
+        ).values_list("user_id", flat=True)
+    )
+    return _conflict_message([member.name for member in members if member.pk in busy])
+
+
+def _conflict_message(names):
+    if not names:
+        return None
+    if len(names) == 1:
+        return f"Team member {names[0]} already has a booking in this slot."
+    return f"Team members {', '.join(names)} already have a booking in this slot."
+
+
+def allocate_room(room_type, start_time, end_time=None):
+    """
+    Pick the first room of ``room_type`` that still has a free seat for ``[start_time, end_time)``.
+
+    Uses the same overlap query as ``RoomAvailabilityView``.
+
+    Returns:
+        Room or None: The allocated room, or None when the slot is full.
+    """
+    return next(iter(room_availability(room_type, start_time, end_time)), None)
+
+
+class _ClaimFailed(Exception):
+    pass
+
+
+def claim_seats(claims):
+    """
+    Atomically take seats in one or more (room, bucket) pairs.
+
+    ``claims`` maps ``(room, bucket start)`` to the number of seats wanted; a
+    booking claims every ``GRANULARITY`` bucket it covers. The
+    counter rows are created if missing, then the claims are applied by
+    conditional ``UPDATE``s (one per ``CLAIM_BATCH_SIZE`` claims) that only
+    touch rows with enough free seats left.
+    Either every claim succeeds or none is applied; no locks are taken and
+    nothing is retried, so a concurrent writer that got there first simply
+    makes this call return False.
+
+    Returns:
+        bool: Whether all seats were claimed.
+    """
+    if not claims:
+        return True
+    RoomSlotOccupancy.objects.bulk_create(
+        [RoomSlotOccupancy(room=room, start_time=start_time) for room, start_time in claims],
+        ignore_conflicts=True,
+    )
+    items = list(claims.items())
+    try:
+        with transaction.atomic():
+            for offset in range(0, len(items), CLAIM_BATCH_SIZE):
+                if not _claim_batch(dict(items[offset:offset + CLAIM_BATCH_SIZE])):
+                    raise _ClaimFailed
+    except _ClaimFailed:
+        return False
+    return True
+
+
+def _claim_batch(claims):
+    rooms = {room for room, _ in claims}
+    seats = set(claims.values())
+    if len(rooms) == 1 and len(seats) == 1:
+        # One room and seat count (a single booking or a series): no per-row CASE needed.
+        (room,), (wanted,) = rooms, seats
+        updated = RoomSlotOccupancy.objects.filter(
+            room_id=room.pk, start_time__in=[start_time for _, start_time in claims], used__lte=room.seat_limit - wanted,
+        ).update(used=F("used") + wanted)
+        return updated == len(claims)
+    wanted = Case(
+        *[When(room_id=room.pk, start_time=start_time, then=Value(seats)) for (room, start_time), seats in claims.items()],
+        default=Value(0),
+    )
+    limit = Case(
+        *[When(room_id=room.pk, start_time=start_time, then=Value(room.seat_limit)) for room, start_time in claims],
+        default=Value(-1),
+    )
+    updated = (
+        RoomSlotOccupancy.objects.filter(
+            room_id__in={room.pk for room, _ in claims},
+            start_time__in={start_time for _, start_time in claims},
+        )
+        .filter(LessThanOrEqual(F("used") + wanted, limit))
+        .update(used=F("used") + wanted)
+    )
+    return updated == len(claims)
+
+
+def seat_claims(room, start_time, end_time, seats=1):
+    """``claim_seats()`` argument taking ``seats`` in ``room`` for all of ``[start_time, end_time)``."""
+    return {(room, bucket): seats for bucket in buckets(start_time, end_time)}
+
+
+def release_seat(room_id, start_time, end_time):
+    """Give back the seat of a cancelled booking in every bucket it covered."""
+    release_seats(room_id, [(start_time, end_time)])
+
+
+def release_seats(room_id, intervals):
+    """Give back one seat of ``room_id`` for each of the (non-overlapping) ``intervals``, in batched updates."""
+    covered = [bucket for start_time, end_time in intervals for bucket in buckets(start_time, end_time)]
+    for offset in range(0, len(covered), CLAIM_BATCH_SIZE):
+        RoomSlotOccupancy.objects.filter(
+            room_id=room_id, start_time__in=covered[offset:offset + CLAIM_BATCH_SIZE], used__gt=0,
+        ).update(used=F("used") - 1)
+
+
+def create_bookings(bookings):
+    """
+    Insert ``bookings`` with ``bulk_create``, one by one when the batch breaks ``booking_user_no_overlap``.
+
+    That PostgreSQL constraint rejects a booking whose user got an overlapping
+    one from a concurrent request since the overlap checks ran; each insert
+    of the fallback gets its own savepoint so the others still go in.
+
+    Returns:
+        tuple: ``(created, rejected)`` lists of bookings.
+    """
+    try:
+        with transaction.atomic():
+            return Booking.objects.bulk_create(bookings), []
+    except IntegrityError:
+        pass
+    created, rejected = [], []
+    for booking in bookings:
+        try:
+            with transaction.atomic():
+                created.extend(Booking.objects.bulk_create([booking]))
+        except IntegrityError:
+            rejected.append(booking)
+    return created, rejected
+
+
+def reserve_room(room_type, start_time, end_time):
+    """
+    Allocate a room of ``room_type`` for ``[start_time, end_time)`` and claim its seat.
+
+    Candidates come from the occupancy index when it is enabled, then from the
+    grouped availability query; the first one whose seat claim succeeds wins,
+    so a room filled concurrently since the read is skipped instead of
+    over-booked.
+
+    Returns:
+        Room or None: The reserved room, or None when the slot is full.
+    """
+    for room, _ in available_rooms(room_type, start_time, end_time) or ():
+        if claim_seats(seat_claims(room, start_time, end_time)):
+            return room
+    # The index may lag changes made by other processes; confirm with the database.
+    for room in room_availability(room_type, start_time, end_time):
+        if claim_seats(seat_claims(room, start_time, end_time)):
+            return room
+    return None
+
+
+def get_or_create_users(specs, lookup_fields=None):
+    """
+    Bulk equivalent of ``User.objects.get_or_create`` for a list of user specs.
+
+    A spec matches an existing user when all of its ``lookup_fields`` (every
+    field of the spec when None) are equal. Existing users are fetched with one
+    query and the missing ones are inserted with one ``bulk_create``.
+
+    Returns:
+        list: One User per spec, in the same order.
+    """
+    def key(spec):
+        fields = lookup_fields or sorted(spec)
+        return tuple((field, spec.get(field)) for field in fields)
+
+    candidates = defaultdict(list)
+    for user in User.objects.filter(name__in={spec["name"] for spec in specs}).order_by("id"):
+        candidates[user.name].append(user)
+
+    resolved = {}
+    missing = {}
+    for spec in specs:
+        spec_key = key(spec)
+        if spec_key in resolved or spec_key in missing:
+            continue
+        match = next(
+            (user for user in candidates[spec["name"]] if all(getattr(user, f) == v for f, v in spec_key)),
+            None,
+        )
+        if match:
+            resolved[spec_key] = match
+        else:
+            missing[spec_key] = User(**spec)
+
+    if missing:
+        User.objects.bulk_create(missing.values())
+        bump_on_commit("users")
+        resolved.update(missing)
+    return [resolved[key(spec)] for spec in specs]
+
+
+class _BulkItem:
+    def __init__(self, index):
+        self.index = index
+        self.error = None
+        self.details = None
+        self.room_type = None
+        self.start_time = None
+        self.end_time = None
+        self.booking_type = None
+        self.user_spec = None
+        self.team_spec = None
+        self.user = None
+        self.team = None
+        self.members = []
+        self.room = None
+        self.booking = None
+
+    def fail(self, error, details=None):
+        self.error, self.details = error, details
+
+    def result(self):
+        if self.error:
+            result = {"index": self.index, "error": self.error}
+            if self.details:
+                result["details"] = self.details
+            return result
+        return {"index": self.index, "booking_id": self.booking.id, "room": self.room.room_number}
+
+
+def book_many(payloads, all_or_nothing=False):
+    """
+    Create many bookings at once with the same rules as ``BookingsView.post``.
+
+    Users and teams are resolved in bulk, occupancy and member conflicts for
+    every requested slot are read with one query each, rooms are allocated in
+    memory (in request order, so earlier items win) and the bookings are
+    inserted with ``bulk_create``.
+
+    With ``all_or_nothing`` a single failing item rolls back the whole batch,
+    including any users and teams created for it.
+
+    Returns:
+        tuple: ``(results, ok)`` where ``results`` has one dict per payload
+        (``booking_id`` and ``room``, or ``error``) and ``ok`` tells whether
+        every item succeeded.
+    """
+    with transaction.atomic():
+        items = [_BulkItem(index) for index in range(len(payloads))]
+        _validate_items(items, payloads)
+        _resolve_people(items)
+        _check_member_conflicts(items)
+        _allocate_rooms(items)
+
+        ok = all(not item.error for item in items)
+        if ok or not all_or_nothing:
+            _claim_allocated_seats(items)
+            ok = all(not item.error for item in items)
+        if all_or_nothing and not ok:
+            transaction.set_rollback(True)
+            for item in items:
+                if not item.error:
+                    item.fail("Not booked: another booking in the batch failed.")
+            return [item.result() for item in items], ok
+
+        booked = [item for item in items if not item.error]
+        for item in booked:
+            item.booking = Booking(
+                room=item.room, user=item.user, team=item.team,
+                start_time=item.start_time, end_time=item.end_time,
+                booking_type=item.booking_type, status="ACTIVE",
+            )
+        bookings, rejected = create_bookings([item.booking for item in booked])
+        if rejected:
+            rejected = {id(booking) for booking in rejected}
+            for item in booked:
+                if id(item.booking) in rejected:
+                    item.fail("User already has a booking in this slot.")
+                    release_seat(item.room.pk, item.start_time, item.end_time)
+            ok = False
+            if all_or_nothing:
+                transaction.set_rollback(True)
+                for item in items:
+                    if not item.error:
+                        item.fail("Not booked: another booking in the batch failed.")
+                return [item.result() for item in items], ok
+        if bookings:
+            bookings_changed.send(sender=Booking, bookings=bookings)
+        return [item.result() for item in items], ok
+
+
+def _validate_items(items, payloads):
+    from .serializers import TeamSerializer
+
+    for item, data in zip(items, payloads):
+        if not isinstance(data, dict):
+            item.fail("Invalid booking data.")
+            continue
+        item.room_type = data.get("room_type")
+        item.start_time, error = parse_slot(item.room_type, data.get("slot"))
+        if error:
+            item.fail(error)
+            continue
+        duration, error = parse_duration(data.get("duration"))
+        if error:
+            item.fail(error)
+            continue
+        item.end_time = item.start_time + duration
+        if data.get("user"):
+            item.booking_type = "INDIVIDUAL"
+            serializer = UserSerializer(data=data["user"])
+            if not serializer.is_valid():
+                item.fail("Invalid user data.", serializer.errors)
+                continue
+            item.user_spec = serializer.validated_data
+        elif data.get("team"):
+            item.booking_type = "TEAM"
+            serializer = TeamSerializer(data=data["team"])
+            if not serializer.is_valid():
+                item.fail("Invalid team data.", serializer.errors)
+                continue
+            item.team_spec = serializer.validated_data
+        else:
+            item.fail("Must provide either user or team.")
+
+
+def _resolve_people(items):
+    individuals = [item for item in items if not item.error and item.booking_type == "INDIVIDUAL"]
+    users = get_or_create_users(
+        [
+            {"name": item.user_spec["name"], "age": item.user_spec["age"], "gender": item.user_spec.get("gender")}
+            for item in individuals
+        ],
+        lookup_fields=["name"],
+    )
+    for item, user in zip(individuals, users):
+        item.user = user
+
+    teams = [item for item in items if not item.error and item.booking_type == "TEAM"]
+    member_specs = [dict(member) for item in teams for member in item.team_spec["members"]]
+    members = iter(get_or_create_users(member_specs))
+    for item in teams:
+        item.members = list({user.pk: user for user in (next(members) for _ in item.team_spec["members"])}.values())
+        item.team = Team(name=item.team_spec["name"])
+    Team.objects.bulk_create(item.team for item in teams)
+    Team.members.through.objects.bulk_create(
+        Team.members.through(team_id=item.team.pk, user_id=member.pk) for item in teams for member in item.members
+    )
+
+
+def _check_member_conflicts(items):
+    pending = [item for item in items if not item.error]
+    user_ids = {item.user.pk for item in pending if item.user} | {m.pk for item in pending for m in item.members}
+    taken = defaultdict(IntervalSet)
+    bookings = overlapping_any(
+        Booking.objects.filter(user_id__in=user_ids, status="ACTIVE"),
+        [(item.start_time, item.end_time) for item in pending],
+    ).values_list("user_id", "start_time", "end_time")
+    for user_id, start_time, end_time in bookings:
+        taken[user_id].add(start_time, end_time)
+
+    def busy(user, item):
+        return user.pk in taken and bool(taken[user.pk].overlapping(item.start_time, item.end_time))
+
+    for item in pending:
+        if item.user:
+            if busy(item.user, item):
+                item.fail("User already has a booking in this slot.")
+                continue
+            taken[item.user.pk].add(item.start_time, item.end_time)
+        else:
+            error = _conflict_message([m.name for m in item.members if busy(m, item)])
+            if error:
+                item.fail(error)
+                continue
+        error = booking_rule_error(item.room_type, item.booking_type, item.members)
+        if error:
+            item.fail(error)
+
+
+def _allocate_rooms(items):
+    pending = [item for item in items if not item.error]
+    if not pending:
+        return
+    rooms_by_type = defaultdict(list)
+    for room in Room.objects.filter(room_type__in={item.room_type for item in pending}).order_by("id"):
+        rooms_by_type[room.room_type].append(room)
+    occupied = defaultdict(IntervalSet)
+    bookings = overlapping_any(
+        Booking.objects.filter(room__room_type__in=rooms_by_type, status="ACTIVE"),
+        [(item.start_time, item.end_time) for item in pending],
+    ).values_list("room_id", "start_time", "end_time")
+    for room_id, start_time, end_time in bookings:
+        occupied[room_id].add(start_time, end_time)
+    # Seats held without Booking rows (series occurrences past the
+    # materialization window) only show in the counters.
+    claimed = defaultdict(int)
+    pending_buckets = sorted({bucket for item in pending for bucket in buckets(item.start_time, item.end_time)})
+    for offset in range(0, len(pending_buckets), CLAIM_BATCH_SIZE):
+        counters = RoomSlotOccupancy.objects.filter(
+            room__room_type__in=rooms_by_type, start_time__in=pending_buckets[offset:offset + CLAIM_BATCH_SIZE], used__gt=0,
+        ).values_list("room_id", "start_time", "used")
+        for room_id, bucket, used in counters:
+            claimed[room_id, bucket] = used
+
+    # Rooms of a type fill in id order and never free up within a batch, so
+    # each (room type, interval) keeps a cursor to its first room with a free seat.
+    cursors = defaultdict(int)
+    for item in pending:
+        rooms = rooms_by_type[item.room_type]
+        key = item.room_type, item.start_time, item.end_time
+        position = cursors[key]
+        while position < len(rooms):
+            room = rooms[position]
+            if _has_free_seat(room, item, occupied, claimed):
+                break
+            position += 1
+        cursors[key] = position
+        if position == len(rooms):
+            item.fail("No available room for the selected slot and type.")
+            continue
+        item.room = rooms[position]
+        occupied[item.room.pk].add(item.start_time, item.end_time)
+        for bucket in buckets(item.start_time, item.end_time):
+            claimed[item.room.pk, bucket] += 1
+
+
+def _has_free_seat(room, item, occupied, claimed):
+    if room.pk in occupied and occupied[room.pk].max_overlap(item.start_time, item.end_time) >= room.seat_limit:
+        return False
+    return all(claimed[room.pk, bucket] < room.seat_limit for bucket in buckets(item.start_time, item.end_time))
+
+
+def _claim_allocated_seats(items):
+    claims = defaultdict(int)
+    for item in items:
+        if not item.error:
+            for key in seat_claims(item.room, item.start_time, item.end_time):
+                claims[key] += 1
+    if claim_seats(claims):
+        return
+    # Someone booked the same rooms since occupancy was read: claim per item,
+    # moving an item whose room filled up to the next room with a free seat
+    # as a single booking would, and fail it only when there is none.
+    for item in items:
+        if item.error or claim_seats(seat_claims(item.room, item.start_time, item.end_time)):
+            continue
+        item.room = reserve_room(item.room_type, item.start_time, item.end_time)
+        if item.room is None:
+            item.fail("No available room for the selected slot and type.")
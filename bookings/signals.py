@@ -0,0 +1,44 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+
+from .models import Booking
+
+# Sent whenever bookings are created, cancelled or deleted, with
+# ``bookings``: the affected Booking instances (room loaded). Code paths that
+# bypass model signals (bulk_create, queryset.update) send it explicitly.
+bookings_changed = Signal()
+
+# Sent when seats are claimed or released in RoomSlotOccupancy without a
+# Booking row changing: occurrences of a series that are not materialized
+# yet. ``bookings`` are unsaved Booking instances standing for them (room,
+# start_time and end_time set), so availability caches can drop those slots.
+seats_held = Signal()
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def _booking_saved_or_deleted(sender, instance, **kwargs):
+    bookings_changed.send(sender=Booking, bookings=[instance])
+
+
+# Seats taken in RoomSlotOccupancy are given back by the cancel endpoints;
+# these cover the other ways a booking stops being active: deleting it
+# (directly, in the admin, or by cascade from its user, team or room) and
+# saving it as cancelled.
+@receiver(post_delete, sender=Booking)
+def _release_deleted_booking(sender, instance, **kwargs):
+    from .services import release_seat  # services imports this module
+
+    if instance.status == "ACTIVE":
+        release_seat(instance.room_id, instance.start_time, instance.end_time)
+
+
+@receiver(pre_save, sender=Booking)
+def _release_cancelled_booking(sender, instance, **kwargs):
+    from .services import release_seat
+
+    if instance.pk is None or instance.status != "CANCELLED":
+        return
+    stored = Booking.objects.filter(pk=instance.pk, status="ACTIVE").values_list("room_id", "start_time", "end_time")
+    for room_id, start_time, end_time in stored:
+        release_seat(room_id, start_time, end_time)
@@ -0,0 +1,32 @@
+"""
+Background tasks for the bookings app, run by ``manage.py run_jobs`` (see jobs/queue.py).
+"""
+from jobs.queue import file_result, result_path, task
+
+from .export import CONTENT_TYPES, LINE_WRITERS, export_rows, include_archived, parse_filters
+from .services import book_many
+
+
+@task("bookings.export", timeout=3600)
+def export_bookings(job):
+    """Write a CSV/NDJSON export (``format``, the export filters and ``archived`` in the payload) to a result file."""
+    export_format = job.payload["format"]
+    filters, error = parse_filters(job.payload.get("status"), job.payload.get("start"), job.payload.get("end"))
+    if error:
+        raise ValueError(error)
+    archived = include_archived(job.payload.get("archived"))
+    path = result_path(job, f".{export_format}")
+    lines = 0
+    with open(path, "w", newline="") as fh:
+        for line in LINE_WRITERS[export_format](export_rows(filters, archived=archived)):
+            fh.write(line)
+            lines += 1
+    rows = lines - 1 if export_format == "csv" else lines
+    return file_result(path, f"bookings.{export_format}", CONTENT_TYPES[export_format], rows=rows)
+
+
+@task("bookings.bulk", timeout=900)
+def bulk_book(job):
+    """``book_many`` over the payload's ``bookings``; it runs in one transaction, so a retry starts clean."""
+    results, ok = book_many(job.payload["bookings"], all_or_nothing=job.payload.get("all_or_nothing", False))
+    return {"results": results, "ok": ok, "booked": sum("booking_id" in result for result in results)}
@@ -1 +1,1024 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.contrib.auth.models import User as AuthUser
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import connection
+from django.db import OperationalError, connections, transaction
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APITestCase
+
+from bookings import services
+from bookings.intervals import IntervalSet, overlapping
+from bookings.models import ArchivedBooking, Booking, BookingSeries, RoomSlotOccupancy
+from bookings.serializers import BookingSerializer
+from bookings.series import materialize_due
+from bookings.services import allocate_room, claim_seats, seat_claims
+from bookings.views import AsyncBookingsView
+from rooms.availability import availability_queryset
+from rooms.models import DailyUtilization, Room
+from roombooking.database import parse_database_url
+from roombooking.middleware import RequestMetricsMiddleware, reset_metrics
+from roombooking.sqlite3.base import DatabaseWrapper
+from roombooking.utils import KeysetPagination
+from users.models import User
+
+
+def next_slot(hour=10, days=1):
+    day = timezone.now() + timedelta(days=days)
+    return datetime(day.year, day.month, day.day, hour, tzinfo=dt_timezone.utc)
+
+
+def create_rooms(private=8, conference=4, shared=3):
+    rooms = (
+        [Room(room_type="PRIVATE", capacity=1, room_number=f"P{i}") for i in range(1, private + 1)]
+        + [Room(room_type="CONFERENCE", capacity=20, room_number=f"C{i}") for i in range(1, conference + 1)]
+        + [Room(room_type="SHARED", capacity=4, room_number=f"S{i}") for i in range(1, shared + 1)]
+    )
+    Room.objects.bulk_create(rooms)
+
+
+class BookingTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = AuthUser.objects.create_user("admin", password="admin")
+        self.client.force_authenticate(self.admin)
+        self.slot = next_slot()
+
+    def book(self, **payload):
+        payload.setdefault("slot", self.slot.isoformat())
+        return self.client.post("/api/v1/bookings/", payload, format="json")
+
+
+class RoomAllocationTests(BookingTestCase):
+    def test_private_rooms_fill_in_order(self):
+        create_rooms(private=2, conference=0, shared=0)
+        first = self.book(user={"name": "ann", "age": 30}, room_type="PRIVATE")
+        second = self.book(user={"name": "bob", "age": 30}, room_type="PRIVATE")
+        third = self.book(user={"name": "cat", "age": 30}, room_type="PRIVATE")
+        self.assertEqual(first.data["room"], "P1")
+        self.assertEqual(second.data["room"], "P2")
+        self.assertEqual(third.status_code, 400)
+
+    def test_shared_desk_fills_up_to_capacity(self):
+        create_rooms(private=0, conference=0, shared=2)
+        rooms = [self.book(user={"name": f"u{i}", "age": 30}, room_type="SHARED").data["room"] for i in range(5)]
+        self.assertEqual(rooms, ["S1", "S1", "S1", "S1", "S2"])
+
+    def test_cancelled_bookings_free_the_room(self):
+        create_rooms(private=1, conference=0, shared=0)
+        booking_id = self.book(user={"name": "ann", "age": 30}, room_type="PRIVATE").data["booking_id"]
+        booking = Booking.objects.get(id=booking_id)
+        booking.status = "CANCELLED"
+        booking.save()
+        self.assertEqual(allocate_room("PRIVATE", self.slot).room_number, "P1")
+
+    def fill_all_but_last(self, room_type, count):
+        user = User.objects.create(name="filler", age=30)
+        rooms = list(Room.objects.filter(room_type=room_type).order_by("id"))[: count - 1]
+        Booking.objects.bulk_create(
+            Booking(
+                room=room, user=user, start_time=self.slot, end_time=self.slot + timedelta(hours=1),
+                booking_type="INDIVIDUAL",
+            )
+            for room in rooms
+            for _ in range(room.capacity if room_type == "SHARED" else 1)
+        )
+
+    def test_allocation_query_count_is_independent_of_inventory(self):
+        query_counts = []
+        for count in (15, 1500):
+            Room.objects.all().delete()
+            create_rooms(private=count, conference=0, shared=count)
+            self.fill_all_but_last("PRIVATE", count)
+            self.fill_all_but_last("SHARED", count)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(allocate_room("PRIVATE", self.slot).room_number, f"P{count}")
+                self.assertEqual(allocate_room("SHARED", self.slot).room_number, f"S{count}")
+            with CaptureQueriesContext(connection) as post_queries:
+                response = self.book(user={"name": f"new{count}", "age": 30}, room_type="PRIVATE")
+            self.assertEqual(response.status_code, 201)
+            query_counts.append((len(queries), len(post_queries)))
+        self.assertEqual(query_counts[0][0], 2)
+        self.assertEqual(query_counts[0], query_counts[1])
+
+
+class TeamBookingTests(BookingTestCase):
+    def team(self, name, size, offset=0):
+        return {"name": name, "members": [{"name": f"m{i}", "age": 30} for i in range(offset, offset + size)]}
+
+    def test_team_booking_query_count_is_independent_of_team_size(self):
+        create_rooms(private=0, conference=2, shared=0)
+        query_counts = []
+        for slot, size in ((self.slot, 3), (next_slot(hour=11), 40)):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.book(team=self.team(f"team{size}", size), room_type="CONFERENCE", slot=slot.isoformat())
+            self.assertEqual(response.status_code, 201)
+            query_counts.append(len(queries))
+        self.assertEqual(query_counts[0], query_counts[1])
+        self.assertEqual(Booking.objects.get(id=response.data["booking_id"]).team.members.count(), 40)
+
+    def test_existing_members_are_reused(self):
+        create_rooms(private=0, conference=2, shared=0)
+        self.book(team=self.team("first", 3), room_type="CONFERENCE")
+        self.book(team=self.team("second", 4, offset=1), room_type="CONFERENCE", slot=next_slot(hour=11).isoformat())
+        self.assertEqual(User.objects.count(), 5)
+
+    def test_all_conflicting_members_are_reported(self):
+        create_rooms(private=2, conference=1, shared=0)
+        self.book(user={"name": "m1", "age": 30}, room_type="PRIVATE")
+        self.book(user={"name": "m3", "age": 30}, room_type="PRIVATE")
+        response = self.book(team=self.team("team", 4), room_type="CONFERENCE")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["error"], "Team members m1, m3 already have a booking in this slot.")
+
+        response = self.book(team=self.team("other", 3), room_type="CONFERENCE")
+        self.assertEqual(response.data["error"], "Team member m1 already has a booking in this slot.")
+
+class DatabaseSettingsTests(TestCase):
+    def test_postgres_url(self):
+        database = parse_database_url("postgres://app:p%40ss@db:5432/roombooking?sslmode=require")
+        self.assertEqual(database["ENGINE"], "django.db.backends.postgresql")
+        self.assertEqual(
+            (database["NAME"], database["USER"], database["PASSWORD"], database["HOST"], database["PORT"]),
+            ("roombooking", "app", "p@ss", "db", "5432"),
+        )
+        self.assertTrue(database["CONN_HEALTH_CHECKS"])
+        self.assertEqual(database["OPTIONS"], {"sslmode": "require"})
+        with self.assertRaises(ValueError):
+            parse_database_url("mysql://db/roombooking")
+
+    def test_sqlite_connection_is_tuned(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            settings_dict = {**connection.settings_dict, **parse_database_url(f"sqlite:///{tmp}/db.sqlite3?timeout=3")}
+            wrapper = DatabaseWrapper(settings_dict, alias="tuned")
+            try:
+                with wrapper.cursor() as cursor:
+                    pragmas = [cursor.execute(f"PRAGMA {name}").fetchone()[0]
+                               for name in ("journal_mode", "synchronous", "busy_timeout")]
+                self.assertEqual(pragmas, ["wal", 1, 3000])
+
+                connections["tuned"] = wrapper
+                with CaptureQueriesContext(wrapper) as queries, transaction.atomic(using="tuned"):
+                    pass
+                self.assertEqual(queries[0]["sql"], "BEGIN IMMEDIATE")
+            finally:
+                del connections["tuned"]
+                wrapper.close()
+
+
+@override_settings(REQUEST_METRICS_ENABLED=True)
+class RequestMetricsTests(BookingTestCase):
+    def setUp(self):
+        super().setUp()
+        reset_metrics()
+        create_rooms(private=1, conference=0, shared=0)
+
+    def test_server_timing_log_and_stats(self):
+        with self.assertLogs("roombooking.metrics", "INFO") as logs, CaptureQueriesContext(connection) as queries:
+            response = self.book(user={"name": "ann", "age": 30}, room_type="PRIVATE")
+        self.assertEqual(response.status_code, 201)
+        query_count = len(queries)
+        timing = re.fullmatch(
+            r'total;dur=[\d.]+, db;dur=[\d.]+;desc="(\d+) queries", render;dur=[\d.]+, serialize;dur=[\d.]+',
+            response["Server-Timing"],
+        )
+        self.assertEqual(int(timing.group(1)), query_count)
+        self.assertIn("POST /api/v1/bookings/ 201", logs.output[0])
+
+        stats = self.client.get("/api/v1/metrics").data["endpoints"]["POST /api/v1/bookings/"]
+        self.assertEqual((stats["requests"], stats["window"]), (1, 1))
+        self.assertEqual(stats["queries"]["max"], query_count)
+        self.assertGreater(stats["render_ms"]["max"], 0)
+        self.assertEqual(sum(stats["histogram_ms"].values()), 1)
+
+    def test_listing_serialization_is_timed(self):
+        self.book(user={"name": "ann", "age": 30}, room_type="PRIVATE")
+        self.client.get("/api/v1/bookings/")
+        stats = self.client.get("/api/v1/metrics").data["endpoints"]["GET /api/v1/bookings/"]
+        self.assertGreater(stats["serialize_ms"]["max"], 0)
+
+    def test_async_requests_are_measured(self):
+        middleware = RequestMetricsMiddleware(AsyncBookingsView.as_view())
+        self.assertTrue(iscoroutinefunction(middleware))
+        self.book(user={"name": "ann", "age": 30}, room_type="PRIVATE")
+        token = Token.objects.create(user=self.admin).key
+        request = AsyncRequestFactory().get("/api/v1/bookings/", headers={"Authorization": f"Token {token}"})
+        with self.assertLogs("roombooking.metrics", "INFO"):
+            response = async_to_sync(middleware)(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(request.request_metrics.queries, 0)
+        self.assertGreater(request.request_metrics.serialize, 0)
+
+    def test_routes_are_grouped_by_pattern(self):
+        for booking_id in (1, 2):
+            self.client.post(f"/api/v1/bookings/cancel/{booking_id}")
+        endpoints = self.client.get("/api/v1/metrics").data["endpoints"]
+        self.assertEqual(endpoints["POST /api/v1/bookings/cancel/<int:booking_id>"]["requests"], 2)
+
+    def test_stats_are_manager_only(self):
+        self.client.force_authenticate(AuthUser(username="guest"))
+        self.assertEqual(self.client.get("/api/v1/metrics").status_code, 403)
+
+    @override_settings(REQUEST_METRICS_ENABLED=False)
+    def test_disabled_middleware_is_unloaded(self):
+        response = APIClient().get("/api/v1/rooms/available")
+        self.assertNotIn("Server-Timing", response)
+
+
+class BookingIndexTests(TestCase):
+    """Every hot Booking access path must be answered from an index, never a full table scan."""
+
+    FULL_SCAN = {
+        "sqlite": re.compile(r"\bSCAN \w+$", re.MULTILINE),
+        "postgresql": re.compile(r"\bSeq Scan on\b"),
+    }
+
+    def assertUsesIndex(self, queryset):
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        plan = queryset.explain()
+        pattern = self.FULL_SCAN.get(connection.vendor)
+        if pattern is None:
+            self.skipTest(f"No plan parser for {connection.vendor}")
+        self.assertIsNone(pattern.search(plan), plan)
+
+    def test_hot_queries_use_indexes(self):
+        now = timezone.now()
+        queries = {
+            "slot occupancy": availability_queryset("SHARED", now, now + timedelta(minutes=90)),
+            "user conflict": overlapping(Booking.objects.filter(user_id=1, status="ACTIVE"), now, now + timedelta(hours=1)),
+            "current occupancy": Booking.objects.filter(start_time__lte=now, end_time__gte=now, status="ACTIVE"),
+            "listing": Booking.objects.order_by("-created_at")[:10],
+            "cancelled listing": Booking.objects.filter(status="CANCELLED").order_by("-created_at")[:10],
+            "keyset listing": Booking.objects.filter(
+                KeysetPagination.cursor_filter([("created_at", True), ("id", True)], [now, 100])
+            ).order_by("-created_at", "-id")[:10],
+        }
+        for name, queryset in queries.items():
+            with self.subTest(name):
+                self.assertUsesIndex(queryset)
+
+
+class BookingListingTests(BookingTestCase):
+    def setUp(self):
+        super().setUp()
+        create_rooms(private=4, conference=0, shared=0)
+        Room.objects.create(room_type="CONFERENCE", capacity=20, room_number="C1")
+        for day in range(1, 4):
+            slot = next_slot(days=day).isoformat()
+            for i in range(4):
+                self.book(user={"name": f"user{i}", "age": 30}, room_type="PRIVATE", slot=slot)
+            members = [{"name": f"member{day}-{i}", "age": 30} for i in range(5)]
+            self.book(team={"name": f"team{day}", "members": members}, room_type="CONFERENCE", slot=slot)
+
+    def test_lean_rows_match_model_serializer(self):
+        response = self.client.get("/api/v1/bookings/", {"page_size": 100})
+        queryset = Booking.objects.order_by("-created_at", "-id")
+        self.assertEqual(response.json()["results"], BookingSerializer(queryset, many=True).data)
+
+    def test_listing_query_count_is_pinned(self):
+        for page_size in (5, 15):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get("/api/v1/bookings/", {"page_size": page_size})
+            self.assertEqual(len(response.data["results"]), page_size)
+            # COUNT(*), the page itself and the members of every team on the page.
+            self.assertEqual(len(queries), 3)
+
+
+class BookingExportTests(BookingTestCase):
+    def setUp(self):
+        super().setUp()
+        create_rooms(private=2, conference=1, shared=0)
+        self.first = self.book(user={"name": "ann", "age": 30}, room_type="PRIVATE").data["booking_id"]
+        members = [{"name": f"member{i}", "age": 30} for i in range(3)]
+        self.book(team={"name": "crew", "members": members}, room_type="CONFERENCE", slot=next_slot(days=2).isoformat())
+        self.client.post(f"/api/v1/bookings/cancel/{self.first}")
+
+    def export(self, export_format, **params):
+        response = self.client.get(f"/api/v1/bookings/export.{export_format}", params)
+        if not response.streaming:
+            return response
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv_rows_are_flat(self):
+        rows = list(csv.DictReader(StringIO(self.export("csv"))))
+        self.assertEqual([row["status"] for row in rows], ["CANCELLED", "ACTIVE"])
+        self.assertEqual((rows[0]["room_number"], rows[0]["user_name"], rows[0]["team_name"]), ("P1", "ann", ""))
+        self.assertEqual((rows[1]["room_type"], rows[1]["team_name"]), ("CONFERENCE", "crew"))
+
+    def test_ndjson_with_filters(self):
+        lines = self.export("ndjson", status="active").splitlines()
+        self.assertEqual([json.loads(line)["team_name"] for line in lines], ["crew"])
+        self.assertEqual(self.export("ndjson", end=next_slot().date().isoformat()).count("\n"), 1)
+        self.assertEqual(self.export("ndjson", start=next_slot(days=3).date().isoformat()), "")
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.export("csv", status="pending").status_code, 400)
+        self.assertEqual(self.export("csv", start="last week").status_code, 400)
+        self.assertEqual(self.export("xlsx").status_code, 404)
+        self.client.force_authenticate(AuthUser(username="guest"))
+        self.assertEqual(self.export("csv").status_code, 403)
+
+    def test_management_command(self):
+        out, err = StringIO(), StringIO()
+        call_command("export_bookings", format="ndjson", status="cancelled", stdout=out, stderr=err)
+        self.assertEqual(json.loads(out.getvalue())["id"], self.first)
+        self.assertIn("Exported 1 bookings", err.getvalue())
+
+
+class ConditionalGetTests(BookingTestCase):
+    def setUp(self):
+        super().setUp()
+        create_rooms(private=2, conference=0, shared=0)
+
+    def test_unchanged_listings_are_not_modified(self):
+        for path, params in (
+            ("/api/v1/bookings/", {"page_size": 5}),
+            ("/api/v1/users/", {}),
+            ("/api/v1/rooms/available", {"room_type": "PRIVATE", "slot": self.slot.strftime("%Y-%m-%dT%H:%M")}),
+        ):
+            first = self.client.get(path, params)
+            self.assertTrue(first.has_header("Last-Modified"))
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(path, params, HTTP_IF_NONE_MATCH=first["ETag"])
+            self.assertEqual((response.status_code, len(queries)), (304, 0))
+            # Another page or filter is another resource.
+            self.assertNotEqual(self.client.get(path, {**params, "page": 1})["ETag"], first["ETag"])
+
+    def test_writes_change_the_etag(self):
+        etags = {path: self.client.get(path)["ETag"] for path in ("/api/v1/bookings/", "/api/v1/users/")}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book(user={"name": "ann", "age": 30}, room_type="PRIVATE")
+        for path, etag in etags.items():
+            response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()["count"], 1)
+
+    def test_room_changes_change_the_booking_etag(self):
+        self.book(user={"name": "ann", "age": 30}, room_type="PRIVATE")
+        etag = self.client.get("/api/v1/bookings/")["ETag"]
+        room = Room.objects.get(room_number="P1")
+        room.capacity = 2
+        with self.captureOnCommitCallbacks(execute=True):
+            room.save()
+        response = self.client.get("/api/v1/bookings/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"][0]["room"]["capacity"], 2)
+
+    @override_settings(CACHES={
+        alias: {"BACKEND": "django.core.cache.backends.db.DatabaseCache", "LOCATION": "roombooking_cache"}
+        for alias in ("default", "worker")
+    })
+    def test_counters_are_shared_through_the_cache_backend(self):
+        call_command("createcachetable")
+        etag = self.client.get("/api/v1/bookings/")["ETag"]
+        # Another process bumping the counter through its own connection to the backend.
+        caches["worker"].incr("version:bookings")
+        self.assertEqual(self.client.get("/api/v1/bookings/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_lost_counters_never_reuse_an_etag(self):
+        etag = self.client.get("/api/v1/bookings/")["ETag"]
+        cache.clear()
+        self.assertNotEqual(self.client.get("/api/v1/bookings/")["ETag"], etag)
+
+
+class AsyncBookingsViewTests(BookingListingTests):
+    def setUp(self):
+        super().setUp()
+        self.token = Token.objects.create(user=self.admin).key
+
+    def call(self, params=None, method="get", data=None):
+        factory = AsyncRequestFactory()
+        headers = {"Authorization": f"Token {self.token}"}
+        if method == "get":
+            request = factory.get("/api/v1/bookings/", params or {}, headers=headers)
+        else:
+            request = factory.post("/api/v1/bookings/", json.dumps(data), content_type="application/json", headers=headers)
+        return async_to_sync(AsyncBookingsView.as_view())(request)
+
+    def test_listing_matches_sync_view(self):
+        for params in ({}, {"page": 2, "page_size": 5}, {"status": "cancelled"}, {"cursor": "", "page_size": 4}):
+            response = self.call(params)
+            self.assertEqual(json.loads(response.content), self.client.get("/api/v1/bookings/", params).json())
+
+        cursor = self.client.get("/api/v1/bookings/", {"cursor": "", "page_size": 4}).json()["next"].split("cursor=")[1]
+        params = {"cursor": cursor.split("&")[0], "page_size": 4}
+        self.assertEqual(json.loads(self.call(params).content), self.client.get("/api/v1/bookings/", params).json())
+
+    def test_invalid_page(self):
+        response = self.call({"page": 99})
+        self.assertEqual((response.status_code, json.loads(response.content)), (404, {"detail": "Invalid page."}))
+
+    def test_post_is_handled_by_the_sync_view(self):
+        response = self.call(method="post", data={
+            "user": {"name": "zed", "age": 30}, "room_type": "PRIVATE", "slot": next_slot(days=5).isoformat(),
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Booking.objects.filter(id=response.data["booking_id"]).exists())
+
+
+class BookingCursorPaginationTests(BookingTestCase):
+    def setUp(self):
+        super().setUp()
+        create_rooms(private=4, conference=0, shared=0)
+        for day in range(1, 7):
+            for i in range(4):
+                self.book(user={"name": f"user{i}", "age": 30}, room_type="PRIVATE", slot=next_slot(days=day).isoformat())
+        # Ties on created_at must be broken by id.
+        tied = list(Booking.objects.order_by("id").values_list("id", flat=True)[2:5])
+        Booking.objects.filter(id__in=tied).update(created_at=Booking.objects.get(id=tied[1]).created_at)
+
+    def test_cursor_walk_matches_page_number_order(self):
+        expected = [row["id"] for row in self.client.get("/api/v1/bookings/", {"page_size": 100}).data["results"]]
+        seen = []
+        response = self.client.get("/api/v1/bookings/", {"cursor": "", "page_size": 5})
+        while True:
+            self.assertNotIn("count", response.data)
+            seen += [row["id"] for row in response.data["results"]]
+            if not response.data["next"]:
+                break
+            response = self.client.get(response.data["next"])
+        self.assertEqual(seen, expected)
+
+    def test_cursor_pages_skip_count_and_offset(self):
+        first = self.client.get("/api/v1/bookings/", {"cursor": "", "page_size": 5})
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(first.data["next"])
+        sql = " ".join(query["sql"] for query in queries).upper()
+        self.assertNotIn("COUNT(", sql)
+        self.assertNotIn("OFFSET", sql)
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/v1/bookings/", {"cursor": "garbage"})
+        self.assertEqual(response.status_code, 404)
+
+
+class BookingArchiveTests(BookingTestCase):
+    def setUp(self):
+        super().setUp()
+        create_rooms(private=2, conference=0, shared=0)
+        room, user = Room.objects.get(room_number="P1"), User.objects.create(name="ann", age=30)
+        old = timezone.now() - timedelta(days=200)
+        Booking.objects.bulk_create(
+            Booking(
+                room=room, user=user, booking_type="INDIVIDUAL", status="CANCELLED" if day % 3 == 0 else "ACTIVE",
+                start_time=next_slot(days=-150 + day), end_time=next_slot(days=-150 + day) + timedelta(hours=1),
+            )
+            for day in range(10)
+        )
+        Booking.objects.update(created_at=old)
+        self.book(user={"name": "bob", "age": 30}, room_type="PRIVATE")
+        cancelled = self.book(user={"name": "cat", "age": 30}, room_type="PRIVATE").data["booking_id"]
+        self.client.post(f"/api/v1/bookings/cancel/{cancelled}")
+
+    def ids(self, **params):
+        return [row["id"] for row in self.client.get("/api/v1/bookings/", {"page_size": 100, **params}).data["results"]]
+
+    def test_old_bookings_move_in_batches(self):
+        before = {"all": self.ids(), "cancelled": self.ids(status="cancelled")}
+        out = StringIO()
+        call_command("archive_bookings", dry_run=True, stdout=out)
+        self.assertIn("10 bookings would be archived", out.getvalue())
+
+        call_command("archive_bookings", batch_size=3, stdout=out)
+        self.assertIn("Archived 10 bookings", out.getvalue())
+        self.assertIn("rows/s", out.getvalue())
+        self.assertEqual(Booking.objects.count(), 2)
+        self.assertEqual(ArchivedBooking.objects.filter(status="CANCELLED").count(), 4)
+
+        self.assertEqual(len(self.ids(status="cancelled")), 1)
+        self.assertEqual(self.ids(status="cancelled", archived=1), before["cancelled"])
+        self.assertEqual(self.ids(archived="true"), before["all"])
+        self.assertEqual(self.client.get("/api/v1/bookings/", {"archived": 1, "page_size": 5}).data["count"], 12)
+
+    def test_exports_include_the_archive_on_request(self):
+        def export(**params):
+            response = self.client.get("/api/v1/bookings/export.ndjson", params)
+            return [json.loads(line)["id"] for line in b"".join(response.streaming_content).splitlines()]
+
+        expected = export()
+        call_command("archive_bookings", stdout=StringIO())
+        self.assertEqual(len(export()), 2)
+        self.assertEqual(export(archived=1), expected)
+        self.assertEqual(export(archived=1), sorted(expected))
+
+    def test_cursor_pages_merge_the_archive(self):
+        expected = self.ids()
+        call_command("archive_bookings", stdout=StringIO())
+        seen = []
+        response = self.client.get("/api/v1/bookings/", {"cursor": "", "page_size": 4, "archived": 1})
+        while True:
+            seen += [row["id"] for row in response.data["results"]]
+            if not response.data["next"]:
+                break
+            response = self.client.get(response.data["next"])
+        self.assertEqual(seen, expected)
+
+    def test_archived_days_keep_their_utilization(self):
+        call_command("backfill_utilization", stdout=StringIO())
+        before = sorted(DailyUtilization.objects.values_list("day", "seat_minutes"))
+        call_command("archive_bookings", stdout=StringIO())
+        call_command("backfill_utilization", stdout=StringIO())
+        self.assertEqual(sorted(DailyUtilization.objects.values_list("day", "seat_minutes")), before)
+        self.assertEqual(len(before), 7)
+        # The default range reaches back to the archived bookings.
+        DailyUtilization.objects.all().delete()
+        call_command("backfill_utilization", stdout=StringIO())
+        self.assertEqual(sorted(DailyUtilization.objects.values_list("day", "seat_minutes")), before)
+
+    def test_archived_bookings_give_back_their_seats(self):
+        for booking in Booking.objects.filter(status="ACTIVE", end_time__lt=timezone.now()):
+            self.assertTrue(claim_seats(seat_claims(booking.room, booking.start_time, booking.end_time)))
+        held = RoomSlotOccupancy.objects.filter(used__gt=0)
+        self.assertEqual(held.count(), 4 * 7)
+        call_command("archive_bookings", batch_size=4, stdout=StringIO())
+        # Only the buckets of bob's upcoming booking are left.
+        self.assertEqual(held.count(), 4)
+        self.assertFalse(RoomSlotOccupancy.objects.filter(start_time__lt=timezone.now()).exists())
+
+
+class BulkBookingTests(BookingTestCase):
+    def setUp(self):
+        super().setUp()
+        create_rooms(private=2, conference=1, shared=1)
+
+    def bulk(self, bookings, **options):
+        return self.client.post("/api/v1/bookings/bulk", {"bookings": bookings, **options}, format="json")
+
+    def individual(self, name, room_type="PRIVATE", **extra):
+        return {"user": {"name": name, "age": 30}, "room_type": room_type, "slot": self.slot.isoformat(), **extra}
+
+    def team(self, name, members, room_type="CONFERENCE"):
+        return {
+            "team": {"name": name, "members": [{"name": m, "age": 30} for m in members]},
+            "room_type": room_type, "slot": self.slot.isoformat(),
+        }
+
+    def test_user_overlap_violations_fail_their_items(self):
+        # Stand-in for the PostgreSQL booking_user_no_overlap constraint.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TRIGGER booking_user_no_overlap BEFORE INSERT ON bookings_booking "
+                "WHEN NEW.status = 'ACTIVE' AND EXISTS (SELECT 1 FROM bookings_booking WHERE user_id = NEW.user_id "
+                "AND status = 'ACTIVE' AND start_time < NEW.end_time AND end_time > NEW.start_time) "
+                "BEGIN SELECT RAISE(ABORT, 'booking_user_no_overlap'); END"
+            )
+        claim = services._claim_allocated_seats
+
+        def claim_then_book_concurrently(items):
+            claim(items)
+            Booking.objects.create(
+                room=Room.objects.get(room_number="P2"), user=User.objects.get(name="ann"), booking_type="INDIVIDUAL",
+                start_time=self.slot, end_time=self.slot + timedelta(hours=1),
+            )
+
+        with mock.patch("bookings.services._claim_allocated_seats", claim_then_book_concurrently):
+            response = self.bulk([
+                {"user": {"name": "ann", "age": 30}, "room_type": "PRIVATE", "slot": self.slot.isoformat()},
+                {"user": {"name": "bob", "age": 30}, "room_type": "PRIVATE", "slot": self.slot.isoformat()},
+            ])
+        self.assertEqual(
+            [result.get("room", result.get("error")) for result in response.data["results"]],
+            ["User already has a booking in this slot.", "P2"],
+        )
+        # The rejected item gave its seat back.
+        self.assertFalse(RoomSlotOccupancy.objects.filter(room__room_number="P1", used__gt=0).exists())
+
+    def test_items_move_to_the_next_room_when_their_claim_fails(self):
+        # P1's seat was taken by a writer whose booking row is not visible yet.
+        claim_seats(seat_claims(Room.objects.get(room_number="P1"), self.slot, self.slot + timedelta(hours=1)))
+        response = self.bulk([self.individual("ann"), self.individual("bob")])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"][0]["room"], "P2")
+        self.assertEqual(response.data["results"][1]["error"], "No available room for the selected slot and type.")
+
+    def test_same_rules_as_single_bookings(self):
+        self.book(user={"name": "early", "age": 30}, room_type="SHARED")
+        response = self.bulk([
+            self.individual("ann"),
+            self.individual("bob"),
+            self.individual("cat"),
+            self.individual("ann", room_type="SHARED"),
+            self.individual("early", room_type="SHARED"),
+            self.team("small", ["x", "y"]),
+            self.team("devs", ["d1", "d2", "d3"]),
+            self.team("devs2", ["d4", "d5", "d6"]),
+            self.individual("dan", room_type="CONFERENCE"),
+            {"room_type": "PRIVATE", "slot": self.slot.isoformat()},
+            self.individual("eve", room_type="LOUNGE"),
+        ])
+        self.assertEqual(response.status_code, 200)
+        results = response.data["results"]
+        self.assertEqual([r.get("room") for r in results[:2]], ["P1", "P2"])
+        self.assertEqual(results[2]["error"], "No available room for the selected slot and type.")
+        self.assertEqual(results[3]["error"], "User already has a booking in this slot.")
+        self.assertEqual(results[4]["error"], "User already has a booking in this slot.")
+        self.assertEqual(results[5]["error"], "Conference rooms require at least 3 team members (excluding children).")
+        self.assertEqual(results[6]["room"], "C1")
+        self.assertEqual(results[7]["error"], "No available room for the selected slot and type.")
+        self.assertEqual(results[8]["error"], "Conference rooms can only be booked by teams.")
+        self.assertEqual(results[9]["error"], "Must provide either user or team.")
+        self.assertIn("Invalid room type", results[10]["error"])
+        self.assertEqual(Booking.objects.filter(status="ACTIVE").count(), 4)
+        self.assertEqual(User.objects.filter(name="ann").count(), 1)
+
+    def test_shared_desks_fill_up_to_capacity(self):
+        response = self.bulk([self.individual(f"u{i}", room_type="SHARED") for i in range(5)])
+        self.assertEqual([r.get("room") for r in response.data["results"]], ["S1"] * 4 + [None])
+
+    def test_all_or_nothing_rolls_back(self):
+        users_before = User.objects.count()
+        response = self.bulk([self.individual("ann"), self.team("small", ["x"])], all_or_nothing=True)
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(all("error" in result for result in response.data["results"]))
+        self.assertFalse(Booking.objects.exists())
+        self.assertEqual(User.objects.count(), users_before)
+
+    def test_query_count_is_independent_of_batch_size(self):
+        Room.objects.bulk_create(Room(room_type="SHARED", capacity=4, room_number=f"X{i}") for i in range(100))
+        counts = []
+        for size, day in ((10, 2), (100, 3), (300, 4)):
+            slot = next_slot(days=day).isoformat()
+            batch = [dict(self.individual(f"d{day}-{i}", room_type="SHARED"), slot=slot) for i in range(size)]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.bulk(batch)
+            self.assertEqual(response.status_code, 201)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+        # Beyond ~100 rows SQLite's bound-parameter limit splits each INSERT into batches.
+        self.assertLessEqual(counts[2], counts[0] + 4)
+
+
+class SlotOccupancyTests(BookingTestCase):
+    def occupancy(self):
+        return dict(RoomSlotOccupancy.objects.values_list("room__room_number", "used"))
+
+    def test_booking_and_cancel_keep_counter_in_sync(self):
+        create_rooms(private=1, conference=0, shared=1)
+        booking_id = self.book(user={"name": "ann", "age": 30}, room_type="SHARED").data["booking_id"]
+        self.book(user={"name": "bob", "age": 30}, room_type="SHARED")
+        self.book(user={"name": "cat", "age": 30}, room_type="PRIVATE")
+        self.assertEqual(self.occupancy(), {"S1": 2, "P1": 1})
+
+        self.assertEqual(self.client.post(f"/api/v1/bookings/cancel/{booking_id}").status_code, 200)
+        self.assertEqual(self.client.post(f"/api/v1/bookings/cancel/{booking_id}").status_code, 404)
+        self.assertEqual(self.occupancy(), {"S1": 1, "P1": 1})
+
+    def test_deleting_or_cancelling_outside_the_api_frees_seats(self):
+        create_rooms(private=1, conference=0, shared=1)
+        self.book(user={"name": "ann", "age": 30}, room_type="PRIVATE")
+        booking_id = self.book(user={"name": "bob", "age": 30}, room_type="SHARED").data["booking_id"]
+        # Deleting the user cascades to the booking.
+        User.objects.get(name="ann").delete()
+        booking = Booking.objects.get(pk=booking_id)
+        booking.status = "CANCELLED"
+        booking.save()
+        booking.save()
+        self.assertEqual(self.occupancy(), {"S1": 0, "P1": 0})
+        self.assertEqual(self.book(user={"name": "cat", "age": 30}, room_type="PRIVATE").data["room"], "P1")
+
+    def test_claims_are_all_or_nothing(self):
+        create_rooms(private=1, conference=0, shared=1)
+        private, shared = Room.objects.get(room_number="P1"), Room.objects.get(room_number="S1")
+        self.assertTrue(claim_seats({(shared, self.slot): 3}))
+        self.assertFalse(claim_seats({(private, self.slot): 1, (shared, self.slot): 2}))
+        self.assertEqual(self.occupancy(), {"S1": 3, "P1": 0})
+        self.assertTrue(claim_seats({(private, self.slot): 1, (shared, self.slot): 1}))
+        self.assertFalse(claim_seats({(private, self.slot): 1}))
+        self.assertEqual(self.occupancy(), {"S1": 4, "P1": 1})
+
+    def test_counter_is_the_source_of_truth_for_claims(self):
+        create_rooms(private=2, conference=0, shared=0)
+        # P1 was claimed by a writer whose booking row is not visible yet.
+        claim_seats({(Room.objects.get(room_number="P1"), self.slot): 1})
+        response = self.book(user={"name": "ann", "age": 30}, room_type="PRIVATE")
+        self.assertEqual(response.data["room"], "P2")
+
+
+def retry_locked(func, attempts=50):
+    """Call ``func`` again while SQLite turns the writer away for holding a lock."""
+    for attempt in range(attempts):
+        try:
+            return func()
+        except OperationalError:
+            time.sleep(0.005 * (attempt + 1))
+    raise AssertionError("database stayed locked")
+
+
+def race(threads, func):
+    """Run ``func(i)`` on ``threads`` threads released at the same instant."""
+    barrier = threading.Barrier(threads)
+    results = [None] * threads
+
+    def run(i):
+        barrier.wait()
+        try:
+            results[i] = func(i)
+        finally:
+            connections.close_all()
+
+    workers = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return results
+
+
+class IntervalBookingTests(BookingTestCase):
+    def setUp(self):
+        super().setUp()
+        create_rooms(private=2, conference=0, shared=0)
+
+    def at(self, minutes):
+        return (self.slot + timedelta(minutes=minutes)).isoformat()
+
+    def test_availability_slots_with_an_offset(self):
+        self.book(user={"name": "ann", "age": 30}, room_type="PRIVATE")
+        naive = self.client.get("/api/v1/rooms/available", {
+            "room_type": "PRIVATE", "slot": timezone.localtime(self.slot).strftime("%Y-%m-%dT%H:%M"),
+        })
+        aware = self.client.get("/api/v1/rooms/available", {"room_type": "PRIVATE", "slot": self.at(0)})
+        self.assertEqual(aware.status_code, 200)
+        self.assertEqual(aware.json(), naive.json())
+        self.assertEqual([room["room_number"] for room in aware.json()], ["P2"])
+
+    def test_durations_and_partial_overlaps(self):
+        first = self.book(user={"name": "ann", "age": 30}, room_type="PRIVATE", duration=90)
+        self.assertEqual(first.status_code, 201)
+        booking = Booking.objects.get(pk=first.data["booking_id"])
+        self.assertEqual(booking.end_time - booking.start_time, timedelta(minutes=90))
+
+        overlapping_user = self.book(user={"name": "ann", "age": 30}, room_type="PRIVATE", slot=self.at(60))
+        self.assertEqual(overlapping_user.data, {"error": "User already has a booking in this slot."})
+        self.assertEqual(self.book(user={"name": "bob", "age": 30}, room_type="PRIVATE", slot=self.at(60)).data["room"], "P2")
+        # Half-open intervals: back to back shares the room and is no conflict for the user.
+        back_to_back = self.book(user={"name": "ann", "age": 30}, room_type="PRIVATE", slot=self.at(90), duration=30)
+        self.assertEqual(back_to_back.data["room"], "P1")
+
+    def test_invalid_slots_and_durations(self):
+        for extra in ({"slot": self.at(7)}, {"duration": 20}, {"duration": 0}, {"duration": 495}, {"duration": "long"},
+                      {"duration": 10**20}):
+            with self.subTest(extra):
+                response = self.book(user={"name": "ann", "age": 30}, room_type="PRIVATE", **extra)
+                self.assertEqual(response.status_code, 400)
+        self.assertFalse(Booking.objects.exists())
+        response = self.client.get("/api/v1/rooms/available", {
+            "room_type": "PRIVATE", "slot": self.slot.strftime("%Y-%m-%dT%H:%M"), "duration": 10**20,
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def test_seats_are_claimed_and_released_per_bucket(self):
+        booking_id = self.book(user={"name": "ann", "age": 30}, room_type="PRIVATE", duration=45).data["booking_id"]
+        self.assertEqual(RoomSlotOccupancy.objects.filter(used=1).count(), 3)
+        self.client.post(f"/api/v1/bookings/cancel/{booking_id}")
+        self.assertFalse(RoomSlotOccupancy.objects.filter(used__gt=0).exists())
+
+    def test_bulk_items_see_earlier_intervals(self):
+        response = self.client.post("/api/v1/bookings/bulk", {"bookings": [
+            {"user": {"name": "ann", "age": 30}, "room_type": "PRIVATE", "slot": self.at(0), "duration": 120},
+            {"user": {"name": "ann", "age": 30}, "room_type": "PRIVATE", "slot": self.at(105)},
+            {"user": {"name": "bob", "age": 30}, "room_type": "PRIVATE", "slot": self.at(60)},
+            {"user": {"name": "cat", "age": 30}, "room_type": "PRIVATE", "slot": self.at(90)},
+            {"user": {"name": "dan", "age": 30}, "room_type": "PRIVATE", "slot": self.at(120)},
+        ]}, format="json")
+        self.assertEqual(
+            [result.get("room", result.get("error")) for result in response.data["results"]],
+            ["P1", "User already has a booking in this slot.", "P2",
+             "No available room for the selected slot and type.", "P1"],
+        )
+
+    def test_interval_set_concurrency(self):
+        start = self.slot
+        intervals = IntervalSet([(start, start + timedelta(hours=2)), (start + timedelta(hours=1), start + timedelta(hours=3))])
+        intervals.add(start + timedelta(hours=3), start + timedelta(hours=4))
+        self.assertEqual(intervals.max_overlap(start, start + timedelta(hours=1)), 1)
+        self.assertEqual(intervals.max_overlap(start, start + timedelta(hours=4)), 2)
+        self.assertEqual(intervals.max_overlap(start + timedelta(hours=2), start + timedelta(hours=4)), 1)
+        self.assertEqual(len(intervals.overlapping(start + timedelta(hours=4), start + timedelta(hours=5))), 0)
+
+
+@override_settings(BOOKING_SERIES_WINDOW_DAYS=7)
+class BookingSeriesTests(BookingTestCase):
+    def setUp(self):
+        super().setUp()
+        create_rooms(private=2, conference=0, shared=0)
+        # A Monday, so weekday series start on their first day.
+        self.monday = self.slot + timedelta(days=7 - self.slot.weekday())
+
+    def series(self, name="ann", slot=None, **recurrence):
+        recurrence.setdefault("frequency", "WEEKLY")
+        return self.client.post("/api/v1/bookings/series", {
+            "user": {"name": name, "age": 30}, "room_type": "PRIVATE",
+            "slot": slot or self.monday.isoformat(), "recurrence": recurrence,
+        }, format="json")
+
+    def team_series(self, members, **recurrence):
+        return self.client.post("/api/v1/bookings/series", {
+            "team": {"name": "team", "members": [{"name": name, "age": 30} for name in members]},
+            "room_type": "CONFERENCE", "slot": self.monday.isoformat(),
+            "recurrence": {"frequency": "WEEKLY", **recurrence},
+        }, format="json")
+
+    def test_weekday_series_keeps_one_room_and_materializes_a_window(self):
+        Booking.objects.create(
+            room=Room.objects.get(room_number="P1"), user=User.objects.create(name="bob", age=30),
+            start_time=self.monday + timedelta(weeks=3, days=2), end_time=self.monday + timedelta(weeks=3, days=2, hours=1),
+            booking_type="INDIVIDUAL",
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.series(weekdays=["MO", "WE", "FR"], count=30)
+        self.assertEqual(response.status_code, 201, response.data)
+        # P1 is taken on one occurrence, so the whole series moves to P2.
+        self.assertEqual(response.data["room"], "P2")
+        self.assertEqual(response.data["occurrences"], 30)
+        self.assertLess(len(queries), 30)
+        bookings = Booking.objects.filter(series_id=response.data["series_id"])
+        self.assertEqual(bookings.count(), response.data["materialized"])
+        self.assertLess(bookings.count(), 30)
+        self.assertEqual({booking.start_time.weekday() for booking in bookings}, {0, 2, 4})
+        # Every occurrence holds its seat, materialized or not.
+        self.assertEqual(RoomSlotOccupancy.objects.filter(room__room_number="P2", used=1).count(), 30 * 4)
+
+    def test_held_occurrences_beyond_the_window_are_taken(self):
+        self.assertEqual(self.series(frequency="DAILY", count=30).data["room"], "P1")
+        later = self.monday + timedelta(days=20)
+        self.assertFalse(Booking.objects.filter(start_time=later).exists())
+        for index_enabled in (False, True):
+            with self.subTest(index_enabled=index_enabled), override_settings(OCCUPANCY_INDEX_ENABLED=index_enabled):
+                available = self.client.get("/api/v1/rooms/available", {"room_type": "PRIVATE", "slot": later.isoformat()})
+                self.assertEqual([room["room_number"] for room in available.json()], ["P2"])
+                grid = self.client.get("/api/v1/rooms/availability-grid", {
+                    "room_type": "PRIVATE", "start": timezone.localdate(later).isoformat(),
+                })
+                grid = json.loads(b"".join(grid.streaming_content))
+                index = grid["slots"].index(later.isoformat())
+                self.assertEqual({room["room_number"]: room["remaining"][index] for room in grid["rooms"]}, {"P1": 0, "P2": 1})
+        response = self.client.post("/api/v1/bookings/bulk", {"bookings": [
+            {"user": {"name": "bob", "age": 30}, "room_type": "PRIVATE", "slot": later.isoformat()},
+        ]}, format="json")
+        self.assertEqual(response.data["results"][0]["room"], "P2")
+
+    def test_conflicting_occurrence_is_reported(self):
+        self.book(user={"name": "ann", "age": 30}, room_type="PRIVATE", slot=(self.monday + timedelta(days=2)).isoformat())
+        response = self.series(frequency="DAILY", count=5)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["error"], "User already has a booking in this slot.")
+        self.assertEqual(response.data["details"], {"occurrence": (self.monday + timedelta(days=2)).isoformat()})
+
+    def test_invalid_recurrences(self):
+        for recurrence in ({"until": "2030-01-01", "count": 2}, {}, {"frequency": "HOURLY", "count": 2}, {"count": 400}):
+            with self.subTest(recurrence):
+                self.assertEqual(self.series(**recurrence).status_code, 400)
+        self.assertFalse(Booking.objects.exists())
+
+    def test_slot_without_offset(self):
+        response = self.series(slot=timezone.localtime(self.monday).strftime("%Y-%m-%dT%H:%M"), count=3)
+        self.assertEqual(response.status_code, 201, response.data)
+        series = BookingSeries.objects.get(pk=response.data["series_id"])
+        self.assertEqual((series.start_time, series.last_start), (self.monday, self.monday + timedelta(weeks=2)))
+
+    def test_daily_steps_that_never_reach_a_weekday(self):
+        response = self.series(frequency="DAILY", interval=7, weekdays=["TU"], count=3)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["error"], "The recurrence has no occurrences.")
+        self.assertEqual(self.series(frequency="DAILY", interval=14, weekdays=["MO"], count=3).data["occurrences"], 3)
+
+    def test_team_series_conflict_with_member_series(self):
+        create_rooms(private=0, conference=1, shared=0)
+        self.assertEqual(self.team_series(["ann", "bob", "cat"], count=4).status_code, 201)
+        response = self.series(name="bob", count=4)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["error"], "User already has a booking in this slot.")
+
+        # A single booking made meanwhile by a member wins over the team's occurrence.
+        series_id = self.team_series(["dan", "eve", "fay"], interval=2, count=3, weekdays=["TU"]).data["series_id"]
+        clash = self.monday + timedelta(weeks=2, days=1)
+        self.book(user={"name": "eve", "age": 30}, room_type="PRIVATE", slot=clash.isoformat())
+        self.assertEqual(materialize_due(now=self.monday + timedelta(days=60))["skipped"], 1)
+        self.assertNotIn(clash, Booking.objects.filter(series_id=series_id).values_list("start_time", flat=True))
+
+    def test_rolling_materialization_and_cancel(self):
+        series_id = self.series(frequency="DAILY", until=(self.monday + timedelta(days=20)).date().isoformat()).data["series_id"]
+        # A single booking made meanwhile over a later occurrence wins over the series.
+        clash = self.monday + timedelta(days=18)
+        self.book(user={"name": "ann", "age": 30}, room_type="PRIVATE", slot=clash.isoformat())
+
+        out = StringIO()
+        call_command("materialize_series", stdout=out)
+        self.assertIn("Materialized 0 bookings", out.getvalue())
+        totals = materialize_due(now=self.monday + timedelta(days=30))
+        self.assertEqual(totals["series"], 1)
+        self.assertEqual(totals["skipped"], 1)
+        self.assertEqual(materialize_due(now=self.monday + timedelta(days=30))["series"], 0)
+        starts = set(Booking.objects.filter(series_id=series_id).values_list("start_time", flat=True))
+        self.assertEqual(len(starts), 20)
+        self.assertEqual(Booking.objects.filter(user__name="ann", start_time=clash).count(), 1)
+        self.assertNotIn(clash, starts)
+
+        response = self.client.post(f"/api/v1/bookings/series/{series_id}/cancel")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Booking.objects.filter(series_id=series_id, status="ACTIVE").exists())
+        # Only the single booking still holds seats.
+        self.assertEqual(sum(RoomSlotOccupancy.objects.values_list("used", flat=True)), 4)
+        self.assertEqual(self.client.post(f"/api/v1/bookings/series/{series_id}/cancel").status_code, 404)
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    """
+    Threads race for the same slot; no room may ever end up over-booked.
+
+    On SQLite writers are also serialized by the database lock, so a writer
+    refused with "database is locked" retries like a real client would.
+    """
+
+    threads = 24
+
+    def setUp(self):
+        cache.clear()
+        create_rooms(private=3, conference=0, shared=2)
+        self.slot = next_slot()
+
+    def test_concurrent_claims_never_overbook(self):
+        private, shared = Room.objects.get(room_number="P1"), Room.objects.get(room_number="S1")
+
+        def claim(i):
+            room = private if i % 2 else shared
+            return room.room_number, retry_locked(lambda: claim_seats({(room, self.slot): 1}))
+
+        results = race(self.threads, claim)
+        self.assertEqual(results.count(("P1", True)), 1)
+        self.assertEqual(results.count(("S1", True)), 4)
+        self.assertEqual(dict(RoomSlotOccupancy.objects.values_list("room__room_number", "used")), {"P1": 1, "S1": 4})
+
+    def test_concurrent_bookings_never_overbook(self):
+        def book(i):
+            # got_request_exception is global: a raising client would also raise
+            # other threads' errors, so locked requests are retried on their 500.
+            client = APIClient(raise_request_exception=False)
+            client.force_authenticate(AuthUser(username="admin"))
+            payload = {
+                "user": {"name": f"user{i}", "age": 30},
+                "room_type": "PRIVATE" if i % 2 else "SHARED",
+                "slot": self.slot.isoformat(),
+            }
+            for attempt in range(50):
+                status = client.post("/api/v1/bookings/", payload, format="json").status_code
+                if status != 500:
+                    return status
+                time.sleep(0.005 * (attempt + 1))
+            raise AssertionError("database stayed locked")
+
+        statuses = race(self.threads, book)
+        self.assertGreater(statuses.count(201), 0)
+        self.assertLessEqual(statuses.count(201), 3 + 2 * 4)
+        for room in Room.objects.all():
+            booked = Booking.objects.filter(room=room, status="ACTIVE").count()
+            self.assertLessEqual(booked, room.seat_limit, room.room_number)
+            used = RoomSlotOccupancy.objects.filter(room=room).values_list("used", flat=True).first() or 0
+            self.assertEqual(used, booked, room.room_number)
+
+
+class ReplayRequestsTests(TransactionTestCase):
+    def test_report_per_endpoint(self):
+        create_rooms(private=1, conference=0, shared=0)
+        slot = next_slot().strftime("%Y-%m-%dT%H:%M")
+        lines = [
+            {"path": "/api/v1/rooms/available", "params": {"room_type": "PRIVATE", "slot": slot}},
+            {"method": "POST", "path": "/api/v1/bookings/",
+             "body": {"user": {"name": "alice", "age": 30}, "room_type": "PRIVATE", "slot": slot}},
+            {"method": "POST", "path": "/api/v1/bookings/cancel/{last_booking_id}"},
+            {"request_id": "not-a-request"},
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            source, output = os.path.join(tmp, "requests.jsonl"), os.path.join(tmp, "report.json")
+            with open(source, "w") as fh:
+                fh.write("\n".join(json.dumps(line) for line in lines))
+            call_command("replay_requests", file=source, threads=1, output=output, stdout=StringIO())
+            with open(output) as fh:
+                report = json.load(fh)
+
+        self.assertEqual(report["meta"]["skipped_lines"], 1)
+        self.assertEqual(report["total"]["requests"], 3)
+        endpoints = report["endpoints"]
+        self.assertEqual(set(endpoints), {"GET rooms/available", "POST bookings", "POST bookings/cancel"})
+        self.assertEqual(endpoints["POST bookings"]["statuses"], {"201": 1})
+        self.assertEqual(endpoints["POST bookings/cancel"]["statuses"], {"200": 1})
+        self.assertEqual(endpoints["GET rooms/available"]["queries"]["max"], 1)
+        self.assertEqual(set(endpoints["POST bookings"]["latency_ms"]), {"mean", "p50", "p95", "p99", "max"})
+        self.assertFalse(Booking.objects.filter(status="ACTIVE").exists())
@@ -1,10 +1,23 @@
+from django.conf import settings
 from django.urls import path
 from bookings.views import (
+    AsyncBookingsView,
     BookingsView,
     BookingCancelView,
+    BulkBookingView,
+    BookingExportView,
+    BookingSeriesView,
+    BookingSeriesCancelView,
 )
 
+if settings.ASYNC_VIEWS_ENABLED:
+    BookingsView = AsyncBookingsView
+
 urlpatterns = [
     path('', BookingsView.as_view(), name='bookings'),
+    path('bulk', BulkBookingView.as_view(), name='bookings-bulk'),
+    path('export.<str:export_format>', BookingExportView.as_view(), name='bookings-export'),
     path('cancel/<int:booking_id>', BookingCancelView.as_view(), name='booking-cancel'),
+    path('series', BookingSeriesView.as_view(), name='booking-series'),
+    path('series/<int:series_id>/cancel', BookingSeriesCancelView.as_view(), name='booking-series-cancel'),
 ] 
\ No newline at end of file
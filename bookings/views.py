@@ -1,15 +1,23 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from .models import Booking
-from rooms.models import Room
+from .models import ArchivedBooking, Booking
+from .export import CONTENT_TYPES, LINE_WRITERS, export_rows, include_archived, parse_filters
+from .signals import bookings_changed
 from users.models import User
-from .serializers import BookingSerializer, TeamSerializer
+from .serializers import TeamSerializer, BOOKING_ROW_FIELDS, serialize_booking_rows, team_memberships
+from .intervals import overlapping
+from .series import cancel_series, create_series
+from .services import book_many, release_seat, reserve_room, booking_rule_error, parse_duration, parse_slot, team_conflict_error, MAX_BULK_BOOKINGS, MAX_BACKGROUND_BULK_BOOKINGS
 from users.serializers import UserSerializer
-from django.utils.dateparse import parse_datetime
-from django.db import transaction
-from datetime import  timedelta
+from django.db import IntegrityError, transaction
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
 
-from roombooking.utils import StandardResultsSetPagination
+from jobs.queue import enqueue
+from jobs.views import job_accepted
+from roombooking.async_api import AsyncAPIView
+from roombooking.utils import StandardResultsSetPagination, KeysetPagination
+from roombooking.versioning import conditional_on
 from roombooking.permissions import IsManagerOrAdmin
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
@@ -28,6 +36,14 @@ class BookingsView(APIView):
     
     GET Query Parameters:
         status (str, optional): Filter bookings by status (e.g., 'cancelled')
+        archived (bool, optional): Also list bookings moved to the archive
+            (``manage.py archive_bookings``), e.g. ``?status=cancelled&archived=1``
+        cursor (str, optional): Switch to cursor pagination; send it empty for
+            the first page and follow the ``next`` link afterwards
+        page, page_size (int, optional): Page-number pagination controls
+    
+    GET responses carry an ETag and Last-Modified; while no booking or user
+    changed, a matching If-None-Match is answered with 304 Not Modified.
     
     POST Request Body:
         {
@@ -47,15 +63,20 @@ class BookingsView(APIView):
                 ]
             },
             "room_type": str,  # One of: "PRIVATE", "CONFERENCE", "SHARED"
-            "slot": str  # ISO 8601 format (YYYY-MM-DDTHH:MM)
+            "slot": str,  # ISO 8601 format (YYYY-MM-DDTHH:MM), on a 15-minute boundary
+            "duration": int  # optional, minutes: a multiple of 15 up to 480 (default 60)
         }
     
+    A booking covers ``[slot, slot + duration)``; it conflicts with bookings
+    of the same user overlapping that interval, and takes a room's seat for
+    all of it.
+    
     Returns:
         GET: Paginated list of bookings
         POST: Created booking details with booking_id and room number
     
     Error Responses:
-        - 400: Invalid request data
+        - 400: Invalid request data, slot or duration
         - 400: Room type restrictions not met
         - 400: No available rooms
         - 400: User/team member already has a booking
@@ -63,17 +84,33 @@ class BookingsView(APIView):
     """
     permission_classes = [IsManagerOrAdmin]
     pagination_class = StandardResultsSetPagination
+    ordering = ('-created_at', '-id')
     
+    @conditional_on('bookings', 'users', 'rooms')
     def get(self, request):
-        if request.query_params.get('status') == 'cancelled':
-            queryset = Booking.objects.filter(status='CANCELLED').order_by('-created_at')
-        else:
-            queryset = Booking.objects.all().order_by('-created_at')
-       
-        paginator = self.pagination_class()
+        queryset, paginator = self.listing(request)
         page = paginator.paginate_queryset(queryset, request)
-        serializer = BookingSerializer(page, many=True)
-        return paginator.get_paginated_response(serializer.data)
+        return paginator.get_paginated_response(serialize_booking_rows(page))
+
+    @classmethod
+    def listing(cls, request):
+        """
+        The row queryset and paginator answering a GET request.
+        
+        With ``archived``, cursor pagination gets the queryset of each table
+        (it pages both and merges them); page numbers get their UNION.
+        """
+        tables = [Booking.objects.all()]
+        if include_archived(request.query_params.get('archived')):
+            tables.append(ArchivedBooking.objects.all())
+        if request.query_params.get('status') == 'cancelled':
+            tables = [table.filter(status='CANCELLED') for table in tables]
+        parts = [table.values(*BOOKING_ROW_FIELDS) for table in tables]
+
+        if KeysetPagination.requested(request):
+            return (parts[0] if len(parts) == 1 else parts), KeysetPagination(cls.ordering)
+        queryset = parts[0] if len(parts) == 1 else parts[0].union(*parts[1:], all=True)
+        return queryset.order_by(*cls.ordering), cls.pagination_class()
     
     
     @transaction.atomic
@@ -81,18 +118,13 @@ class BookingsView(APIView):
         data = request.data
         
         room_type = data.get("room_type")
-        slot = data.get("slot")
-   
-        if room_type not in ["PRIVATE", "CONFERENCE", "SHARED"]:
-            return Response({"error": "Invalid room type. Must be one of: PRIVATE, CONFERENCE, SHARED"}, status=400)
-        if not slot or not isinstance(slot, str):
-            return Response({"error": "Slot is invalid, must be a string in the format YYYY-MM-DDTHH:MM."}, status=400)
-        
-        
-        start_time = parse_datetime(slot)
-        if not start_time:
-            return Response({"error": "Invalid slot format. Use ISO 8601."}, status=400)
-        end_time = start_time + timedelta(hours=1)
+        start_time, error = parse_slot(room_type, data.get("slot"))
+        if error:
+            return Response({"error": error}, status=400)
+        duration, error = parse_duration(data.get("duration"))
+        if error:
+            return Response({"error": error}, status=400)
+        end_time = start_time + duration
 
      
         user_data = data.get("user")
@@ -100,7 +132,7 @@ class BookingsView(APIView):
         booking_type = None
         user = None
         team = None
-        headcount = 0
+        members = []
         
 
         if user_data:
@@ -119,71 +151,190 @@ class BookingsView(APIView):
             )
 
       
-            if Booking.objects.filter(user=user, start_time=start_time, status="ACTIVE").exists():
+            if overlapping(Booking.objects.filter(user=user, status="ACTIVE"), start_time, end_time).exists():
                 return Response({"error": "User already has a booking in this slot."}, status=400)
-            headcount = 1 if user.age >= 10 else 0
         elif team_data:
             booking_type = "TEAM"
             team_serializer = TeamSerializer(data=team_data)
             if not team_serializer.is_valid():
                 return Response({"error": "Invalid team data.", "details": team_serializer.errors}, status=400)
             team = team_serializer.save()
-    
-            for member in team.members.all():
-                if Booking.objects.filter(user=member, start_time=start_time, status="ACTIVE").exists():
-                    return Response({"error": f"Team member {member.name} already has a booking in this slot."}, status=400)
+            members = list(team.members.all())
 
-            headcount = sum(1 for m in team.members.all() if m.age >= 10)
-            if headcount < 3 and room_type == "CONFERENCE":
-                return Response({"error": "Conference rooms require at least 3 team members (excluding children)."}, status=400)
+            error = team_conflict_error(members, start_time, end_time)
+            if error:
+                return Response({"error": error}, status=400)
         else:
             return Response({"error": "Must provide either user or team."}, status=400)
 
    
-        available_room = None
-        if room_type == "PRIVATE":
-            if booking_type != "INDIVIDUAL":
-                return Response({"error": "Private rooms can only be booked by individuals."}, status=400)
-      
-            for room in Room.objects.filter(room_type="PRIVATE"):
-                if not Booking.objects.filter(room=room, start_time=start_time, status="ACTIVE").exists():
-                    available_room = room
-                    break
-        elif room_type == "CONFERENCE":
-            if booking_type != "TEAM":
-                return Response({"error": "Conference rooms can only be booked by teams."}, status=400)
-            for room in Room.objects.filter(room_type="CONFERENCE"):
-                if not Booking.objects.filter(room=room, start_time=start_time, status="ACTIVE").exists():
-                    available_room = room
-                    break
-        elif room_type == "SHARED":
-            if booking_type != "INDIVIDUAL":
-                return Response({"error": "Shared desks can only be booked by individuals."}, status=400)
-     
-            for room in Room.objects.filter(room_type="SHARED"):
-             
-                current_bookings = Booking.objects.filter(room=room, start_time=start_time, status="ACTIVE").count()
-                if current_bookings < room.capacity:
-                    available_room = room
-                    break
-        else:
-            return Response({"error": "Invalid room type."}, status=400)
+        error = booking_rule_error(room_type, booking_type, members)
+        if error:
+            return Response({"error": error}, status=400)
+
+        available_room = reserve_room(room_type, start_time, end_time)
 
         if not available_room:
             return Response({"error": "No available room for the selected slot and type."}, status=400)
 
   
-        booking = Booking.objects.create(
-            room=available_room,
-            user=user,
-            team=team,
-            start_time=start_time,
-            end_time=end_time,
-            booking_type=booking_type,
-            status="ACTIVE"
-        )
+        try:
+            with transaction.atomic():
+                booking = Booking.objects.create(
+                    room=available_room,
+                    user=user,
+                    team=team,
+                    start_time=start_time,
+                    end_time=end_time,
+                    booking_type=booking_type,
+                    status="ACTIVE"
+                )
+        except IntegrityError:
+            # booking_user_no_overlap (PostgreSQL): a concurrent request booked the same user.
+            transaction.set_rollback(True)
+            return Response({"error": "User already has a booking in this slot."}, status=400)
         return Response({"booking_id": booking.id, "room": available_room.room_number}, status=201)
 
+class AsyncBookingsView(AsyncAPIView):
+    """
+    Async ``BookingsView`` for ASGI deployments.
+    
+    GET lists bookings through the async ORM with the same parameters and
+    payload as ``BookingsView.get``. POST is handed to the transactional
+    ``BookingsView`` unchanged. Only accessible by managers and administrators.
+    """
+    manager_only = True
+
+    @conditional_on('bookings', 'users', 'rooms')
+    async def get(self, request):
+        queryset, paginator = BookingsView.listing(request)
+        page = await paginator.apaginate_queryset(queryset, request)
+        team_ids = {row['team_id'] for row in page if row['team_id'] is not None}
+        memberships = [row async for row in team_memberships(team_ids)] if team_ids else []
+        response = paginator.get_paginated_response(serialize_booking_rows(page, memberships))
+        return JsonResponse(response.data)
+
+    async def post(self, request):
+        return await sync_to_async(BookingsView.as_view())(request._request)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class BulkBookingView(APIView):
+    """
+    API endpoint to create many bookings in one call.
+    
+    Every item follows the same rules as a single ``POST /bookings/``; items
+    are allocated in request order. Only accessible by managers and administrators.
+    
+    POST Request Body:
+        {
+            "bookings": [ <booking request>, ... ],  # same shape as POST /bookings/
+            "all_or_nothing": bool,  # optional, default false
+            "background": bool  # optional, default false: queue a job instead of booking inline
+        }
+    
+    Returns:
+        201: Every booking was created
+        200: Some bookings were created (per-item results tell which)
+        202: Queued as a background job (``background``); its result holds the same body
+        400: Invalid request, or a failing item under all_or_nothing (nothing is created)
+    
+        Body: {"results": [{"index": int, "booking_id": int, "room": str} | {"index": int, "error": str}]}
+    
+    Inline requests take at most 1000 bookings, background ones 20000.
+    """
+    permission_classes = [IsManagerOrAdmin]
+
+    def post(self, request):
+        payloads = request.data.get("bookings")
+        background = bool(request.data.get("background", False))
+        limit = MAX_BACKGROUND_BULK_BOOKINGS if background else MAX_BULK_BOOKINGS
+        if not isinstance(payloads, list) or not payloads:
+            return Response({"error": "bookings must be a non-empty list."}, status=400)
+        if len(payloads) > limit:
+            return Response({"error": f"At most {limit} bookings per request."}, status=400)
+
+        all_or_nothing = bool(request.data.get("all_or_nothing", False))
+        if background:
+            return job_accepted(enqueue("bookings.bulk", {"bookings": payloads, "all_or_nothing": all_or_nothing}))
+        results, ok = book_many(payloads, all_or_nothing=all_or_nothing)
+        if ok:
+            status = 201
+        elif all_or_nothing or not any("booking_id" in result for result in results):
+            status = 400
+        else:
+            status = 200
+        return Response({"results": results}, status=status)
+
+@method_decorator(csrf_exempt, name='dispatch')
+class BookingSeriesView(APIView):
+    """
+    API endpoint to book a recurring series in one call.
+    
+    Every occurrence is checked for member conflicts and room occupancy up
+    front, and the whole series gets one room whose seats are reserved for
+    all occurrences. Bookings are created for the next
+    ``BOOKING_SERIES_WINDOW_DAYS`` days; later ones are created as the window
+    moves (``manage.py materialize_series``). Only accessible by managers and
+    administrators.
+    
+    POST Request Body:
+        <booking request>  # same shape as POST /bookings/, slot and duration give the first occurrence
+        + "recurrence": {
+            "frequency": "DAILY" | "WEEKLY",
+            "interval": int,  # optional, every n days/weeks (default 1)
+            "weekdays": ["MO", ...],  # optional: DAILY keeps only these days, WEEKLY books each of them
+            "until": "YYYY-MM-DD" | "count": int  # exactly one
+        }
+    
+    Returns:
+        201: {"series_id": int, "room": str, "occurrences": int, "materialized": int,
+              "materialized_until": datetime}
+    
+    Error Responses:
+        - 400: Invalid booking data or recurrence, more than 366 occurrences
+        - 400: Any occurrence conflicts with a member's booking (details name it)
+        - 400: No room is free for every occurrence
+    """
+    permission_classes = [IsManagerOrAdmin]
+
+    def post(self, request):
+        series, error, details = create_series(request.data)
+        if error:
+            body = {"error": error}
+            if details:
+                body["details"] = details
+            return Response(body, status=400)
+        return Response({
+            "series_id": series.id,
+            "room": series.room.room_number,
+            "occurrences": series.occurrence_count,
+            "materialized": series.materialized_count,
+            "materialized_until": series.materialized_until,
+        }, status=201)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class BookingSeriesCancelView(APIView):
+    """
+    API endpoint to cancel a recurring series.
+    
+    Upcoming bookings of the series are cancelled and the seats reserved for
+    its later occurrences are freed; past bookings are kept.
+    
+    Returns:
+        200: {"message": str, "cancelled_occurrences": int}
+    
+    Error Responses:
+        - 404: Series not found or already cancelled
+    """
+    def post(self, request, series_id):
+        cancelled = cancel_series(series_id)
+        if cancelled is None:
+            return Response({"error": "Series not found or already cancelled."}, status=404)
+        return Response({"message": "Series cancelled successfully.", "cancelled_occurrences": cancelled}, status=200)
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class BookingCancelView(APIView):
     """
@@ -198,13 +349,77 @@ class BookingCancelView(APIView):
     Error Responses:
         - 404: Booking not found or already cancelled
     """
+    @transaction.atomic
     def post(self, request, booking_id):
         try:
-            booking = Booking.objects.get(id=booking_id, status="ACTIVE")
+            booking = Booking.objects.select_related('room').get(id=booking_id, status="ACTIVE")
         except Booking.DoesNotExist:
             return Response({"error": "Booking not found or already cancelled."}, status=404)
+        # Conditional update so two concurrent cancels release the seat only once.
+        if not Booking.objects.filter(id=booking.id, status="ACTIVE").update(status="CANCELLED"):
+            return Response({"error": "Booking not found or already cancelled."}, status=404)
+        release_seat(booking.room_id, booking.start_time, booking.end_time)
         booking.status = "CANCELLED"
-        booking.save()
+        bookings_changed.send(sender=Booking, bookings=[booking])
         return Response({"message": "Booking cancelled successfully."}, status=200)
 
- 
\ No newline at end of file
+ 
+@method_decorator(csrf_exempt, name='dispatch')
+class BookingExportView(APIView):
+    """
+    API endpoint streaming booking history as CSV or NDJSON.
+    
+    Rows are flat (room number and type, user and team name inlined) and
+    streamed straight from the database, so exports of any size use constant
+    memory. Only accessible by managers and administrators.
+    
+    URL Parameters:
+        export_format (str): "csv" or "ndjson" (``/bookings/export.csv``)
+    
+    Query Parameters:
+        status (str, optional): active or cancelled
+        start, end (str, optional): Bounds on start_time, as YYYY-MM-DD (end day
+            included) or ISO 8601 datetimes (end excluded)
+        archived (bool, optional): Also export bookings moved to the archive
+    
+    GET streams the export. POST with the same parameters queues it as a
+    background job and answers 202; the file is then downloaded from
+    ``/api/v1/jobs/{job_id}/result``.
+    
+    Error Responses:
+        - 400: Invalid filters
+        - 404: Unknown export format
+    """
+    permission_classes = [IsManagerOrAdmin]
+
+    def get(self, request, export_format):
+        filters, error = self.parse(request, export_format)
+        if error:
+            return error
+
+        archived = include_archived(request.query_params.get('archived'))
+        lines = LINE_WRITERS[export_format](export_rows(filters, archived=archived))
+        response = StreamingHttpResponse(lines, content_type=CONTENT_TYPES[export_format])
+        response['Content-Disposition'] = f'attachment; filename="bookings.{export_format}"'
+        return response
+
+    def post(self, request, export_format):
+        _, error = self.parse(request, export_format)
+        if error:
+            return error
+        params = request.query_params
+        return job_accepted(enqueue("bookings.export", {
+            "format": export_format, "status": params.get('status'), "start": params.get('start'), "end": params.get('end'),
+            "archived": include_archived(params.get('archived')),
+        }))
+
+    @staticmethod
+    def parse(request, export_format):
+        """``(filters, None)`` for a valid export request, else ``(None, error response)``."""
+        if export_format not in LINE_WRITERS:
+            return None, Response({"error": "Unknown export format. Use csv or ndjson."}, status=404)
+        params = request.query_params
+        filters, error = parse_filters(params.get('status'), params.get('start'), params.get('end'))
+        if error:
+            return None, Response({"error": error}, status=400)
+        return filters, None
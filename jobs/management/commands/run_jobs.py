@@ -0,0 +1,77 @@
+import multiprocessing
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs.queue import work
+
+
+class Command(BaseCommand):
+    help = (
+        'Run queued background jobs (exports, bulk bookings, ...) from the database queue. '
+        'Runs until SIGINT/SIGTERM, letting jobs in progress finish; --once drains the queue and exits.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4, help='Jobs run concurrently per process (default: 4).')
+        parser.add_argument('--processes', type=int, default=1, help='Worker processes (default: 1).')
+        parser.add_argument('--poll', type=float, default=1.0, help='Seconds to wait when no job is due (default: 1).')
+        parser.add_argument('--once', action='store_true', help='Exit once no job is due.')
+
+    def handle(self, *args, **options):
+        processes = max(1, options['processes'])
+        options = {key: options[key] for key in ('threads', 'poll', 'once')}
+        started = time.perf_counter()
+        if processes == 1:
+            ran, failed = work_process(options)
+        else:
+            ran, failed = fork_workers(processes, options)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Ran {ran} jobs ({failed} failed) in {elapsed:.1f}s.'))
+
+
+def work_process(options):
+    """Run ``options['threads']`` workers in this process until stopped; returns ``(jobs run, jobs failed)``."""
+    stop = threading.Event()
+    if threading.current_thread() is threading.main_thread():
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *args: stop.set())
+    threads = max(1, options['threads'])
+    if threads == 1:
+        return work(stop, options['poll'], options['once'])
+    with ThreadPoolExecutor(threads) as pool:
+        counts = list(pool.map(lambda _: _work_thread(stop, options), range(threads)))
+    return sum(count[0] for count in counts), sum(count[1] for count in counts)
+
+
+def _work_thread(stop, options):
+    try:
+        return work(stop, options['poll'], options['once'])
+    finally:
+        connections.close_all()
+
+
+def fork_workers(processes, options):
+    """Run ``work_process`` in ``processes`` forked children; stopping the parent stops them all."""
+    context = multiprocessing.get_context('fork')
+    counts = context.SimpleQueue()
+    # Children must not inherit open connections.
+    connections.close_all()
+    children = [context.Process(target=_child, args=(options, counts)) for _ in range(processes)]
+    for child in children:
+        child.start()
+    # Ctrl-C already reaches the whole process group; SIGTERM is passed on.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda *args: [child.terminate() for child in children])
+    for child in children:
+        child.join()
+    totals = [counts.get() for child in children if child.exitcode == 0]
+    return sum(count[0] for count in totals), sum(count[1] for count in totals)
+
+
+def _child(options, counts):
+    counts.put(work_process(options))
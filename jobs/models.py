@@ -0,0 +1,50 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """
+    One unit of background work, queued in the database and run by ``manage.py run_jobs``.
+
+    A worker claims a job by moving ``locked_until`` forward with a conditional
+    ``UPDATE``; while that visibility timeout lasts no other worker picks the
+    job up. A worker that dies mid-job simply lets it expire, and the job is
+    claimed again (counting as another attempt).
+    """
+    STATUS_CHOICES = [
+        ("QUEUED", "Queued"),
+        ("RUNNING", "Running"),
+        ("SUCCEEDED", "Succeeded"),
+        ("FAILED", "Failed"),
+    ]
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="QUEUED")
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    # Earliest time the job may (next) run; pushed back between retries.
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers polling for due jobs, and for running jobs whose lease expired.
+            models.Index(
+                fields=["run_at"],
+                condition=models.Q(status="QUEUED"),
+                name="job_queued_run_at_idx",
+            ),
+            models.Index(
+                fields=["locked_until"],
+                condition=models.Q(status="RUNNING"),
+                name="job_running_lease_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
@@ -0,0 +1,183 @@
+"""
+Database-backed job queue.
+
+Work is registered by name with ``@task`` (in an app's ``tasks.py``), queued
+with ``enqueue`` and run by ``manage.py run_jobs``. There is no broker: the
+``Job`` table is the queue, so the web process and its workers only need to
+share the database.
+
+A worker claims a due job with one conditional ``UPDATE`` that also sets its
+visibility timeout (``locked_until``) and bumps ``attempts``; losing that race
+to another worker just means trying the next candidate. A job whose worker
+died is claimed again once the timeout passes. A task that raises is retried
+with exponential backoff (``JOBS_RETRY_DELAY`` seconds, doubling) until it
+has used ``max_attempts``. Results are only recorded by the worker still
+holding the job, so a worker that overran its timeout cannot overwrite the
+outcome of the retry.
+
+Tasks must therefore tolerate running more than once: run them in a
+transaction, or make them idempotent.
+"""
+import os
+import socket
+import threading
+import traceback
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Job
+
+# Due jobs read per claim attempt; workers racing for the same job fall through to the next one.
+CLAIM_CANDIDATES = 10
+
+TASKS = {}
+
+
+class Task:
+    def __init__(self, name, func, max_attempts=3, timeout=None):
+        self.name = name
+        self.func = func
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+
+    @property
+    def visibility_timeout(self):
+        return timedelta(seconds=self.timeout or settings.JOBS_VISIBILITY_TIMEOUT)
+
+
+def task(name, max_attempts=3, timeout=None):
+    """
+    Register the decorated function as the task ``name``.
+
+    The function gets the claimed ``Job`` (its ``payload`` holds the
+    arguments) and returns a JSON-serializable result. ``timeout`` (seconds)
+    overrides ``JOBS_VISIBILITY_TIMEOUT`` for slow tasks.
+    """
+    def register(func):
+        TASKS[name] = Task(name, func, max_attempts, timeout)
+        return func
+    return register
+
+
+def enqueue(name, payload=None, delay=None):
+    """Queue the task ``name`` with ``payload``, to run now or after ``delay`` (a timedelta)."""
+    if name not in TASKS:
+        raise ValueError(f"Unknown task {name!r}.")
+    return Job.objects.create(
+        name=name, payload=payload or {}, max_attempts=TASKS[name].max_attempts,
+        run_at=timezone.now() + (delay or timedelta()),
+    )
+
+
+def worker_name():
+    """Identifies the holder of a job: host, process and thread."""
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def claim(worker, now=None):
+    """
+    Claim the next due job for ``worker``.
+
+    Due jobs are queued ones whose ``run_at`` passed and running ones whose
+    visibility timeout expired. A running job that expired on its last
+    attempt is marked FAILED instead.
+
+    Returns:
+        Job or None: The claimed job (status RUNNING), or None when nothing is due.
+    """
+    now = now or timezone.now()
+    candidates = (
+        Job.objects.filter(Q(status="QUEUED", run_at__lte=now) | Q(status="RUNNING", locked_until__lt=now))
+        .order_by("run_at", "id")
+        .values_list("pk", "name", "status", "attempts", "max_attempts", "locked_by")[:CLAIM_CANDIDATES]
+    )
+    for pk, name, status, attempts, max_attempts, holder in candidates:
+        # attempts only ever grows, so it tells whether anyone claimed the job since it was read.
+        unchanged = Job.objects.filter(pk=pk, status=status, attempts=attempts)
+        if status == "RUNNING" and attempts >= max_attempts:
+            unchanged.update(
+                status="FAILED", locked_until=None, finished_at=now,
+                error=f"Worker {holder} did not finish within the visibility timeout.",
+            )
+            continue
+        timeout = TASKS[name].visibility_timeout if name in TASKS else timedelta(seconds=settings.JOBS_VISIBILITY_TIMEOUT)
+        if unchanged.update(status="RUNNING", attempts=attempts + 1, locked_until=now + timeout, locked_by=worker):
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def run(job, worker):
+    """
+    Run a claimed job and record its outcome.
+
+    Returns:
+        bool: Whether the task succeeded.
+    """
+    registered = TASKS.get(job.name)
+    try:
+        if registered is None:
+            raise LookupError(f"Unknown task {job.name!r}.")
+        result = registered.func(job)
+    except Exception:
+        _failed(job, worker, traceback.format_exc(), retry=registered is not None)
+        return False
+    _held(job, worker).update(status="SUCCEEDED", result=result, error="", locked_until=None, finished_at=timezone.now())
+    return True
+
+
+def _held(job, worker):
+    """``job`` as long as ``worker`` still holds this attempt of it."""
+    return Job.objects.filter(pk=job.pk, status="RUNNING", attempts=job.attempts, locked_by=worker)
+
+
+def _failed(job, worker, error, retry=True):
+    now = timezone.now()
+    if retry and job.attempts < job.max_attempts:
+        backoff = timedelta(seconds=settings.JOBS_RETRY_DELAY * 2 ** (job.attempts - 1))
+        _held(job, worker).update(status="QUEUED", run_at=now + backoff, locked_until=None, error=error)
+    else:
+        _held(job, worker).update(status="FAILED", locked_until=None, finished_at=now, error=error)
+
+
+def work(stop=None, poll=1.0, once=False):
+    """
+    Claim and run jobs until ``stop`` (a threading.Event) is set.
+
+    Waits ``poll`` seconds whenever no job is due; with ``once``, returns as
+    soon as the queue has nothing due instead.
+
+    Returns:
+        tuple: ``(jobs run, jobs failed)``.
+    """
+    stop = stop or threading.Event()
+    worker = worker_name()
+    ran = failed = 0
+    while not stop.is_set():
+        close_old_connections()
+        job = claim(worker)
+        if job is None:
+            if once:
+                break
+            stop.wait(poll)
+            continue
+        ran += 1
+        failed += not run(job, worker)
+    close_old_connections()
+    return ran, failed
+
+
+def result_path(job, suffix):
+    """File a task writes its output to, under ``JOBS_RESULT_DIR``; see ``file_result``."""
+    directory = Path(settings.JOBS_RESULT_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / f"job-{job.pk}{suffix}"
+
+
+def file_result(path, filename, content_type, **extra):
+    """A task result pointing at ``path``, served by ``GET /api/v1/jobs/{id}/result`` as ``filename``."""
+    return {"file": Path(path).name, "filename": filename, "content_type": content_type, **extra}
@@ -0,0 +1,134 @@
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User as AuthUser
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from bookings.models import Booking
+from bookings.tests import create_rooms, next_slot
+from jobs.models import Job
+from jobs.queue import TASKS, claim, enqueue, run, task, work
+
+calls = []
+
+
+@task("tests.flaky")
+def flaky(job):
+    calls.append(job.attempts)
+    if job.attempts < job.payload["succeed_on"]:
+        raise RuntimeError("boom")
+    return {"attempts": job.attempts}
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_failed_attempts_are_retried_with_backoff(self):
+        job = enqueue("tests.flaky", {"succeed_on": 2})
+        self.assertTrue(claim("w1"))
+        self.assertFalse(run(Job.objects.get(pk=job.pk), "w1"))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("QUEUED", 1))
+        self.assertIn("RuntimeError: boom", job.error)
+        # Not due again before the backoff passes.
+        self.assertIsNone(claim("w1"))
+
+        retried = claim("w1", now=job.run_at)
+        self.assertTrue(run(retried, "w1"))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result, job.error), ("SUCCEEDED", {"attempts": 2}, ""))
+        self.assertEqual(calls, [1, 2])
+
+    def test_attempts_run_out(self):
+        job = enqueue("tests.flaky", {"succeed_on": 99})
+        for _ in range(TASKS["tests.flaky"].max_attempts):
+            run(claim("w1", now=timezone.now() + timedelta(days=1)), "w1")
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("FAILED", 3))
+        self.assertIsNone(claim("w1", now=timezone.now() + timedelta(days=1)))
+
+    def test_expired_jobs_are_claimed_again(self):
+        job = enqueue("tests.flaky", {"succeed_on": 1})
+        first = claim("w1")
+        later = first.locked_until + timedelta(seconds=1)
+        self.assertIsNone(claim("w2"))
+        second = claim("w2", now=later)
+        self.assertEqual((second.pk, second.attempts, second.locked_by), (job.pk, 2, "w2"))
+        # The first worker no longer holds the job, so its outcome is dropped.
+        run(first, "w1")
+        self.assertEqual(Job.objects.get(pk=job.pk).status, "RUNNING")
+        run(second, "w2")
+        self.assertEqual(Job.objects.get(pk=job.pk).result, {"attempts": 2})
+
+    def test_expiring_on_the_last_attempt_fails_the_job(self):
+        job = enqueue("tests.flaky", {"succeed_on": 1})
+        Job.objects.filter(pk=job.pk).update(status="RUNNING", attempts=3, locked_by="w1", locked_until=timezone.now())
+        self.assertIsNone(claim("w2", now=timezone.now() + timedelta(seconds=1)))
+        job.refresh_from_db()
+        self.assertEqual(job.status, "FAILED")
+        self.assertIn("w1", job.error)
+
+    def test_worker_drains_the_queue(self):
+        for _ in range(3):
+            enqueue("tests.flaky", {"succeed_on": 1})
+        out = StringIO()
+        call_command("run_jobs", threads=1, once=True, stdout=out)
+        self.assertIn("Ran 3 jobs (0 failed)", out.getvalue())
+        self.assertEqual(work(once=True), (0, 0))
+        self.assertFalse(Job.objects.exclude(status="SUCCEEDED").exists())
+
+
+class JobEndpointTests(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(AuthUser.objects.create_user("admin", password="admin"))
+        self.results = tempfile.TemporaryDirectory()
+        self.addCleanup(self.results.cleanup)
+        override = override_settings(JOBS_RESULT_DIR=self.results.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_background_export(self):
+        create_rooms(private=1, conference=0, shared=0)
+        self.client.post("/api/v1/bookings/", {
+            "user": {"name": "ann", "age": 30}, "room_type": "PRIVATE", "slot": next_slot().isoformat(),
+        }, format="json")
+        response = self.client.post("/api/v1/bookings/export.csv?status=active")
+        self.assertEqual(response.status_code, 202)
+        status_url = response.data["status_url"]
+        self.assertEqual(response["Location"], status_url)
+        self.assertEqual(self.client.get(status_url).data["status"], "QUEUED")
+        self.assertEqual(self.client.get(f"{status_url}/result").status_code, 409)
+
+        work(once=True)
+        job = self.client.get(status_url).data
+        self.assertEqual((job["status"], job["result"]["rows"]), ("SUCCEEDED", 1))
+        download = self.client.get(job["result_url"])
+        self.assertEqual(download["Content-Disposition"], 'attachment; filename="bookings.csv"')
+        inline = self.client.get("/api/v1/bookings/export.csv?status=active")
+        self.assertEqual(b"".join(download.streaming_content), b"".join(inline.streaming_content))
+
+    def test_background_bulk_booking(self):
+        create_rooms(private=2, conference=0, shared=0)
+        slot = next_slot().isoformat()
+        response = self.client.post("/api/v1/bookings/bulk", {"background": True, "bookings": [
+            {"user": {"name": name, "age": 30}, "room_type": "PRIVATE", "slot": slot} for name in ("ann", "bob", "cat")
+        ]}, format="json")
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(Booking.objects.exists())
+
+        work(once=True)
+        job = Job.objects.get(pk=response.data["job_id"])
+        self.assertEqual((job.status, job.result["booked"], job.result["ok"]), ("SUCCEEDED", 2, False))
+        self.assertEqual(Booking.objects.count(), 2)
+
+    def test_invalid_requests_are_not_queued(self):
+        self.assertEqual(self.client.post("/api/v1/bookings/export.csv?start=soon").status_code, 400)
+        self.assertEqual(self.client.post("/api/v1/bookings/export.xml").status_code, 404)
+        self.assertEqual(self.client.post("/api/v1/bookings/bulk", {"background": True, "bookings": []}, format="json").status_code, 400)
+        self.assertFalse(Job.objects.exists())
+        self.assertEqual(self.client.get("/api/v1/jobs/999").status_code, 404)
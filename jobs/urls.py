@@ -0,0 +1,7 @@
+from django.urls import path
+from jobs.views import JobView, JobResultView
+
+urlpatterns = [
+    path('<int:job_id>', JobView.as_view(), name='job-detail'),
+    path('<int:job_id>/result', JobResultView.as_view(), name='job-result'),
+]
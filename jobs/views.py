@@ -0,0 +1,72 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse
+from django.urls import reverse
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from roombooking.permissions import IsManagerOrAdmin
+from .models import Job
+
+JOB_FIELDS = ('id', 'name', 'status', 'attempts', 'max_attempts', 'run_at', 'created_at', 'finished_at', 'result', 'error')
+
+
+def job_accepted(job):
+    """202 response for a view that queued ``job`` instead of doing the work inline."""
+    url = reverse('job-detail', args=[job.pk])
+    return Response({"job_id": job.pk, "status": job.status, "status_url": url}, status=202, headers={'Location': url})
+
+
+class JobView(APIView):
+    """
+    API endpoint reporting the state of a background job.
+
+    URL Parameters:
+        job_id (int): ID returned by the 202 response that queued the job
+
+    Returns:
+        Response: {"id", "name", "status" (QUEUED, RUNNING, SUCCEEDED or FAILED),
+        "attempts", "max_attempts", "run_at", "created_at", "finished_at",
+        "result", "error", "result_url"}. ``error`` holds the traceback of the
+        last failed attempt; ``result_url`` is set once a file result is ready.
+
+    Error Responses:
+        - 404: Job not found
+    """
+    permission_classes = [IsManagerOrAdmin]
+
+    def get(self, request, job_id):
+        job = Job.objects.filter(pk=job_id).values(*JOB_FIELDS).first()
+        if job is None:
+            return Response({"error": "Job not found."}, status=404)
+        has_file = job['status'] == 'SUCCEEDED' and isinstance(job['result'], dict) and 'file' in job['result']
+        job['result_url'] = reverse('job-result', args=[job_id]) if has_file else None
+        return Response(job)
+
+
+class JobResultView(APIView):
+    """
+    API endpoint downloading the file a finished job produced (e.g. an export).
+
+    Error Responses:
+        - 404: Job not found, or it produced no file
+        - 409: Job has not succeeded (yet)
+    """
+    permission_classes = [IsManagerOrAdmin]
+
+    def get(self, request, job_id):
+        job = Job.objects.filter(pk=job_id).only('status', 'result').first()
+        if job is None:
+            return Response({"error": "Job not found."}, status=404)
+        if job.status != 'SUCCEEDED':
+            return Response({"error": f"Job is {job.status.lower()}."}, status=409)
+        if not isinstance(job.result, dict) or 'file' not in job.result:
+            return Response({"error": "Job produced no file."}, status=404)
+        path = Path(settings.JOBS_RESULT_DIR) / job.result['file']
+        if not path.is_file():
+            return Response({"error": "Result file no longer exists."}, status=404)
+        return FileResponse(
+            open(path, 'rb'), as_attachment=True, filename=job.result['filename'],
+            content_type=job.result['content_type'],
+        )
@@ -0,0 +1,73 @@
+"""
+Base for async (ASGI-native) read endpoints.
+
+DRF's ``APIView`` runs synchronously, so under an ASGI server every request
+to it is handed to a worker thread. ``AsyncAPIView`` is a plain async Django
+view that authenticates with the same ``Authorization: Token <key>`` header
+as ``CachedTokenAuthentication`` (sharing its cache), applies the same
+manager/admin rule as ``IsManagerOrAdmin`` and answers with the same error
+bodies, so clients cannot tell the two paths apart.
+"""
+from django.http import HttpResponseNotAllowed, JsonResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated, PermissionDenied
+from rest_framework.request import Request
+
+from .authentication import aauthenticate_credentials
+
+MANAGER_USERNAMES = ('admin', 'manager')
+
+
+async def aauthenticate(request):
+    """
+    Async ``CachedTokenAuthentication.authenticate``.
+
+    Returns:
+        User or None: The token's user, or None when no token was sent.
+
+    Raises:
+        AuthenticationFailed: For a malformed header, an unknown token or an inactive user.
+    """
+    auth = request.headers.get('Authorization', '').split()
+    if not auth or auth[0].lower() != 'token':
+        return None
+    if len(auth) != 2:
+        raise AuthenticationFailed('Invalid token header. Token string should not contain spaces.')
+    user, _ = await aauthenticate_credentials(auth[1])
+    return user
+
+
+class AsyncAPIView(View):
+    """
+    Async view with token authentication; subclasses implement ``async def get``.
+
+    Handlers receive a DRF ``Request`` wrapper (for ``query_params`` and the
+    paginators) and return a ``JsonResponse``; DRF exceptions they raise are
+    turned into the usual ``{"detail": ...}`` error responses.
+    """
+    manager_only = False
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        method = request.method.lower()
+        handler = getattr(self, method, None) if method in self.http_method_names else None
+        if handler is None or method == 'options':
+            return HttpResponseNotAllowed(self._allowed_methods())
+        try:
+            user = await aauthenticate(request)
+            if user is None:
+                raise NotAuthenticated()
+            if self.manager_only and user.username not in MANAGER_USERNAMES:
+                raise PermissionDenied()
+            drf_request = Request(request)
+            drf_request.user = user
+            return await handler(drf_request, *args, **kwargs)
+        except APIException as exc:
+            response = JsonResponse({'detail': exc.detail}, status=exc.status_code)
+            if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+                response['WWW-Authenticate'] = 'Token'
+            return response
@@ -0,0 +1,113 @@
+"""
+Token authentication with an in-process cache of token → user.
+
+``TokenAuthentication`` joins authtoken to auth_user on every request.
+``CachedTokenAuthentication`` keeps the result in a least-recently-used map
+of at most ``TOKEN_AUTH_CACHE_SIZE`` tokens, each trusted for
+``TOKEN_AUTH_CACHE_TTL`` seconds, so a warm request (and the
+``IsManagerOrAdmin`` check on the cached user) costs no query.
+
+Deleting a token, or saving or deleting a user, clears the map and bumps a
+generation counter in the default cache; other processes compare it on every
+lookup and drop their entries, provided that cache is a shared backend.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+GENERATION_KEY = 'auth:token-generation'
+
+
+class TokenCache:
+    """Thread-safe LRU of token key → ``(user, token)`` with per-entry expiry."""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, generation):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires, entry_generation = entry
+            if entry_generation != generation or expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value, generation):
+        size = settings.TOKEN_AUTH_CACHE_SIZE
+        if size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + settings.TOKEN_AUTH_CACHE_TTL, generation)
+            self._entries.move_to_end(key)
+            while len(self._entries) > size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        # Read the generation before the query, so an invalidation racing it is not missed.
+        generation = cache.get(GENERATION_KEY, 0)
+        credentials = token_cache.get(key, generation)
+        if credentials is None:
+            credentials = super().authenticate_credentials(key)
+            token_cache.put(key, credentials, generation)
+        return credentials
+
+
+async def aauthenticate_credentials(key):
+    """Async ``CachedTokenAuthentication.authenticate_credentials``, sharing its cache."""
+    generation = await cache.aget(GENERATION_KEY, 0)
+    credentials = token_cache.get(key, generation)
+    if credentials is None:
+        try:
+            token = await Token.objects.select_related('user').aget(key=key)
+        except Token.DoesNotExist:
+            raise AuthenticationFailed(_('Invalid token.'))
+        if not token.user.is_active:
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+        credentials = (token.user, token)
+        token_cache.put(key, credentials, generation)
+    return credentials
+
+
+def invalidate_tokens():
+    """Forget every cached token, here and (through the generation counter) in other processes."""
+    token_cache.clear()
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        if not cache.add(GENERATION_KEY, 1, None):
+            cache.incr(GENERATION_KEY)
+
+
+@receiver(post_delete, sender=Token)
+def _token_deleted(sender, **kwargs):
+    invalidate_tokens()
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def _user_changed(sender, **kwargs):
+    invalidate_tokens()
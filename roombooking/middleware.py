@@ -0,0 +1,213 @@
+"""
+Per-request timing and query instrumentation.
+
+``RequestMetricsMiddleware`` measures every request's wall time, the number
+and duration of its DB queries (through ``connection.execute_wrapper``) and
+the time DRF spends rendering the response body, plus the time spent in
+steps wrapped with ``timed()`` (``serialize`` for the booking row
+serializer). The numbers are sent back in
+a ``Server-Timing`` header, written as one log line per request to the
+``roombooking.metrics`` logger, and kept per endpoint (method + URL route) in
+rolling windows of the last ``REQUEST_METRICS_WINDOW`` requests, which
+``metrics_snapshot()`` summarizes for the manager-only stats endpoint.
+
+The middleware is sync and async capable, so under ASGI it does not force a
+thread hop around async views; the query wrappers are then installed on the
+thread the request's ORM calls run on.
+
+Turned on with ``settings.REQUEST_METRICS_ENABLED``. When it is off the
+middleware removes itself at startup, so it costs nothing per request.
+Windows are kept per process.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('roombooking.metrics')
+
+# Upper bounds (ms) of the latency histogram buckets; the last one is open.
+HISTOGRAM_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+_windows = {}
+_totals = {}
+_lock = threading.Lock()
+# Metrics of the request being handled, for ``timed()``; copied into sync_to_async threads.
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics = request.request_metrics = _RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            with _time_queries(metrics):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, metrics, started)
+
+    async def __acall__(self, request):
+        metrics = request.request_metrics = _RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        # Entered and closed on the thread sync_to_async runs this request's ORM calls on.
+        stack = await sync_to_async(_time_queries)(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            _current.reset(token)
+        return self._finish(request, response, metrics, started)
+
+    def _finish(self, request, response, metrics, started):
+        metrics.total = time.perf_counter() - started
+        endpoint = endpoint_name(request)
+        response['Server-Timing'] = metrics.server_timing()
+        record(endpoint, metrics)
+        logger.info(
+            '%s %s total=%.1fms db=%.1fms queries=%d render=%.1fms serialize=%.1fms',
+            endpoint, response.status_code, metrics.total * 1000, metrics.db_time * 1000,
+            metrics.queries, metrics.render * 1000, metrics.serialize * 1000,
+            extra={'endpoint': endpoint, 'status': response.status_code, 'metrics': metrics.as_dict()},
+        )
+        return response
+
+    def process_template_response(self, request, response):
+        # Called last among the middlewares, right before the response is rendered.
+        started = time.perf_counter()
+
+        def rendered(response):
+            request.request_metrics.render += time.perf_counter() - started
+
+        response.add_post_render_callback(rendered)
+        return response
+
+
+def _time_queries(metrics):
+    stack = ExitStack()
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(metrics.time_query))
+    return stack
+
+
+@contextmanager
+def timed(step):
+    """Add the time spent in the block to ``step`` (e.g. ``'serialize'``) of the current request's metrics."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(metrics, step, getattr(metrics, step) + time.perf_counter() - started)
+
+
+class _RequestMetrics:
+    def __init__(self):
+        self.total = 0.0
+        self.db_time = 0.0
+        self.queries = 0
+        self.render = 0.0
+        self.serialize = 0.0
+
+    def time_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - started
+
+    def server_timing(self):
+        return (
+            f'total;dur={self.total * 1000:.1f}, '
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries", '
+            f'render;dur={self.render * 1000:.1f}, '
+            f'serialize;dur={self.serialize * 1000:.1f}'
+        )
+
+    def as_dict(self):
+        return {
+            'total_ms': round(self.total * 1000, 3),
+            'db_ms': round(self.db_time * 1000, 3),
+            'queries': self.queries,
+            'render_ms': round(self.render * 1000, 3),
+            'serialize_ms': round(self.serialize * 1000, 3),
+        }
+
+
+def endpoint_name(request):
+    match = request.resolver_match
+    return f'{request.method} /{match.route}' if match else f'{request.method} <unmatched>'
+
+
+def record(endpoint, metrics):
+    with _lock:
+        if endpoint not in _windows:
+            _windows[endpoint] = deque(maxlen=settings.REQUEST_METRICS_WINDOW)
+            _totals[endpoint] = 0
+        _windows[endpoint].append((metrics.total, metrics.db_time, metrics.queries, metrics.render, metrics.serialize))
+        _totals[endpoint] += 1
+
+
+def reset_metrics():
+    with _lock:
+        _windows.clear()
+        _totals.clear()
+
+
+def metrics_snapshot():
+    """Percentiles and a latency histogram per endpoint over its rolling window."""
+    with _lock:
+        windows = {endpoint: list(window) for endpoint, window in _windows.items()}
+        totals = dict(_totals)
+    endpoints = {}
+    for endpoint, samples in sorted(windows.items()):
+        total, db_time, queries, render, serialize = (sorted(values) for values in zip(*samples))
+        histogram = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        for value in total:
+            histogram[bisect_left(HISTOGRAM_BOUNDS_MS, value * 1000)] += 1
+        labels = [f'<={bound}' for bound in HISTOGRAM_BOUNDS_MS] + [f'>{HISTOGRAM_BOUNDS_MS[-1]}']
+        endpoints[endpoint] = {
+            'requests': totals[endpoint],
+            'window': len(samples),
+            'total_ms': _percentiles(total),
+            'db_ms': _percentiles(db_time),
+            'render_ms': _percentiles(render),
+            'serialize_ms': _percentiles(serialize),
+            'queries': {'mean': round(sum(queries) / len(queries), 2), 'max': queries[-1]},
+            'histogram_ms': dict(zip(labels, histogram)),
+        }
+    return {'enabled': settings.REQUEST_METRICS_ENABLED, 'endpoints': endpoints}
+
+
+def _percentiles(ordered):
+    def at(fraction):
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 3)
+
+    return {'p50': at(0.50), 'p95': at(0.95), 'p99': at(0.99), 'max': round(ordered[-1] * 1000, 3)}
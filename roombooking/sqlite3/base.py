@@ -0,0 +1,44 @@
+"""
+SQLite backend with per-connection tuning, for Django versions before 5.1.
+
+Understands the two ``OPTIONS`` Django 5.1 added to its own SQLite backend,
+so settings stay the same after an upgrade (only ``ENGINE`` changes back):
+
+- ``init_command``: ``;``-separated statements (typically PRAGMAs) run on
+  every new connection.
+- ``transaction_mode``: ``DEFERRED``, ``IMMEDIATE`` or ``EXCLUSIVE``, used as
+  ``BEGIN <mode>`` when ``atomic()`` opens a transaction.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        transaction_mode = kwargs.pop('transaction_mode', None)
+        if transaction_mode is not None and transaction_mode.upper() not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f"settings.DATABASES['{self.alias}']['OPTIONS']['transaction_mode'] is improperly "
+                f"configured to '{transaction_mode}'. Use one of {', '.join(TRANSACTION_MODES)}, or None."
+            )
+        self.transaction_mode = transaction_mode.upper() if transaction_mode else None
+        self.init_commands = kwargs.pop('init_command', '').split(';')
+        if 'timeout' in kwargs:
+            kwargs['timeout'] = float(kwargs['timeout'])
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for init_command in self.init_commands:
+            if init_command := init_command.strip():
+                conn.execute(init_command)
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode is None:
+            self.cursor().execute('BEGIN')
+        else:
+            self.cursor().execute(f'BEGIN {self.transaction_mode}')
@@ -19,7 +19,7 @@ from django.urls import path, include
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 from rest_framework import permissions 
-from .views import hello
+from .views import hello, RequestMetricsView
 from rest_framework.authtoken.views import obtain_auth_token
 
 
@@ -39,6 +39,9 @@ urlpatterns = [
     path('auth-token', obtain_auth_token, name='auth-token'), #post request to get token
     path('api/v1/bookings/', include('bookings.urls')),
     path('api/v1/rooms/', include('rooms.urls')),
+    path('api/v1/users/', include('users.urls')),
+    path('api/v1/jobs/', include('jobs.urls')),
+    path('api/v1/metrics', RequestMetricsView.as_view(), name='request-metrics'),
     
     # Documentation URLs
     path('docs/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
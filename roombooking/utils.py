@@ -1,7 +1,165 @@
 
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.core.paginator import InvalidPage, Page
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = 'page_size'
-    max_page_size = 100
\ No newline at end of file
+    max_page_size = 100
+
+    async def apaginate_queryset(self, queryset, request):
+        """
+        ``paginate_queryset`` for async views, through ``acount()`` and async iteration.
+
+        ``request`` is a DRF ``Request`` (wrapping the Django request is enough).
+        """
+        self.request = request
+        paginator = self.django_paginator_class(queryset, self.get_page_size(request))
+        # Paginator.count is a cached_property; fill it without a sync query.
+        paginator.count = await queryset.acount()
+        page_number = request.query_params.get(self.page_query_param) or 1
+        if page_number in self.last_page_strings:
+            page_number = paginator.num_pages
+        try:
+            number = paginator.validate_number(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        bottom = (number - 1) * paginator.per_page
+        rows = [row async for row in queryset[bottom:bottom + paginator.per_page]]
+        self.page = Page(rows, number, paginator)
+        return rows
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on the listing's ordering columns.
+
+    Each page is fetched with a ``WHERE (key) < (last key seen)`` range on an
+    index instead of ``OFFSET``, and no total ``COUNT(*)`` is run, so deep
+    pages cost the same as the first one. ``ordering`` must end with a unique
+    column (usually ``-id``) so the key is a total order.
+
+    Clients opt in per request by sending ``cursor`` (empty for the first page)
+    and follow the returned ``next`` link.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering = ('-id',)
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering=None):
+        if ordering is not None:
+            self.ordering = tuple(ordering)
+
+    @classmethod
+    def requested(cls, request):
+        return cls.cursor_query_param in request.query_params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if isinstance(queryset, (list, tuple)):
+            return self.finish_page(self.merge([list(self.page_queryset(part, request)) for part in queryset]))
+        return self.finish_page(list(self.page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request):
+        if isinstance(queryset, (list, tuple)):
+            return self.finish_page(self.merge([
+                [row async for row in self.page_queryset(part, request)] for part in queryset
+            ]))
+        return self.finish_page([row async for row in self.page_queryset(queryset, request)])
+
+    def merge(self, pages):
+        """
+        One page from the pages of several querysets with disjoint keys (e.g. a table and its archive).
+
+        Each page already holds its first ``page_size + 1`` rows after the
+        cursor, so the merged page is the first ``page_size + 1`` of them all.
+        """
+        rows = [row for page in pages for row in page]
+        # Stable sorts, least significant column first, give the listing order.
+        for name, descending in reversed(self.fields):
+            rows.sort(key=lambda row: self.row_value(row, name), reverse=descending)
+        return rows[:self.page_size + 1]
+
+    def page_queryset(self, queryset, request):
+        """The page, plus one row to tell whether another page follows."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.fields = [(name.lstrip('-'), name.startswith('-')) for name in self.ordering]
+
+        queryset = queryset.order_by(*self.ordering)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self.cursor_filter(self.fields, self.decode_cursor(cursor, self.fields, queryset.model)))
+        return queryset[:self.page_size + 1]
+
+    def finish_page(self, rows):
+        self.has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        self.next_key = [self.row_value(rows[-1], name) for name, _ in self.fields] if self.has_next else None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.next_key))
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    @staticmethod
+    def cursor_filter(fields, key):
+        """
+        Rows strictly after ``key`` in the listing order.
+
+        Expanded as ``a <= x AND (a < x OR (a = x AND b < y) ...)`` so the
+        leading column gives the database an index range to seek to.
+        """
+        def after(name, descending, value):
+            return Q(**{f"{name}__{'lt' if descending else 'gt'}": value})
+
+        (first, first_descending), first_value = fields[0], key[0]
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(fields, key):
+            condition |= equal & after(name, descending, value)
+            equal &= Q(**{name: value})
+        bound = Q(**{f"{first}__{'lte' if first_descending else 'gte'}": first_value})
+        return bound & condition
+
+    @staticmethod
+    def row_value(row, name):
+        return row[name] if isinstance(row, dict) else getattr(row, name)
+
+    @staticmethod
+    def encode_cursor(key):
+        payload = json.dumps([value.isoformat() if hasattr(value, 'isoformat') else value for value in key])
+        return urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, cursor, fields, model):
+        try:
+            values = json.loads(urlsafe_b64decode(cursor.encode()))
+            if len(values) != len(fields):
+                raise ValueError
+            return [model._meta.get_field(name).to_python(value) for (name, _), value in zip(fields, values)]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
@@ -0,0 +1,153 @@
+"""
+Per-table change counters for conditional GETs.
+
+Every committed write to a tracked table (``bookings``, ``users``, ``rooms``)
+bumps that table's counter and modification time in the default cache.
+``conditional_on(*tables)`` derives an ETag from the request URL and the
+counters its view reads, and Last-Modified from their latest change, so an
+unchanged listing is answered with 304 Not Modified before the view queries
+or serializes anything.
+
+Counters live in the default cache, so all workers agree on them when it is
+a shared backend. A counter that is missing (first use, eviction, flush)
+restarts from a random value, so ETags issued before never match by accident.
+"""
+import random
+import time
+from functools import wraps
+from hashlib import md5
+
+from asgiref.sync import iscoroutinefunction
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from bookings.signals import bookings_changed
+from rooms.models import Room
+from users.models import User
+
+
+def _keys(table):
+    return f'version:{table}', f'version:{table}:modified'
+
+
+def bump(*tables):
+    """Record a change to ``tables`` now; call after the change is committed."""
+    now = time.time()
+    for table in tables:
+        counter, modified = _keys(table)
+        try:
+            cache.incr(counter)
+        except ValueError:
+            cache.add(counter, random.getrandbits(48), None)
+        cache.set(modified, now, None)
+
+
+def bump_on_commit(*tables):
+    # Bumping before the commit would let a reader pair the old rows with the new version.
+    transaction.on_commit(lambda: bump(*tables))
+
+
+def versions(tables):
+    """``(counters, last modified timestamp)`` of ``tables``, starting counters that are missing."""
+    keys = [key for table in tables for key in _keys(table)]
+    values = cache.get_many(keys)
+    if len(values) < len(keys):
+        _start(keys, values)
+        values = cache.get_many(keys)
+    return _validators(tables, values)
+
+
+async def aversions(tables):
+    keys = [key for table in tables for key in _keys(table)]
+    values = await cache.aget_many(keys)
+    if len(values) < len(keys):
+        await _astart(keys, values)
+        values = await cache.aget_many(keys)
+    return _validators(tables, values)
+
+
+def _start(keys, values):
+    now = time.time()
+    for counter, modified in zip(keys[::2], keys[1::2]):
+        if counter not in values:
+            cache.add(counter, random.getrandbits(48), None)
+        if modified not in values:
+            cache.add(modified, now, None)
+
+
+async def _astart(keys, values):
+    now = time.time()
+    for counter, modified in zip(keys[::2], keys[1::2]):
+        if counter not in values:
+            await cache.aadd(counter, random.getrandbits(48), None)
+        if modified not in values:
+            await cache.aadd(modified, now, None)
+
+
+def _validators(tables, values):
+    counters = tuple(values.get(_keys(table)[0]) for table in tables)
+    modified = max(values.get(_keys(table)[1]) or 0 for table in tables)
+    return counters, modified
+
+
+def conditional_on(*tables):
+    """
+    Decorate a view's ``get`` to answer 304 Not Modified while ``tables`` are unchanged.
+
+    The ETag covers the full request path (so every page and filter gets its
+    own) and the counters of ``tables``. Works on sync and async handlers.
+    """
+    def validators(request, state):
+        counters, modified = state
+        path = request.get_full_path()
+        etag = quote_etag(md5(f'{path}|{counters}'.encode(), usedforsecurity=False).hexdigest())
+        return etag, int(modified)
+
+    def finish(response, etag, last_modified):
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    def decorator(method):
+        if iscoroutinefunction(method):
+            @wraps(method)
+            async def wrapper(self, request, *args, **kwargs):
+                etag, last_modified = validators(request, await aversions(tables))
+                response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+                if response is None:
+                    response = await method(self, request, *args, **kwargs)
+                return finish(response, etag, last_modified)
+        else:
+            @wraps(method)
+            def wrapper(self, request, *args, **kwargs):
+                etag, last_modified = validators(request, versions(tables))
+                response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+                if response is None:
+                    response = method(self, request, *args, **kwargs)
+                return finish(response, etag, last_modified)
+        return wrapper
+
+    return decorator
+
+
+@receiver(bookings_changed)
+def _bookings_changed(sender, **kwargs):
+    bump_on_commit('bookings')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def _user_changed(sender, **kwargs):
+    bump_on_commit('users')
+
+
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+def _room_changed(sender, **kwargs):
+    bump_on_commit('rooms')
@@ -1,6 +1,27 @@
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .middleware import metrics_snapshot
+from .permissions import IsManagerOrAdmin
 
 @csrf_exempt
 def hello(request):
-    return JsonResponse({"message": "Hello, From the room booking app!"})
\ No newline at end of file
+    return JsonResponse({"message": "Hello, From the room booking app!"})
+
+class RequestMetricsView(APIView):
+    """
+    API endpoint exposing per-endpoint latency, query and render statistics
+    collected by ``RequestMetricsMiddleware`` in this process.
+    
+    Only accessible by managers and administrators.
+    
+    Returns:
+        Response: {"enabled": bool, "endpoints": {"<METHOD> /<route>": {
+            "requests", "window", "total_ms", "db_ms", "render_ms", "serialize_ms", "queries", "histogram_ms"}}}
+    """
+    permission_classes = [IsManagerOrAdmin]
+
+    def get(self, request):
+        return Response(metrics_snapshot())
@@ -0,0 +1,135 @@
+from collections import defaultdict
+from datetime import datetime, time as dt_time, timedelta
+from itertools import groupby
+from operator import attrgetter
+
+from django.db.models import F, FilteredRelation, Max, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from bookings.intervals import DEFAULT_DURATION, IntervalSet, buckets, floor_bucket, overlap_q, overlapping
+from bookings.models import Booking, RoomSlotOccupancy
+from rooms.models import Room
+
+# Hours an availability check may start at (as accepted by RoomAvailabilityView).
+SLOT_HOURS = range(9, 19)
+
+
+def room_availability(room_type, start_time, end_time=None):
+    """
+    Rooms of ``room_type`` that still have a free seat for all of ``[start_time, end_time)``.
+
+    ``end_time`` defaults to one hour after ``start_time``. Read with the one
+    query of ``availability_queryset()``; a room's occupancy is the most of
+    its bookings running at the same instant, so back-to-back bookings share
+    a seat, or the most seats claimed in ``RoomSlotOccupancy`` in one of the
+    interval's buckets when that is higher (series occurrences not
+    materialized yet hold seats without a Booking row). Private and
+    conference rooms are exclusive (a single booking fills them), shared
+    desks take bookings up to their ``capacity``.
+
+    Returns:
+        list: Rooms ordered by id, with ``occupied`` and ``remaining`` seats set.
+    """
+    return _with_remaining(availability_queryset(room_type, start_time, end_time), start_time, end_time)
+
+
+async def aroom_availability(room_type, start_time, end_time=None):
+    """Async ``room_availability()``."""
+    rows = [room async for room in availability_queryset(room_type, start_time, end_time)]
+    return _with_remaining(rows, start_time, end_time)
+
+
+def availability_queryset(room_type, start_time, end_time=None):
+    """
+    Rooms of ``room_type`` LEFT JOIN their active bookings overlapping ``[start_time, end_time)``.
+
+    One row per (room, booking), or per room without any, ordered by room
+    id; ``booked_from`` and ``booked_until`` are the booking's bounds (None
+    without one). The join is the bounded range of ``overlap_q()``.
+    ``claimed`` is the most seats claimed in one of the interval's buckets.
+    """
+    end_time = end_time or start_time + DEFAULT_DURATION
+    claimed = (
+        RoomSlotOccupancy.objects.filter(room=OuterRef("pk"), start_time__in=buckets(start_time, end_time))
+        .values("room")
+        .annotate(peak=Max("used"))
+        .values("peak")
+    )
+    return (
+        Room.objects.filter(room_type=room_type)
+        .annotate(
+            active_bookings=FilteredRelation(
+                "booking",
+                condition=Q(booking__status="ACTIVE") & overlap_q(start_time, end_time, prefix="booking__"),
+            ),
+        )
+        .annotate(booked_from=F("active_bookings__start_time"), booked_until=F("active_bookings__end_time"))
+        .annotate(claimed=Subquery(claimed))
+        .order_by("id")
+    )
+
+
+def _with_remaining(rows, start_time, end_time):
+    end_time = end_time or start_time + DEFAULT_DURATION
+    available = []
+    for _, group in groupby(rows, key=attrgetter("pk")):
+        group = list(group)
+        room = group[0]
+        intervals = IntervalSet((row.booked_from, row.booked_until) for row in group if row.booked_from is not None)
+        room.occupied = max(intervals.max_overlap(start_time, end_time) if intervals else 0, room.claimed or 0)
+        room.remaining = room.seat_limit - room.occupied
+        if room.remaining > 0:
+            available.append(room)
+    return available
+
+
+def grid_slots(start_date, end_date):
+    """Every slot start from ``start_date`` to ``end_date`` inclusive, as aware datetimes."""
+    days = (end_date - start_date).days + 1
+    return [
+        timezone.make_aware(datetime.combine(start_date + timedelta(days=day), dt_time(hour)))
+        for day in range(days)
+        for hour in SLOT_HOURS
+    ]
+
+
+def availability_grid(room_types, slots):
+    """
+    Free seats of every room of ``room_types`` in every one of ``slots`` (one hour each).
+
+    The active bookings overlapping the whole range, and the seats claimed in
+    it (``RoomSlotOccupancy``, which also holds series occurrences not
+    materialized yet), are read with one range query each; rooms are then
+    streamed in id order.
+
+    Returns:
+        iterator: ``(room, [remaining seats per slot])`` pairs.
+    """
+    by_room = defaultdict(IntervalSet)
+    bookings = overlapping(
+        Booking.objects.filter(status="ACTIVE", room__room_type__in=room_types),
+        slots[0], slots[-1] + DEFAULT_DURATION,
+    ).values_list("room_id", "start_time", "end_time")
+    for room_id, start, end in bookings:
+        by_room[room_id].add(start, end)
+    claimed = defaultdict(dict)
+    counters = RoomSlotOccupancy.objects.filter(
+        room__room_type__in=room_types, used__gt=0,
+        start_time__gte=floor_bucket(slots[0]), start_time__lt=slots[-1] + DEFAULT_DURATION,
+    ).values_list("room_id", "start_time", "used")
+    for room_id, bucket, used in counters:
+        claimed[room_id][bucket] = used
+
+    for room in Room.objects.filter(room_type__in=room_types).order_by("id").iterator(chunk_size=2000):
+        limit = room.seat_limit
+        intervals, held = by_room.get(room.pk), claimed.get(room.pk)
+        if intervals is None and held is None:
+            yield room, [limit] * len(slots)
+            continue
+        remaining = []
+        for slot in slots:
+            used = intervals.max_overlap(slot, slot + DEFAULT_DURATION) if intervals else 0
+            if held:
+                used = max(used, *(held.get(bucket, 0) for bucket in buckets(slot, slot + DEFAULT_DURATION)))
+            remaining.append(max(limit - used, 0))
+        yield room, remaining
@@ -0,0 +1,232 @@
+"""
+Read-through cache for room availability.
+
+Entries live in the Django cache named by ``settings.AVAILABILITY_CACHE_ALIAS``
+(locmem out of the box, any shared backend in production) and are dropped
+precisely when a booking overlapping their slot is created or cancelled,
+through the ``bookings_changed`` signal, or a series holds or frees seats
+in it (``seats_held``). Only the standard one-hour slots
+starting on the hour are cached; other intervals are always computed.
+"""
+from datetime import timedelta, timezone as dt_timezone
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Min, Q
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.http import quote_etag
+from rest_framework.renderers import JSONRenderer
+
+from bookings.intervals import DEFAULT_DURATION, MAX_DURATION
+from bookings.models import Booking
+from bookings.signals import bookings_changed, seats_held
+from rooms.availability import aroom_availability, room_availability
+from rooms.models import Room
+from rooms.serializers import RoomAvailabilitySerializer, RoomSerializer
+
+HITS_KEY = "availability:stats:hits"
+MISSES_KEY = "availability:stats:misses"
+OCCUPIED_KEY = "availability:occupied"
+
+
+def get_cache():
+    return caches[settings.AVAILABILITY_CACHE_ALIAS]
+
+
+def normalize_slot(value):
+    """Aware UTC datetime; naive values are read in the default time zone, as the ORM does."""
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value.astimezone(dt_timezone.utc)
+
+
+def availability_key(room_type, start_time):
+    return f"availability:{room_type}:{normalize_slot(start_time).isoformat()}"
+
+
+def is_cacheable(start_time, end_time):
+    """Whether ``[start_time, end_time)`` is a standard slot: one hour, starting on the hour."""
+    start_time, end_time = normalize_slot(start_time), normalize_slot(end_time)
+    return end_time - start_time == DEFAULT_DURATION and start_time == _floor_hour(start_time)
+
+
+def _floor_hour(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def cached_room_availability(room_type, start_time, end_time):
+    """Serialized ``room_availability()`` for a (room type, interval), served from the cache when possible."""
+    if not is_cacheable(start_time, end_time):
+        return RoomAvailabilitySerializer(room_availability(room_type, start_time, end_time), many=True).data
+    cache = get_cache()
+    key = availability_key(room_type, start_time)
+    data = cache.get(key)
+    if data is not None:
+        _count(HITS_KEY)
+        return data
+    _count(MISSES_KEY)
+    data = RoomAvailabilitySerializer(room_availability(room_type, start_time), many=True).data
+    cache.set(key, data, settings.AVAILABILITY_CACHE_TIMEOUT)
+    return data
+
+
+async def acached_room_availability(room_type, start_time, end_time):
+    """Async ``cached_room_availability()``, through the async cache and ORM APIs."""
+    if not is_cacheable(start_time, end_time):
+        return RoomAvailabilitySerializer(await aroom_availability(room_type, start_time, end_time), many=True).data
+    cache = get_cache()
+    key = availability_key(room_type, start_time)
+    data = await cache.aget(key)
+    if data is not None:
+        await _acount(HITS_KEY)
+        return data
+    await _acount(MISSES_KEY)
+    data = RoomAvailabilitySerializer(await aroom_availability(room_type, start_time), many=True).data
+    await cache.aset(key, data, settings.AVAILABILITY_CACHE_TIMEOUT)
+    return data
+
+
+def occupied_rooms_snapshot(now):
+    """
+    Snapshot of the rooms occupied at ``now``, as listed by ``GetRoomsView``.
+
+    The snapshot is kept until the next moment the answer can change on its
+    own (the next booking start or end, at most one hour ahead), and is
+    dropped early by any booking change around the present.
+
+    Returns:
+        dict: ``{"body": JSON bytes of the room list, "etag": quoted ETag of the body,
+        "valid_from": datetime, "valid_until": datetime}``.
+    """
+    cache = get_cache()
+    now = normalize_slot(now)
+    entry = cache.get(OCCUPIED_KEY)
+    if _is_current(entry, now):
+        _count(HITS_KEY)
+        return entry
+    _count(MISSES_KEY)
+
+    data = RoomSerializer(_occupied_rooms(now), many=True).data
+    boundaries, aggregates = _booking_boundaries(now)
+    entry, timeout = _occupied_entry(now, data, boundaries.aggregate(**aggregates))
+    cache.set(OCCUPIED_KEY, entry, timeout)
+    return entry
+
+
+async def aoccupied_rooms_snapshot(now):
+    """Async ``occupied_rooms_snapshot()``, through the async cache and ORM APIs."""
+    cache = get_cache()
+    now = normalize_slot(now)
+    entry = await cache.aget(OCCUPIED_KEY)
+    if _is_current(entry, now):
+        await _acount(HITS_KEY)
+        return entry
+    await _acount(MISSES_KEY)
+
+    data = RoomSerializer([room async for room in _occupied_rooms(now)], many=True).data
+    boundaries, aggregates = _booking_boundaries(now)
+    entry, timeout = _occupied_entry(now, data, await boundaries.aaggregate(**aggregates))
+    await cache.aset(OCCUPIED_KEY, entry, timeout)
+    return entry
+
+
+def _is_current(entry, now):
+    return entry is not None and entry["valid_from"] <= now < entry["valid_until"]
+
+
+def _occupied_rooms(now):
+    # A booking running at ``now`` started at most MAX_DURATION before it; the
+    # lower bound keeps this a short range scan however long the history.
+    occupied = Booking.objects.filter(
+        status="ACTIVE", start_time__gte=now - MAX_DURATION, start_time__lte=now, end_time__gte=now,
+    )
+    return Room.objects.filter(id__in=occupied.values_list("room_id", flat=True))
+
+
+def _booking_boundaries(now):
+    """Active bookings that can start or end within the next hour, and the aggregates finding the first such change."""
+    queryset = Booking.objects.filter(
+        status="ACTIVE", start_time__gte=now - MAX_DURATION, start_time__lte=now + timedelta(hours=1), end_time__gte=now,
+    )
+    return queryset, {
+        "next_start": Min("start_time", filter=Q(start_time__gt=now)),
+        "next_end": Min("end_time", filter=Q(end_time__gt=now)),
+    }
+
+
+def _occupied_entry(now, data, boundaries):
+    changes = [now + timedelta(hours=1)]
+    if boundaries["next_start"]:
+        changes.append(boundaries["next_start"])
+    if boundaries["next_end"]:
+        # Bookings are occupied through end_time inclusive, so they drop out just after it.
+        changes.append(boundaries["next_end"] + timedelta(microseconds=1))
+    valid_until = min(changes)
+    body = JSONRenderer().render(data)
+    entry = {
+        "valid_from": now,
+        "valid_until": valid_until,
+        "body": body,
+        "etag": quote_etag(md5(body, usedforsecurity=False).hexdigest()),
+    }
+    return entry, max(1, int((valid_until - now).total_seconds()) + 1)
+
+
+def invalidate_bookings(bookings):
+    """Drop every cached entry whose answer depends on one of ``bookings``."""
+    keys = set()
+    for booking in bookings:
+        # Every cached hour slot overlapping the booking.
+        slot, end_time = _floor_hour(normalize_slot(booking.start_time)), normalize_slot(booking.end_time)
+        while slot < end_time:
+            keys.add(availability_key(booking.room.room_type, slot))
+            slot += DEFAULT_DURATION
+    now = timezone.now()
+    if any(
+        normalize_slot(b.end_time) >= now and normalize_slot(b.start_time) <= now + timedelta(hours=1)
+        for b in bookings
+    ):
+        keys.add(OCCUPIED_KEY)
+    get_cache().delete_many(list(keys))
+
+
+def cache_stats():
+    cache = get_cache()
+    counts = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits, misses = counts.get(HITS_KEY, 0), counts.get(MISSES_KEY, 0)
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+    }
+
+
+def _count(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        # First hit/miss, or the counter was evicted.
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+async def _acount(key):
+    cache = get_cache()
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        if not await cache.aadd(key, 1, None):
+            await cache.aincr(key)
+
+
+@receiver(bookings_changed)
+@receiver(seats_held)
+def _invalidate_changed_bookings(sender, bookings, **kwargs):
+    invalidate_bookings(bookings)
+    # Once more after commit, in case a concurrent read cached the old state
+    # between this change and the end of its transaction.
+    transaction.on_commit(lambda: invalidate_bookings(bookings))
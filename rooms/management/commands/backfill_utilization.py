@@ -0,0 +1,64 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from bookings.models import ArchivedBooking, Booking
+from rooms.utilization import recount
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the hourly/daily utilization rollups from active bookings, one chunk of days at a time. '
+        'Bookings keep them current afterwards; run this once for existing history, or to repair a range.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First day, YYYY-MM-DD (default: day of the earliest booking, archived or not).')
+        parser.add_argument('--end', help='Last day, YYYY-MM-DD (default: day of the latest booking end, archived or not).')
+        parser.add_argument('--chunk-days', type=int, default=7, help='Days rebuilt per transaction (default: 7).')
+
+    def handle(self, *args, **options):
+        # Archived bookings still count towards the rollups of their days.
+        bounds = [
+            model.objects.filter(status='ACTIVE').aggregate(first=Min('start_time'), last=Max('end_time'))
+            for model in (Booking, ArchivedBooking)
+        ]
+        bounds = {
+            'first': min((b['first'] for b in bounds if b['first']), default=None),
+            'last': max((b['last'] for b in bounds if b['last']), default=None),
+        }
+        try:
+            first_day = parse_date(options['start'] or '') or (bounds['first'] and timezone.localdate(bounds['first']))
+            last_day = parse_date(options['end'] or '') or (bounds['last'] and timezone.localdate(bounds['last']))
+        except ValueError:
+            raise CommandError('Invalid --start/--end. Use YYYY-MM-DD.')
+        if not first_day or not last_day:
+            self.stdout.write('No bookings to roll up.')
+            return
+        if last_day < first_day:
+            raise CommandError('--end is before --start.')
+
+        chunk = timedelta(days=max(1, options['chunk_days']))
+        started = time.perf_counter()
+        read = written = 0
+        day = first_day
+        while day <= last_day:
+            until = min(day + chunk - timedelta(days=1), last_day)
+            bookings, rows = recount(None, day, until)
+            read += bookings
+            written += rows
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'{day.isoformat()} .. {until.isoformat()}: {bookings} bookings, {rows} hourly rows '
+                f'({read / elapsed if elapsed else 0:.0f} bookings/s)'
+            )
+            day = until + timedelta(days=1)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Rolled up {read} bookings into {written} hourly rows in {elapsed:.1f}s '
+            f'({read / elapsed if elapsed else 0:.0f} bookings/s).'
+        ))
@@ -1,30 +1,182 @@
-from django.core.management.base import BaseCommand
+import random
+import time
+from bisect import bisect_right
+from datetime import datetime, time as dt_time, timedelta
+from itertools import accumulate
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from bookings.intervals import buckets
+from bookings.models import Booking, RoomSlotOccupancy, Team
+from roombooking import versioning
+from rooms import occupancy
 from rooms.models import Room
+from users.models import User
+
 
 class Command(BaseCommand):
-    help = 'Seed the database with initial rooms.'
+    help = (
+        'Seed the database with rooms (idempotent upsert, existing bookings are kept) '
+        'and optionally with synthetic historic bookings for benchmarking.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--private', type=int, default=8, help='Private rooms P1..Pn (default: 8).')
+        parser.add_argument('--conference', type=int, default=4, help='Conference rooms C1..Cn (default: 4).')
+        parser.add_argument('--shared', type=int, default=3, help='Shared desks S1..Sn (default: 3).')
+        parser.add_argument('--private-capacity', type=int, default=1)
+        parser.add_argument('--conference-capacity', type=int, default=20)
+        parser.add_argument('--shared-capacity', type=int, default=4)
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per INSERT (default: 1000).')
+        parser.add_argument('--bookings', type=int, default=0, help='Synthetic past bookings to generate (default: 0).')
+        parser.add_argument('--days', type=int, default=90, help='History window for synthetic bookings (default: 90).')
+        parser.add_argument('--cancelled-ratio', type=float, default=0.1, help='Share of cancelled synthetic bookings.')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed for reproducible data.')
 
     def handle(self, *args, **options):
-        Room.objects.all().delete()
-        # 8 Private Rooms
-        for i in range(1, 9):
-            Room.objects.create(
-                room_type='PRIVATE',
-                capacity=1,
-                room_number=f'P{i}'
-            )
-        # 4 Conference Rooms
-        for i in range(1, 5):
-            Room.objects.create(
-                room_type='CONFERENCE',
-                capacity=20,  # Arbitrary large number, logic will enforce min 3
-                room_number=f'C{i}'
-            )
-        # 3 Shared Desks (each allows up to 4 users)
-        for i in range(1, 4):
-            Room.objects.create(
-                room_type='SHARED',
-                capacity=4,
-                room_number=f'S{i}'
+        self.batch_size = options['batch_size']
+        self.random = random.Random(options['seed'])
+        started = time.perf_counter()
+        with transaction.atomic():
+            rooms = self.upsert_rooms(options)
+            self.stdout.write(self.style.SUCCESS(f'Successfully seeded {rooms} rooms.'))
+            if options['bookings']:
+                created = self.generate_bookings(options)
+                self.stdout.write(self.style.SUCCESS(f'Generated {created} synthetic bookings.'))
+            # Bulk inserts send no model signals; conditional GETs must still see the change.
+            versioning.bump_on_commit('rooms', *(('bookings', 'users') if options['bookings'] else ()))
+        self.stdout.write(f'Done in {time.perf_counter() - started:.1f}s.')
+
+    def upsert_rooms(self, options):
+        specs = [
+            ('PRIVATE', 'P', options['private'], options['private_capacity']),
+            ('CONFERENCE', 'C', options['conference'], options['conference_capacity']),
+            ('SHARED', 'S', options['shared'], options['shared_capacity']),
+        ]
+        rooms = [
+            Room(room_type=room_type, capacity=capacity, room_number=f'{prefix}{i}')
+            for room_type, prefix, count, capacity in specs
+            for i in range(1, count + 1)
+        ]
+        for offset in range(0, len(rooms), self.batch_size):
+            Room.objects.bulk_create(
+                rooms[offset:offset + self.batch_size],
+                update_conflicts=True,
+                unique_fields=['room_number'],
+                update_fields=['room_type', 'capacity'],
             )
-        self.stdout.write(self.style.SUCCESS('Successfully seeded 15 rooms.')) 
\ No newline at end of file
+        # bulk_create sends no model signals.
+        if occupancy.enabled():
+            transaction.on_commit(occupancy.invalidate_rooms)
+        return len(rooms)
+
+    def generate_bookings(self, options):
+        """
+        Fill past business-hour slots with bookings, never over capacity.
+
+        Only slots without any active booking are used, so re-running the
+        command adds history without over-booking what is already there.
+        Rooms' seats are sampled per slot and every user books at most once
+        per slot; conference rooms are booked by a pool of synthetic teams.
+        """
+        rooms = list(Room.objects.order_by('id'))
+        if not rooms:
+            raise CommandError('No rooms to book.')
+        team_rooms = [room for room in rooms if room.room_type == 'CONFERENCE']
+        seat_rooms = [room for room in rooms if room.room_type != 'CONFERENCE']
+        # Seat index -> room, through cumulative seat counts.
+        seat_ends = list(accumulate(room.seat_limit for room in seat_rooms))
+        seats = seat_ends[-1] if seat_ends else 0
+
+        today = timezone.localdate()
+        window_start = timezone.make_aware(datetime.combine(today - timedelta(days=options['days']), dt_time(9)))
+        taken = set(
+            Booking.objects.filter(status='ACTIVE', start_time__gte=window_start, start_time__lt=timezone.now())
+            .values_list('start_time', flat=True).distinct()
+        )
+        slots = [
+            timezone.make_aware(datetime.combine(today - timedelta(days=day), dt_time(hour)))
+            for day in range(1, options['days'] + 1)
+            for hour in range(9, 18)
+        ]
+        slots = [slot for slot in slots if slot not in taken]
+        if not slots:
+            raise CommandError('Every slot in the history window already has bookings; widen --days.')
+
+        per_slot = -(-options['bookings'] // len(slots))
+        per_slot_teams = min(len(team_rooms), per_slot // 10) if team_rooms else 0
+        per_slot_users = min(seats, per_slot - per_slot_teams)
+        if per_slot_users + per_slot_teams == 0:
+            raise CommandError('No capacity to place synthetic bookings.')
+
+        users = self.user_pool(per_slot_users * 2)
+        teams = self.team_pool(max(per_slot_teams * 2, 1)) if per_slot_teams else []
+
+        created = 0
+        batch = []
+        occupancy = {}
+        for slot in slots:
+            if created + len(batch) >= options['bookings']:
+                break
+            for user, seat in zip(self.random.sample(users, per_slot_users), self.random.sample(range(seats), per_slot_users)):
+                room = seat_rooms[bisect_right(seat_ends, seat)]
+                batch.append(self.booking(room, slot, options, user=user))
+            for team, room in zip(self.random.sample(teams, per_slot_teams), self.random.sample(team_rooms, per_slot_teams)):
+                batch.append(self.booking(room, slot, options, team=team))
+            if len(batch) >= self.batch_size:
+                created += self.flush(batch, occupancy, options['bookings'] - created)
+        created += self.flush(batch, occupancy, options['bookings'] - created)
+
+        RoomSlotOccupancy.objects.bulk_create(
+            [RoomSlotOccupancy(room_id=room_id, start_time=slot, used=used) for (room_id, slot), used in occupancy.items()],
+            batch_size=self.batch_size,
+            update_conflicts=True,
+            unique_fields=['room', 'start_time'],
+            update_fields=['used'],
+        )
+        return created
+
+    def booking(self, room, slot, options, user=None, team=None):
+        cancelled = self.random.random() < options['cancelled_ratio']
+        return Booking(
+            room=room, user=user, team=team, start_time=slot, end_time=slot + timedelta(hours=1),
+            booking_type='TEAM' if team else 'INDIVIDUAL', status='CANCELLED' if cancelled else 'ACTIVE',
+        )
+
+    def flush(self, batch, occupancy, limit):
+        rows = batch[:limit]
+        batch.clear()
+        Booking.objects.bulk_create(rows, batch_size=self.batch_size)
+        for booking in rows:
+            if booking.status == 'ACTIVE':
+                for bucket in buckets(booking.start_time, booking.end_time):
+                    key = (booking.room_id, bucket)
+                    occupancy[key] = occupancy.get(key, 0) + 1
+        return len(rows)
+
+    def user_pool(self, size, prefix='seed-user'):
+        names = [f'{prefix}-{i}' for i in range(size)]
+        existing = set(User.objects.filter(name__in=names).values_list('name', flat=True))
+        User.objects.bulk_create(
+            (User(name=name, age=self.random.randint(18, 65)) for name in names if name not in existing),
+            batch_size=self.batch_size,
+        )
+        return list(User.objects.filter(name__in=names))
+
+    def team_pool(self, size, team_size=4):
+        """Synthetic teams, drawn from their own user pool so members never clash with individual bookers."""
+        names = [f'seed-team-{i}' for i in range(size)]
+        existing = {team.name: team for team in Team.objects.filter(name__in=names)}
+        missing = Team.objects.bulk_create(Team(name=name) for name in names if name not in existing)
+        members = self.user_pool(len(missing) * team_size, prefix=f'seed-member-{len(existing)}')
+        Team.members.through.objects.bulk_create(
+            (
+                Team.members.through(team_id=team.pk, user_id=member.pk)
+                for i, team in enumerate(missing)
+                for member in members[i * team_size:(i + 1) * team_size]
+            ),
+            batch_size=self.batch_size,
+        )
+        return list(existing.values()) + missing
@@ -0,0 +1,49 @@
+# Generated by Django 5.0.2 on 2026-10-17 13:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rooms', '0002_room_type_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HourlyUtilization',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('seat_minutes', models.PositiveIntegerField(default=0)),
+                ('bookings', models.PositiveIntegerField(default=0)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='rooms.room')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyUtilization',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('seat_minutes', models.PositiveIntegerField(default=0)),
+                ('bookings', models.PositiveIntegerField(default=0)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='rooms.room')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='daily_utilization_day_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailyutilization',
+            constraint=models.UniqueConstraint(fields=('room', 'day'), name='daily_utilization_room_day_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='hourlyutilization',
+            index=models.Index(fields=['hour'], name='hourly_utilization_hour_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='hourlyutilization',
+            constraint=models.UniqueConstraint(fields=('room', 'hour'), name='hourly_utilization_room_hour_uniq'),
+        ),
+    ]
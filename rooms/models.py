@@ -8,9 +8,49 @@ class Room(models.Model):
         ("CONFERENCE", "Conference Room"),
         ("SHARED", "Shared Desk"),
     ]
-    room_type = models.CharField(max_length=15, choices=ROOM_TYPE_CHOICES)
+    room_type = models.CharField(max_length=15, choices=ROOM_TYPE_CHOICES, db_index=True)
     capacity = models.PositiveIntegerField()
     room_number = models.CharField(max_length=10, unique=True)
 
+    @property
+    def seat_limit(self):
+        """Bookings the room takes per slot: shared desks up to capacity, other rooms are exclusive."""
+        return self.capacity if self.room_type == "SHARED" else 1
+
     def __str__(self):
         return f"{self.room_type} - {self.room_number}"
+
+
+class HourlyUtilization(models.Model):
+    """
+    Booked seat-minutes of a room within one business hour, rolled up from active bookings.
+
+    Maintained by ``rooms/utilization.py``: recounted for every room and day a
+    committed booking change touches, and filled for history by
+    ``manage.py backfill_utilization``. Hours without bookings have no row.
+    """
+    room = models.ForeignKey(Room, on_delete=models.CASCADE)
+    hour = models.DateTimeField()
+    seat_minutes = models.PositiveIntegerField(default=0)
+    # Bookings starting within the hour.
+    bookings = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["room", "hour"], name="hourly_utilization_room_hour_uniq"),
+        ]
+        indexes = [models.Index(fields=["hour"], name="hourly_utilization_hour_idx")]
+
+
+class DailyUtilization(models.Model):
+    """The ``HourlyUtilization`` rows of a room and day, summed."""
+    room = models.ForeignKey(Room, on_delete=models.CASCADE)
+    day = models.DateField()
+    seat_minutes = models.PositiveIntegerField(default=0)
+    bookings = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["room", "day"], name="daily_utilization_room_day_uniq"),
+        ]
+        indexes = [models.Index(fields=["day"], name="daily_utilization_day_idx")]
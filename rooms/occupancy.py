@@ -0,0 +1,299 @@
+"""
+Optional in-process occupancy index for availability reads and the allocator.
+
+For every day asked about, a compact grid of used seats per room and
+``GRANULARITY`` bucket of the business hours (``SLOT_HOURS``) is built lazily
+from the active bookings overlapping the day, raised to the seats claimed in
+``RoomSlotOccupancy`` where those are higher (series occurrences not
+materialized yet). After each committed booking change (``bookings_changed``,
+or ``seats_held`` for series holds) the rows of the touched rooms and days are
+recounted from the database, and a per-day version counter in the
+availability cache is bumped so other processes notice their grid is stale
+and rebuild it on their next read. Room inventory changes bump a global
+generation counter the same way.
+
+Rooms and their serialized data are loaded once per generation and shared by
+the grids of every day; each day only adds its seat counts. At most
+``settings.OCCUPANCY_INDEX_MAX_DAYS`` days are kept, the least recently read
+one being dropped first.
+
+Reads the index cannot answer (disabled, or an interval that is not made of
+whole buckets within one day's business hours) return None and callers fall back to the database query. Enabled with
+``settings.OCCUPANCY_INDEX_ENABLED``; version counters only reach other
+processes when the availability cache is a shared backend.
+"""
+import threading
+from array import array
+from collections import OrderedDict
+from datetime import datetime, time as dt_time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from bookings.intervals import GRANULARITY, buckets, is_aligned, overlapping
+from bookings.models import Booking, RoomSlotOccupancy
+from bookings.signals import bookings_changed, seats_held
+from rooms.availability import SLOT_HOURS
+from rooms.cache import get_cache, normalize_slot
+from rooms.models import Room
+from rooms.serializers import RoomSerializer
+
+GENERATION_KEY = "occupancy:generation"
+BUCKETS_PER_DAY = len(SLOT_HOURS) * (timedelta(hours=1) // GRANULARITY)
+
+_days = OrderedDict()
+_inventory = None
+_lock = threading.RLock()
+
+
+def enabled():
+    return settings.OCCUPANCY_INDEX_ENABLED
+
+
+def version_key(day):
+    return f"occupancy:version:{day.isoformat()}"
+
+
+def bucket_index(moment):
+    """``(local day, bucket index)`` of a bucket start, or None when it is outside the business hours."""
+    local = timezone.localtime(normalize_slot(moment))
+    minutes = (local.hour - SLOT_HOURS[0]) * 60 + local.minute
+    index, rest = divmod(timedelta(minutes=minutes, seconds=local.second, microseconds=local.microsecond), GRANULARITY)
+    if rest or not 0 <= index < BUCKETS_PER_DAY:
+        return None
+    return local.date(), index
+
+
+def slot_cell(start_time, end_time):
+    """``(local day, first bucket, last bucket + 1)`` of an interval, or None when the index cannot hold it."""
+    if not is_aligned(start_time) or not is_aligned(end_time):
+        return None
+    first = bucket_index(start_time)
+    last = bucket_index(end_time - GRANULARITY)
+    if first is None or last is None or first[0] != last[0] or last[1] < first[1]:
+        return None
+    return first[0], first[1], last[1] + 1
+
+
+def available_rooms(room_type, start_time, end_time):
+    """
+    Rooms of ``room_type`` with a free seat for all of ``[start_time, end_time)``, from the index.
+
+    Returns:
+        list or None: ``(room, remaining seats)`` pairs ordered by room id,
+        or None when the index cannot answer.
+    """
+    found = _lookup(room_type, start_time, end_time)
+    if found is None:
+        return None
+    grid, first, last = found
+    return grid.available(first, last) if grid else []
+
+
+def room_availability_data(room_type, start_time, end_time):
+    """Serialized ``available_rooms()``, shaped like ``RoomAvailabilitySerializer`` output."""
+    found = _lookup(room_type, start_time, end_time)
+    if found is None:
+        return None
+    grid, first, last = found
+    if grid is None:
+        return []
+    return [
+        {**grid.rooms.data[room.pk], "remaining": remaining}
+        for room, remaining in grid.available(first, last)
+    ]
+
+
+def _lookup(room_type, start_time, end_time):
+    if not enabled():
+        return None
+    cell = slot_cell(start_time, end_time)
+    if cell is None:
+        return None
+    day, first, last = cell
+    return _current_day(day).grids.get(room_type), first, last
+
+
+def clear():
+    global _inventory
+    with _lock:
+        _days.clear()
+        _inventory = None
+
+
+def invalidate_rooms():
+    """Drop every grid, here and (through the generation counter) in other processes."""
+    clear()
+    _bump(GENERATION_KEY)
+
+
+class _TypeRooms:
+    """Rooms of one type, their serialized data keyed by id and seat limits; shared by every day's grid."""
+
+    def __init__(self, rooms):
+        self.rooms = rooms
+        self.data = {room.pk: data for room, data in zip(rooms, RoomSerializer(rooms, many=True).data)}
+        self.position = {room.pk: i for i, room in enumerate(rooms)}
+        self.limits = array("I", (room.seat_limit for room in rooms))
+
+
+class _Inventory:
+    """Every room, grouped by type, as of one generation."""
+
+    def __init__(self, generation):
+        self.generation = generation
+        by_type = {}
+        self.room_types = {}
+        for room in Room.objects.order_by("id"):
+            by_type.setdefault(room.room_type, []).append(room)
+            self.room_types[room.pk] = room.room_type
+        self.types = {room_type: _TypeRooms(rooms) for room_type, rooms in by_type.items()}
+
+
+class _RoomGrid:
+    """Used seats of one day per room of a type, bucket-major so one bucket's row is contiguous."""
+
+    def __init__(self, rooms):
+        self.rooms = rooms
+        self.used = array("I", [0]) * (len(rooms.rooms) * BUCKETS_PER_DAY)
+
+    def available(self, first, last):
+        rooms, used, limits = self.rooms.rooms, self.used, self.rooms.limits
+        size = len(rooms)
+        peak = used[first * size:(first + 1) * size]
+        for bucket in range(first + 1, last):
+            row = used[bucket * size:(bucket + 1) * size]
+            peak = array("I", map(max, peak, row))
+        return [(room, limits[i] - peak[i]) for i, room in enumerate(rooms) if peak[i] < limits[i]]
+
+    def set_row(self, room_id, counts):
+        size, i = len(self.rooms.rooms), self.rooms.position[room_id]
+        for bucket, count in enumerate(counts):
+            self.used[bucket * size + i] = count
+
+
+class _DayOccupancy:
+    def __init__(self, day, version, inventory):
+        self.day = day
+        self.version = version
+        self.generation = inventory.generation
+        self.room_types = inventory.room_types
+        self.grids = {room_type: _RoomGrid(rooms) for room_type, rooms in inventory.types.items()}
+
+    def window(self):
+        """``(start, end)`` of the day, so ``overlapping()`` finds every booking touching it."""
+        start = timezone.make_aware(datetime.combine(self.day, dt_time()))
+        return start, start + timedelta(days=1)
+
+    def recount(self, room_ids, bookings, claims=()):
+        """
+        Set the rows of ``room_ids`` from the active ``(room_id, start_time, end_time)`` of the day.
+
+        ``claims`` are ``(room_id, bucket start, used)`` counter rows; a bucket
+        counts the higher of its bookings and its claimed seats.
+        """
+        rows = {room_id: [0] * BUCKETS_PER_DAY for room_id in room_ids if room_id in self.room_types}
+        for room_id, start_time, end_time in bookings:
+            row = rows.get(room_id)
+            if row is None:
+                continue
+            for bucket in buckets(start_time, end_time):
+                cell = bucket_index(bucket)
+                if cell is not None and cell[0] == self.day:
+                    row[cell[1]] += 1
+        for room_id, bucket, used in claims:
+            row, cell = rows.get(room_id), bucket_index(bucket)
+            if row is not None and cell is not None and cell[0] == self.day:
+                row[cell[1]] = max(row[cell[1]], used)
+        for room_id, row in rows.items():
+            self.grids[self.room_types[room_id]].set_row(room_id, row)
+
+
+def _current_day(day):
+    versions = get_cache().get_many([version_key(day), GENERATION_KEY])
+    version, generation = versions.get(version_key(day), 0), versions.get(GENERATION_KEY, 0)
+    with _lock:
+        occupancy = _days.get(day)
+        if occupancy is not None and (occupancy.version, occupancy.generation) == (version, generation):
+            _days.move_to_end(day)
+            return occupancy
+        occupancy = _build(day, version, generation)
+        _days[day] = occupancy
+        _days.move_to_end(day)
+        while len(_days) > settings.OCCUPANCY_INDEX_MAX_DAYS:
+            _days.popitem(last=False)
+    return occupancy
+
+
+def _build(day, version, generation):
+    global _inventory
+    # Versions are read before the data, so a change committed meanwhile
+    # leaves this grid one version behind and it is rebuilt on the next read.
+    if _inventory is None or _inventory.generation != generation:
+        _inventory = _Inventory(generation)
+    occupancy = _DayOccupancy(day, version, _inventory)
+
+    bookings = overlapping(Booking.objects.filter(status="ACTIVE"), *occupancy.window())
+    rows = list(bookings.values_list("room_id", "start_time", "end_time"))
+    claims = list(_claims(RoomSlotOccupancy.objects.all(), occupancy))
+    occupancy.recount({room_id for room_id, _, _ in rows} | {room_id for room_id, _, _ in claims}, rows, claims)
+    return occupancy
+
+
+def _claims(queryset, occupancy):
+    """``(room_id, bucket start, used)`` of the claimed buckets of the day."""
+    return queryset.filter(
+        start_time__gte=occupancy.window()[0], start_time__lt=occupancy.window()[1], used__gt=0,
+    ).values_list("room_id", "start_time", "used")
+
+
+def _refresh(bookings):
+    """Recount the rows of the rooms and days of committed ``bookings`` and move those days to the next version."""
+    rooms_by_day = {}
+    for booking in bookings:
+        for bucket in buckets(booking.start_time, booking.end_time):
+            cell = bucket_index(bucket)
+            if cell is not None:
+                rooms_by_day.setdefault(cell[0], set()).add(booking.room_id)
+
+    with _lock:
+        for day, room_ids in rooms_by_day.items():
+            version = _bump(version_key(day))
+            occupancy = _days.get(day)
+            if occupancy is None:
+                continue
+            if occupancy.version != version - 1:
+                # Another process changed this day too; rebuild on the next read.
+                del _days[day]
+                continue
+            rows = overlapping(Booking.objects.filter(status="ACTIVE", room_id__in=room_ids), *occupancy.window())
+            claims = _claims(RoomSlotOccupancy.objects.filter(room_id__in=room_ids), occupancy)
+            occupancy.recount(room_ids, rows.values_list("room_id", "start_time", "end_time"), claims)
+            occupancy.version = version
+
+
+def _bump(key):
+    cache = get_cache()
+    try:
+        return cache.incr(key)
+    except ValueError:
+        if cache.add(key, 1, None):
+            return 1
+        return cache.incr(key)
+
+
+@receiver(bookings_changed)
+@receiver(seats_held)
+def _bookings_changed(sender, bookings, **kwargs):
+    if enabled():
+        transaction.on_commit(lambda: _refresh(bookings))
+
+
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+def _room_saved_or_deleted(sender, **kwargs):
+    if enabled():
+        transaction.on_commit(invalidate_rooms)
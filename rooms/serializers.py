@@ -4,4 +4,11 @@ from .models import Room
 class RoomSerializer(serializers.ModelSerializer):
     class Meta:
         model = Room
-        fields = ['id', 'room_type', 'capacity', 'room_number'] 
\ No newline at end of file
+        fields = ['id', 'room_type', 'capacity', 'room_number'] 
+
+
+class RoomAvailabilitySerializer(RoomSerializer):
+    remaining = serializers.IntegerField(read_only=True)
+
+    class Meta(RoomSerializer.Meta):
+        fields = RoomSerializer.Meta.fields + ['remaining']
@@ -0,0 +1,470 @@
+import json
+from datetime import datetime, time as dt_time, timedelta
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User as AuthUser
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+from django.test import AsyncRequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from bookings.models import Booking, RoomSlotOccupancy
+from rooms import occupancy
+from rooms.availability import SLOT_HOURS, room_availability
+from rooms.models import DailyUtilization, HourlyUtilization, Room
+from rooms.utilization import refresh
+from rooms.views import AsyncGetRoomsView, AsyncRoomAvailabilityView
+from users.models import User
+
+
+def create_rooms(room_type, count, capacity=1, prefix="R"):
+    Room.objects.bulk_create(
+        Room(room_type=room_type, capacity=capacity, room_number=f"{prefix}{i}") for i in range(1, count + 1)
+    )
+
+
+class RoomAvailabilityTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(AuthUser.objects.create_user("admin", password="admin"))
+        tomorrow = datetime.now() + timedelta(days=1)
+        self.slot = tomorrow.replace(hour=10, minute=0, second=0, microsecond=0)
+        self.user = User.objects.create(name="ann", age=30)
+
+    def book(self, room, slot=None, status="ACTIVE"):
+        slot = slot or self.slot
+        return Booking.objects.create(
+            room=room, user=self.user, start_time=slot, end_time=slot + timedelta(hours=1),
+            booking_type="INDIVIDUAL", status=status,
+        )
+
+    def available(self, room_type):
+        response = self.client.get(
+            "/api/v1/rooms/available", {"room_type": room_type, "slot": self.slot.strftime("%Y-%m-%dT%H:%M")}
+        )
+        self.assertEqual(response.status_code, 200)
+        return {room["room_number"]: room["remaining"] for room in response.data}
+
+    def test_remaining_seats_per_room(self):
+        create_rooms("SHARED", 2, capacity=4, prefix="S")
+        s1 = Room.objects.get(room_number="S1")
+        self.book(s1)
+        self.book(s1)
+        self.book(s1, status="CANCELLED")
+        self.book(s1, slot=self.slot + timedelta(hours=1))
+        self.assertEqual(self.available("SHARED"), {"S1": 2, "S2": 4})
+
+    def test_exclusive_rooms_are_full_after_one_booking(self):
+        create_rooms("CONFERENCE", 2, capacity=20, prefix="C")
+        self.book(Room.objects.get(room_number="C1"))
+        self.assertEqual(self.available("CONFERENCE"), {"C2": 1})
+
+    def test_query_count_is_independent_of_inventory(self):
+        query_counts = []
+        for count in (15, 1500):
+            Room.objects.all().delete()
+            create_rooms("SHARED", count, capacity=4, prefix="S")
+            for room in Room.objects.order_by("id")[:5]:
+                self.book(room)
+            with CaptureQueriesContext(connection) as queries:
+                remaining = self.available("SHARED")
+            self.assertEqual(len(remaining), count)
+            self.assertEqual(sum(remaining.values()), count * 4 - 5)
+            query_counts.append(len(queries))
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_single_grouped_query(self):
+        create_rooms("PRIVATE", 3)
+        with CaptureQueriesContext(connection) as queries:
+            list(room_availability("PRIVATE", self.slot))
+        self.assertEqual(len(queries), 1)
+
+
+class AvailabilityCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(AuthUser.objects.create_user("admin", password="admin"))
+        tomorrow = datetime.now() + timedelta(days=1)
+        self.slot = tomorrow.replace(hour=10, minute=0, second=0, microsecond=0)
+        create_rooms("PRIVATE", 2, prefix="P")
+
+    def available(self):
+        response = self.client.get(
+            "/api/v1/rooms/available", {"room_type": "PRIVATE", "slot": self.slot.strftime("%Y-%m-%dT%H:%M")}
+        )
+        return [room["room_number"] for room in response.data]
+
+    def book(self, name, slot=None):
+        return self.client.post("/api/v1/bookings/", {
+            "user": {"name": name, "age": 30}, "room_type": "PRIVATE", "slot": (slot or self.slot).isoformat(),
+        }, format="json").data
+
+    def test_repeated_reads_are_served_from_cache(self):
+        self.assertEqual(self.available(), ["P1", "P2"])
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.available(), ["P1", "P2"])
+        self.assertEqual(len(queries), 0)
+        stats = self.client.get("/api/v1/rooms/cache-stats").data
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_booking_and_cancel_are_visible_on_the_next_read(self):
+        self.assertEqual(self.available(), ["P1", "P2"])
+        booking = self.book("ann")
+        self.assertEqual(self.available(), ["P2"])
+        self.client.post(f"/api/v1/bookings/cancel/{booking['booking_id']}")
+        self.assertEqual(self.available(), ["P1", "P2"])
+
+    def test_other_slots_keep_their_entries(self):
+        self.available()
+        self.book("ann", slot=self.slot + timedelta(hours=2))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.available(), ["P1", "P2"])
+        self.assertEqual(len(queries), 0)
+
+    def test_current_occupancy_is_invalidated_by_bookings_now(self):
+        self.assertEqual(self.client.get("/api/v1/rooms/").json(), [])
+        now = datetime.now()
+        Booking.objects.create(
+            room=Room.objects.get(room_number="P2"), user=User.objects.create(name="ann", age=30),
+            start_time=now - timedelta(minutes=5), end_time=now + timedelta(minutes=55), booking_type="INDIVIDUAL",
+        )
+        self.assertEqual([room["room_number"] for room in self.client.get("/api/v1/rooms/").json()], ["P2"])
+
+    def test_unchanged_occupancy_is_not_modified(self):
+        first = self.client.get("/api/v1/rooms/")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/v1/rooms/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual((response.status_code, response["ETag"], len(queries)), (304, first["ETag"], 0))
+
+        now = timezone.now()
+        Booking.objects.create(
+            room=Room.objects.get(room_number="P1"), user=User.objects.create(name="ann", age=30),
+            start_time=now - timedelta(minutes=5), end_time=now + timedelta(minutes=55), booking_type="INDIVIDUAL",
+        )
+        response = self.client.get("/api/v1/rooms/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], first["ETag"])
+        self.assertEqual([room["room_number"] for room in response.json()], ["P1"])
+
+
+class AvailabilityGridTests(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(AuthUser.objects.create_user("admin", password="admin"))
+        self.day = (datetime.now() + timedelta(days=1)).date()
+        self.user = User.objects.create(name="ann", age=30)
+        create_rooms("PRIVATE", 2, prefix="P")
+        create_rooms("SHARED", 1, capacity=4, prefix="S")
+
+    def book(self, room_number, day, hour, status="ACTIVE"):
+        start = timezone.make_aware(datetime.combine(day, dt_time(hour)))
+        Booking.objects.create(
+            room=Room.objects.get(room_number=room_number), user=self.user, start_time=start,
+            end_time=start + timedelta(hours=1), booking_type="INDIVIDUAL", status=status,
+        )
+
+    def grid(self, **params):
+        response = self.client.get("/api/v1/rooms/availability-grid", params)
+        if response.status_code != 200:
+            return response
+        return json.loads(b"".join(response.streaming_content))
+
+    def test_matrix_covers_every_room_and_slot(self):
+        tomorrow = self.day + timedelta(days=1)
+        self.book("P1", self.day, 9)
+        self.book("S1", self.day, 10)
+        self.book("S1", self.day, 10)
+        self.book("S1", tomorrow, 17)
+        self.book("P2", self.day, 9, status="CANCELLED")
+
+        grid = self.grid(start=self.day.isoformat(), end=tomorrow.isoformat())
+        self.assertEqual(len(grid["slots"]), 2 * len(SLOT_HOURS))
+        remaining = {room["room_number"]: room["remaining"] for room in grid["rooms"]}
+        self.assertEqual(list(remaining), ["P1", "P2", "S1"])
+        self.assertEqual(remaining["P1"][:2], [0, 1])
+        self.assertEqual(remaining["P2"], [1] * len(grid["slots"]))
+        self.assertEqual(remaining["S1"][1], 2)
+        self.assertEqual(remaining["S1"][len(SLOT_HOURS) + 8], 3)
+        self.assertEqual(sum(remaining["S1"]), 4 * len(grid["slots"]) - 3)
+
+    def test_matches_single_slot_availability(self):
+        self.book("S1", self.day, 11)
+        grid = self.grid(room_type="shared", start=self.day.isoformat())
+        slot = timezone.make_aware(datetime.combine(self.day, dt_time(11)))
+        index = grid["slots"].index(slot.isoformat())
+        self.assertEqual(
+            {room["room_number"]: room["remaining"][index] for room in grid["rooms"]},
+            {room.room_number: room.remaining for room in room_availability("SHARED", slot)},
+        )
+
+    def test_query_count_is_independent_of_range(self):
+        query_counts = []
+        for days in (1, 31):
+            with CaptureQueriesContext(connection) as queries:
+                self.grid(start=self.day.isoformat(), end=(self.day + timedelta(days=days - 1)).isoformat())
+            query_counts.append(len(queries))
+        self.assertEqual(query_counts, [3, 3])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.grid(start="tomorrow").status_code, 400)
+        self.assertEqual(self.grid(room_type="ATTIC", start=self.day.isoformat()).status_code, 400)
+        end = self.day + timedelta(days=31)
+        self.assertEqual(self.grid(start=self.day.isoformat(), end=end.isoformat()).status_code, 400)
+
+
+class AsyncRoomViewsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        admin = AuthUser.objects.create_user("admin", password="admin")
+        self.token = Token.objects.create(user=admin).key
+        self.client.force_authenticate(admin)
+        tomorrow = datetime.now() + timedelta(days=1)
+        self.slot = tomorrow.replace(hour=10, minute=0, second=0, microsecond=0)
+        create_rooms("SHARED", 2, capacity=4, prefix="S")
+        Booking.objects.create(
+            room=Room.objects.get(room_number="S1"), user=User.objects.create(name="ann", age=30),
+            start_time=self.slot, end_time=self.slot + timedelta(hours=1), booking_type="INDIVIDUAL",
+        )
+
+    def call(self, view, path, params=None, token=None):
+        headers = {"Authorization": f"Token {token or self.token}"}
+        request = AsyncRequestFactory().get(path, params or {}, headers=headers)
+        return async_to_sync(view.as_view())(request)
+
+    def test_availability_matches_sync_view(self):
+        for params in (
+            {"room_type": "SHARED", "slot": self.slot.strftime("%Y-%m-%dT%H:%M")},
+            {"room_type": "ATTIC", "slot": self.slot.strftime("%Y-%m-%dT%H:%M")},
+            {"room_type": "SHARED", "slot": "soon"},
+        ):
+            expected = self.client.get("/api/v1/rooms/available", params)
+            response = self.call(AsyncRoomAvailabilityView, "/api/v1/rooms/available", params)
+            self.assertEqual(response.status_code, expected.status_code)
+            self.assertEqual(json.loads(response.content), expected.json())
+
+    def test_occupied_rooms_match_sync_view(self):
+        response = self.call(AsyncGetRoomsView, "/api/v1/rooms/")
+        self.assertEqual(json.loads(response.content), self.client.get("/api/v1/rooms/").json())
+
+    def test_token_authentication_and_permissions(self):
+        request = AsyncRequestFactory().get("/api/v1/rooms/available")
+        response = async_to_sync(AsyncRoomAvailabilityView.as_view())(request)
+        self.assertEqual((response.status_code, response["WWW-Authenticate"]), (401, "Token"))
+        response = self.call(AsyncRoomAvailabilityView, "/api/v1/rooms/available", token="nope")
+        self.assertEqual(json.loads(response.content), {"detail": "Invalid token."})
+
+        guest = Token.objects.create(user=AuthUser.objects.create_user("guest", password="guest")).key
+        self.assertEqual(self.call(AsyncGetRoomsView, "/api/v1/rooms/", token=guest).status_code, 403)
+
+
+@override_settings(OCCUPANCY_INDEX_ENABLED=True)
+class OccupancyIndexTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        occupancy.clear()
+        self.client.force_authenticate(AuthUser.objects.create_user("admin", password="admin"))
+        tomorrow = datetime.now() + timedelta(days=1)
+        self.slot = tomorrow.replace(hour=10, minute=0, second=0, microsecond=0)
+        create_rooms("PRIVATE", 2, prefix="P")
+        create_rooms("SHARED", 2, capacity=4, prefix="S")
+
+    def available(self, room_type):
+        response = self.client.get(
+            "/api/v1/rooms/available", {"room_type": room_type, "slot": self.slot.strftime("%Y-%m-%dT%H:%M")}
+        )
+        return {room["room_number"]: room["remaining"] for room in response.data}
+
+    def book(self, name, room_type):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post("/api/v1/bookings/", {
+                "user": {"name": name, "age": 30}, "room_type": room_type, "slot": self.slot.isoformat(),
+            }, format="json").data
+
+    def test_warm_reads_match_the_database_without_queries(self):
+        self.book("ann", "SHARED")
+        self.available("SHARED")
+        with CaptureQueriesContext(connection) as queries:
+            indexed = self.available("SHARED")
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(indexed, {room.room_number: room.remaining for room in room_availability("SHARED", self.slot)})
+        self.assertEqual(indexed, {"S1": 3, "S2": 4})
+
+    def test_bookings_and_cancels_update_the_index(self):
+        self.assertEqual(self.available("PRIVATE"), {"P1": 1, "P2": 1})
+        booking = self.book("ann", "PRIVATE")
+        self.assertEqual(booking["room"], "P1")
+        self.assertEqual(self.available("PRIVATE"), {"P2": 1})
+        self.assertEqual(self.book("bob", "PRIVATE")["room"], "P2")
+        self.assertEqual(self.book("cat", "PRIVATE"), {"error": "No available room for the selected slot and type."})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"/api/v1/bookings/cancel/{booking['booking_id']}")
+        self.assertEqual(self.available("PRIVATE"), {"P1": 1})
+
+    def test_change_from_another_process_triggers_a_rebuild(self):
+        self.assertEqual(self.available("PRIVATE"), {"P1": 1, "P2": 1})
+        # Written without signals, as another process's change looks from here.
+        Booking.objects.bulk_create([Booking(
+            room=Room.objects.get(room_number="P1"), user=User.objects.create(name="ann", age=30),
+            start_time=self.slot, end_time=self.slot + timedelta(hours=1), booking_type="INDIVIDUAL",
+        )])
+        self.assertEqual(self.available("PRIVATE"), {"P1": 1, "P2": 1})
+        cache.set(occupancy.version_key(self.slot.date()), 1, None)
+        self.assertEqual(self.available("PRIVATE"), {"P2": 1})
+
+    @override_settings(OCCUPANCY_INDEX_MAX_DAYS=2)
+    def test_days_share_room_data_and_the_least_recently_read_is_dropped(self):
+        slots = [self.slot + timedelta(days=n) for n in range(3)]
+        for slot in (slots[0], slots[1], slots[0]):
+            occupancy.available_rooms("PRIVATE", slot, slot + timedelta(hours=1))
+        with CaptureQueriesContext(connection) as queries:
+            occupancy.available_rooms("PRIVATE", slots[2], slots[2] + timedelta(hours=1))
+        # Bookings and seat counters of the new day; the rooms are not read again.
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(list(occupancy._days), [slots[0].date(), slots[2].date()])
+        first, last = (occupancy._days[slot.date()].grids["PRIVATE"] for slot in (slots[0], slots[2]))
+        self.assertIs(first.rooms, last.rooms)
+
+    def test_unaligned_intervals_are_not_indexed(self):
+        hour = timedelta(hours=1)
+        self.assertIsNone(occupancy.available_rooms("PRIVATE", self.slot.replace(minute=7), self.slot + hour))
+        self.assertIsNone(occupancy.available_rooms("PRIVATE", self.slot.replace(hour=18), self.slot.replace(hour=20)))
+        self.assertIsNotNone(occupancy.available_rooms("PRIVATE", self.slot.replace(minute=30), self.slot + hour))
+
+    def test_partial_overlaps_fill_the_interval(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/v1/bookings/", {
+                "user": {"name": "ann", "age": 30}, "room_type": "PRIVATE",
+                "slot": (self.slot + timedelta(minutes=45)).isoformat(), "duration": 30,
+            }, format="json")
+        self.assertEqual(self.available("PRIVATE"), {"P2": 1})
+        self.assertEqual(
+            [room["room_number"] for room in occupancy.room_availability_data(
+                "PRIVATE", self.slot + timedelta(minutes=75), self.slot + timedelta(hours=2),
+            )],
+            ["P1", "P2"],
+        )
+
+
+class SeedRoomsTests(APITestCase):
+    def seed(self, *args):
+        call_command("seed_rooms", *args, stdout=StringIO())
+
+    def test_reseeding_upserts_rooms_and_keeps_bookings(self):
+        self.seed()
+        room = Room.objects.get(room_number="S1")
+        booking = Booking.objects.create(
+            room=room, user=User.objects.create(name="ann", age=30), booking_type="INDIVIDUAL",
+            start_time=datetime(2030, 1, 1, 10), end_time=datetime(2030, 1, 1, 11),
+        )
+        self.seed("--shared", "5", "--shared-capacity", "6")
+        self.assertEqual(Room.objects.count(), 17)
+        self.assertEqual(Room.objects.get(room_number="S1").capacity, 6)
+        self.assertTrue(Booking.objects.filter(pk=booking.pk).exists())
+
+    def test_synthetic_history_respects_capacity(self):
+        self.seed("--bookings", "500", "--days", "5", "--seed", "1")
+        self.seed("--bookings", "300", "--days", "10", "--seed", "2")
+        self.assertEqual(Booking.objects.count(), 800)
+        active = Booking.objects.filter(status="ACTIVE")
+        for room in Room.objects.all():
+            for used in RoomSlotOccupancy.objects.filter(room=room).values_list("used", flat=True):
+                self.assertLessEqual(used, room.seat_limit)
+        # Synthetic bookings last an hour: four 15-minute buckets each.
+        self.assertEqual(sum(RoomSlotOccupancy.objects.values_list("used", flat=True)), 4 * active.count())
+        per_user_slot = active.filter(user__isnull=False).values("user", "start_time").annotate(n=Count("id"))
+        self.assertFalse(per_user_slot.filter(n__gt=1).exists())
+
+
+class UtilizationTests(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(AuthUser.objects.create_user("admin", password="admin"))
+        create_rooms("PRIVATE", 2, prefix="P")
+        create_rooms("SHARED", 1, capacity=4, prefix="S")
+        self.day = timezone.localdate() + timedelta(days=1)
+        self.opening = timezone.make_aware(datetime.combine(self.day, dt_time(9)))
+
+    def book(self, room_type="PRIVATE", name="ann", hour=10, minutes=0, duration=60):
+        slot = self.opening + timedelta(hours=hour - 9, minutes=minutes)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post("/api/v1/bookings/", {
+                "user": {"name": name, "age": 30}, "room_type": room_type, "slot": slot.isoformat(), "duration": duration,
+            }, format="json")
+
+    def report(self, **params):
+        params = {"start": self.day.isoformat(), **params}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/v1/rooms/utilization", params)
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertLessEqual(len(queries), 4)
+        return {row["key"]: row for row in response.data["results"]}
+
+    def test_rollups_follow_bookings_and_cancellations(self):
+        self.book(hour=10, minutes=30, duration=90)
+        cancelled = self.book(name="bob", hour=18, minutes=30, duration=120).data["booking_id"]
+        self.book("SHARED", name="cat", hour=9, duration=480)
+
+        hourly = dict(HourlyUtilization.objects.filter(room__room_number="P1").values_list("hour", "seat_minutes"))
+        hour = lambda h: self.opening + timedelta(hours=h - 9)
+        # 10:30-12:00 is split across two hours; time after closing (19:00) is not counted.
+        self.assertEqual(hourly, {hour(10): 30, hour(11): 60, hour(18): 30})
+
+        by_type = self.report()
+        self.assertEqual(list(by_type), ["PRIVATE", "SHARED"])
+        self.assertEqual(by_type["PRIVATE"]["seat_minutes"], 120)
+        self.assertEqual(by_type["PRIVATE"]["capacity_minutes"], 2 * 600)
+        self.assertEqual(by_type["SHARED"]["utilization"], 0.2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"/api/v1/bookings/cancel/{cancelled}")
+        self.assertFalse(HourlyUtilization.objects.filter(hour=hour(18)).exists())
+        by_room = self.report(group_by="room")
+        self.assertEqual(list(by_room), ["P1", "S1"])
+        self.assertEqual(by_room["P1"]["utilization"], 0.15)
+
+    def test_groupings(self):
+        self.book(hour=10)
+        self.book(name="bob", hour=10)
+        hours = self.report(group_by="hour", room_type="PRIVATE")
+        self.assertEqual(list(hours), [f"{hour:02d}:00" for hour in SLOT_HOURS])
+        self.assertEqual((hours["10:00"]["utilization"], hours["10:00"]["bookings"]), (1.0, 2))
+        days = self.report(group_by="day", end=(self.day + timedelta(days=1)).isoformat())
+        self.assertEqual(days[self.day.isoformat()]["seat_minutes"], 120)
+        self.assertEqual(days[(self.day + timedelta(days=1)).isoformat()]["seat_minutes"], 0)
+        self.assertEqual(self.client.get("/api/v1/rooms/utilization", {"start": self.day, "group_by": "week"}).status_code, 400)
+
+    def test_refresh_only_recounts_the_touched_days(self):
+        rooms = {room.room_number: room for room in Room.objects.all()}
+        user = User.objects.create(name="ann", age=30)
+        bookings = [
+            Booking(room=rooms[number], user=user, booking_type="INDIVIDUAL", start_time=start, end_time=start + timedelta(hours=1))
+            for number, start in (("P1", self.opening), ("P2", self.opening + timedelta(days=60)),
+                                  ("P1", self.opening + timedelta(days=61)), ("P2", self.opening + timedelta(days=1)))
+        ]
+        Booking.objects.bulk_create(bookings)
+        # A day in between that a recount of the whole range would rewrite.
+        untouched = DailyUtilization.objects.create(room=rooms["P1"], day=self.day + timedelta(days=30), seat_minutes=7)
+        with CaptureQueriesContext(connection) as queries:
+            refresh(bookings)
+        self.assertLessEqual(len(queries), 8)
+        self.assertEqual(DailyUtilization.objects.get(pk=untouched.pk).seat_minutes, 7)
+        self.assertEqual(DailyUtilization.objects.exclude(pk=untouched.pk).count(), 4)
+        self.assertEqual(set(DailyUtilization.objects.values_list("seat_minutes", flat=True)), {7, 60})
+
+    def test_backfill_matches_incremental_rollups(self):
+        self.book(hour=10, duration=480)
+        self.book("SHARED", name="bob", hour=13, minutes=15, duration=45)
+        incremental = set(HourlyUtilization.objects.values_list("room_id", "hour", "seat_minutes", "bookings"))
+        HourlyUtilization.objects.all().delete()
+        DailyUtilization.objects.all().delete()
+
+        out = StringIO()
+        call_command("backfill_utilization", chunk_days=1, stdout=out)
+        self.assertIn("Rolled up 2 bookings", out.getvalue())
+        self.assertEqual(set(HourlyUtilization.objects.values_list("room_id", "hour", "seat_minutes", "bookings")), incremental)
+        self.assertEqual(sum(DailyUtilization.objects.values_list("seat_minutes", flat=True)), 480 + 45)
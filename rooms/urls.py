@@ -1,10 +1,18 @@
 
 
+from django.conf import settings
 from django.urls import path
-from rooms.views import GetRoomsView,RoomAvailabilityView
+from rooms.views import GetRoomsView,RoomAvailabilityView,AvailabilityGridView,AvailabilityCacheStatsView,UtilizationView
+from rooms.views import AsyncGetRoomsView, AsyncRoomAvailabilityView
+
+if settings.ASYNC_VIEWS_ENABLED:
+    GetRoomsView, RoomAvailabilityView = AsyncGetRoomsView, AsyncRoomAvailabilityView
 
 
 urlpatterns = [
     path('', GetRoomsView.as_view(), name='booked-rooms'),
     path('available', RoomAvailabilityView.as_view(), name='room-availability'),
+    path('availability-grid', AvailabilityGridView.as_view(), name='availability-grid'),
+    path('cache-stats', AvailabilityCacheStatsView.as_view(), name='availability-cache-stats'),
+    path('utilization', UtilizationView.as_view(), name='room-utilization'),
 ]
@@ -0,0 +1,230 @@
+"""
+Pre-aggregated room utilization.
+
+Utilization is booked seat-minutes over available seat-minutes, counted only
+within business hours (``SLOT_HOURS``, 9:00 to 19:00). Active bookings are
+rolled up into ``HourlyUtilization`` (room, hour) and ``DailyUtilization``
+(room, day) rows. A range query then reads at most one row per room and day
+(or hour), however many bookings the range holds.
+
+The rollups are kept current incrementally. After each committed booking
+change (``bookings_changed``), the rows of the (room, day) pairs it touched are
+recounted from their bookings, with one query on ``Booking`` and one on
+``ArchivedBooking`` however many pairs there are. ``manage.py backfill_utilization`` rebuilds them for
+existing history, a chunk of days at a time.
+"""
+from collections import defaultdict
+from datetime import datetime, time as dt_time, timedelta
+
+from django.db import transaction
+from django.db.models import Case, F, Q, Sum, Value, When
+from django.dispatch import receiver
+from django.utils import timezone
+
+from bookings.intervals import as_aware, overlap_q
+from bookings.models import ArchivedBooking, Booking
+from bookings.signals import bookings_changed
+from rooms.availability import SLOT_HOURS
+from rooms.models import DailyUtilization, HourlyUtilization, Room
+
+HOUR = timedelta(hours=1)
+BUSINESS_MINUTES = len(SLOT_HOURS) * 60
+GROUPS = ("room_type", "room", "day", "hour")
+MAX_DAYS = 366
+# Seats a room offers per slot, as ``Room.seat_limit``.
+SEATS = Case(When(room_type="SHARED", then=F("capacity")), default=Value(1))
+
+
+def business_hours(day):
+    """``(opening, closing)`` of a local day."""
+    opening = timezone.make_aware(datetime.combine(day, dt_time(SLOT_HOURS[0])))
+    return opening, opening + len(SLOT_HOURS) * HOUR
+
+
+def rollup(rows, first_day, last_day):
+    """
+    Hourly totals of ``(room_id, start_time, end_time)`` booking rows.
+
+    Only the business hours of the days from ``first_day`` to ``last_day`` are counted.
+
+    Returns:
+        dict: ``{(room_id, hour start): [seat_minutes, bookings starting in the hour]}``.
+    """
+    hours = defaultdict(lambda: [0, 0])
+    for room_id, start_time, end_time in rows:
+        day = max(timezone.localdate(start_time), first_day)
+        last = min(timezone.localdate(end_time), last_day)
+        while day <= last:
+            opening, closing = business_hours(day)
+            start, end = max(start_time, opening), min(end_time, closing)
+            hour = opening + (start - opening) // HOUR * HOUR
+            while hour < end:
+                hours[room_id, hour][0] += (min(end, hour + HOUR) - max(start, hour)) // timedelta(minutes=1)
+                hour += HOUR
+            if opening <= start_time < closing:
+                hours[room_id, opening + (start_time - opening) // HOUR * HOUR][1] += 1
+            day += timedelta(days=1)
+    return hours
+
+
+def recount(room_ids, first_day, last_day):
+    """
+    Rebuild the rollups of ``room_ids`` (every room when None) from ``first_day`` to ``last_day``.
+
+    Returns:
+        tuple: ``(bookings read, hourly rows written)``.
+    """
+    return recount_spans([(room_ids, first_day, last_day)])
+
+
+def recount_spans(spans):
+    """
+    ``recount()`` for several ``(room_ids, first_day, last_day)`` spans at once.
+
+    Spans must not share a (room, day) pair. Each table is read and written
+    once for all of them.
+
+    Returns:
+        tuple: ``(bookings read, hourly rows written)``.
+    """
+    reads, hours_q, days_q = Q(), Q(), Q()
+    for room_ids, first_day, last_day in spans:
+        opening, closing = business_hours(first_day)[0], business_hours(last_day)[1]
+        rooms = Q() if room_ids is None else Q(room_id__in=room_ids)
+        reads |= rooms & overlap_q(opening, closing)
+        hours_q |= rooms & Q(hour__gte=opening, hour__lt=closing)
+        days_q |= rooms & Q(day__gte=first_day, day__lte=last_day)
+    # Archived bookings are past ones (or cancelled), still counted for the days they were used.
+    rows = [
+        row
+        for model in (Booking, ArchivedBooking)
+        for row in model.objects.filter(reads, status="ACTIVE").values_list("room_id", "start_time", "end_time")
+    ]
+    if len(spans) == 1:
+        hours = rollup(rows, spans[0][1], spans[0][2])
+    else:
+        by_room = defaultdict(list)
+        for row in rows:
+            by_room[row[0]].append(row)
+        hours = {}
+        for room_ids, first_day, last_day in spans:
+            hours.update(rollup([row for room_id in room_ids for row in by_room[room_id]], first_day, last_day))
+
+    days = defaultdict(lambda: [0, 0])
+    for (room_id, hour), (seat_minutes, started) in hours.items():
+        totals = days[room_id, timezone.localdate(hour)]
+        totals[0] += seat_minutes
+        totals[1] += started
+
+    with transaction.atomic():
+        HourlyUtilization.objects.filter(hours_q).delete()
+        DailyUtilization.objects.filter(days_q).delete()
+        # Upserts: a concurrent recount of the same rooms and days may have written them meanwhile.
+        HourlyUtilization.objects.bulk_create(
+            (
+                HourlyUtilization(room_id=room_id, hour=hour, seat_minutes=seat_minutes, bookings=started)
+                for (room_id, hour), (seat_minutes, started) in hours.items()
+            ),
+            batch_size=1000, update_conflicts=True, unique_fields=["room", "hour"],
+            update_fields=["seat_minutes", "bookings"],
+        )
+        DailyUtilization.objects.bulk_create(
+            (
+                DailyUtilization(room_id=room_id, day=day, seat_minutes=seat_minutes, bookings=started)
+                for (room_id, day), (seat_minutes, started) in days.items()
+            ),
+            batch_size=1000, update_conflicts=True, unique_fields=["room", "day"],
+            update_fields=["seat_minutes", "bookings"],
+        )
+    return len(rows), len(hours)
+
+
+def refresh(bookings):
+    """Recount the rollups of the (room, day) pairs ``bookings`` cover, not every day between them."""
+    days = defaultdict(set)
+    for booking in bookings:
+        day, last = timezone.localdate(as_aware(booking.start_time)), timezone.localdate(as_aware(booking.end_time))
+        while day <= last:
+            days[booking.room_id].add(day)
+            day += timedelta(days=1)
+    # Runs of consecutive days per room; rooms with the same run share a span.
+    spans = defaultdict(set)
+    for room_id, room_days in days.items():
+        room_days = sorted(room_days)
+        first = room_days[0]
+        for previous, day in zip(room_days, room_days[1:] + [None]):
+            if day != previous + timedelta(days=1):
+                spans[first, previous].add(room_id)
+                first = day
+    if spans:
+        recount_spans([(room_ids, first, last) for (first, last), room_ids in spans.items()])
+
+
+@receiver(bookings_changed)
+def _bookings_changed(sender, bookings, **kwargs):
+    transaction.on_commit(lambda: refresh(bookings))
+
+
+def utilization(group_by, first_day, last_day, room_type=None):
+    """
+    Utilization from ``first_day`` to ``last_day`` (local dates, both included), per ``group_by``.
+
+    ``group_by`` is one of ``GROUPS``: ``hour`` is the hour of the day over
+    the whole range, ``room`` only lists rooms with booked time. Every room
+    counts as available for the whole range.
+
+    Returns:
+        list: ``{"key", "seat_minutes", "capacity_minutes", "bookings", "utilization"}`` dicts.
+    """
+    days = (last_day - first_day).days + 1
+    rooms = Room.objects.all()
+    daily = DailyUtilization.objects.filter(day__gte=first_day, day__lte=last_day)
+    if room_type:
+        rooms = rooms.filter(room_type=room_type)
+        daily = daily.filter(room__room_type=room_type)
+    totals = {"seat_minutes": Sum("seat_minutes"), "bookings": Sum("bookings")}
+
+    if group_by == "room_type":
+        seats = dict(rooms.values_list("room_type").annotate(seats=Sum(SEATS)).order_by("room_type"))
+        booked = {row.pop("room__room_type"): row for row in daily.values("room__room_type").annotate(**totals)}
+        return [_result(key, booked.get(key), seats[key] * BUSINESS_MINUTES * days) for key in seats]
+    if group_by == "room":
+        booked = daily.values("room_id", "room__room_number", "room__room_type", "room__capacity").annotate(**totals)
+        return [
+            _result(
+                row["room__room_number"], row,
+                (row["room__capacity"] if row["room__room_type"] == "SHARED" else 1) * BUSINESS_MINUTES * days,
+            )
+            for row in booked.order_by("room_id")
+        ]
+
+    seats = rooms.aggregate(seats=Sum(SEATS))["seats"] or 0
+    if group_by == "day":
+        booked = {row.pop("day"): row for row in daily.values("day").annotate(**totals)}
+        return [
+            _result(day.isoformat(), booked.get(day), seats * BUSINESS_MINUTES)
+            for day in (first_day + timedelta(days=n) for n in range(days))
+        ]
+    hourly = HourlyUtilization.objects.filter(
+        hour__gte=business_hours(first_day)[0], hour__lt=business_hours(last_day)[1],
+    )
+    if room_type:
+        hourly = hourly.filter(room__room_type=room_type)
+    # Summed per hour in the database (at most 10 rows a day), then folded into hours of the day here.
+    booked = defaultdict(lambda: {"seat_minutes": 0, "bookings": 0})
+    for row in hourly.values("hour").annotate(**totals):
+        of_day = booked[timezone.localtime(row["hour"]).hour]
+        of_day["seat_minutes"] += row["seat_minutes"]
+        of_day["bookings"] += row["bookings"]
+    return [_result(f"{hour:02d}:00", booked.get(hour), seats * 60 * days) for hour in SLOT_HOURS]
+
+
+def _result(key, booked, capacity_minutes):
+    seat_minutes = booked["seat_minutes"] if booked else 0
+    return {
+        "key": key,
+        "seat_minutes": seat_minutes,
+        "capacity_minutes": capacity_minutes,
+        "bookings": booked["bookings"] if booked else 0,
+        "utilization": round(seat_minutes / capacity_minutes, 4) if capacity_minutes else None,
+    }
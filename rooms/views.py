@@ -1,16 +1,67 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rooms.models import Room
-from bookings.models import Booking
-from rooms.serializers import RoomSerializer
+from rooms.availability import SLOT_HOURS, availability_grid, grid_slots
+from rooms.cache import (
+    acached_room_availability, aoccupied_rooms_snapshot, cache_stats, cached_room_availability, occupied_rooms_snapshot,
+)
+from rooms.occupancy import enabled as occupancy_enabled, room_availability_data
+from rooms.utilization import GROUPS, MAX_DAYS as UTILIZATION_MAX_DAYS, utilization
+from bookings.intervals import as_aware
+from bookings.services import parse_duration
 from datetime import datetime
 
-from django.utils.dateparse import parse_datetime
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_date, parse_datetime
+from roombooking.async_api import AsyncAPIView
 from roombooking.permissions import IsManagerOrAdmin
+from roombooking.versioning import conditional_on
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 
 
+def parse_availability_query(params):
+    """
+    Validate the ``room_type``, ``slot`` and ``duration`` query parameters of an availability check.
+
+    Returns:
+        tuple: ``(room_type, start_time, end_time, None)`` or ``(None, None, None, error message)``.
+    """
+    room_type = params.get('room_type')
+    slot = params.get('slot')
+    start_time = parse_datetime(slot) if slot else None
+
+    if room_type not in ["PRIVATE", "CONFERENCE", "SHARED"]:
+        return None, None, None, "Invalid room type. Must be one of: PRIVATE, CONFERENCE, SHARED"
+    if not start_time or not isinstance(start_time, datetime):
+        return None, None, None, "Invalid slot format. Use ISO 8601."
+    # Slots without an offset are read in the default time zone, as for bookings.
+    start_time = as_aware(start_time)
+    if start_time < timezone.now():
+        return None, None, None, "Slot is in the past."
+    if timezone.localtime(start_time).hour not in SLOT_HOURS:
+        return None, None, None, "Slot is not between 9am and 6pm."
+    duration, error = parse_duration(params.get('duration'))
+    if error:
+        return None, None, None, error
+    return room_type.upper(), start_time, start_time + duration, None
+
+
+def snapshot_response(request, snapshot):
+    """The snapshot's pre-rendered body, or 304 Not Modified when If-None-Match already names it."""
+    response = get_conditional_response(request, etag=snapshot["etag"])
+    if response is None:
+        response = HttpResponse(snapshot["body"], content_type="application/json")
+    response["ETag"] = snapshot["etag"]
+    # Pollers may keep the body but must revalidate it on every request.
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class GetRoomsView(APIView):
     """
@@ -19,6 +70,10 @@ class GetRoomsView(APIView):
     This endpoint returns a list of all rooms that are currently occupied at the present time.
     Only accessible by managers and administrators.
     
+    The list is served from a pre-rendered snapshot that only changes when a
+    booking starts, ends, or is created or cancelled around the present. It
+    carries an ETag, and a matching If-None-Match gets 304 Not Modified.
+    
     Returns:
         Response: A list of room objects with their details including:
             - room_number
@@ -29,21 +84,7 @@ class GetRoomsView(APIView):
     permission_classes = [IsManagerOrAdmin]
     
     def get(self, request):
-        current_time = datetime.now()
-        
- 
-        active_bookings = Booking.objects.filter(
-            start_time__lte=current_time,
-            end_time__gte=current_time,
-            status="ACTIVE"
-        )
-        
-        booked_rooms = Room.objects.filter(
-            id__in=active_bookings.values_list('room_id', flat=True)
-        )
-        
-        serializer = RoomSerializer(booked_rooms, many=True)
-        return Response(serializer.data)
+        return snapshot_response(request, occupied_rooms_snapshot(timezone.now()))
 
 
 
@@ -56,53 +97,190 @@ class RoomAvailabilityView(APIView):
     Query Parameters:
         room_type (str): Type of room to check (PRIVATE/CONFERENCE/SHARED)
         slot (str): ISO 8601 formatted datetime string (YYYY-MM-DDTHH:MM)
+        duration (int, optional): Minutes from ``slot``, a multiple of 15 up to 480 (default 60)
     
     Returns:
-        Response: A list of available rooms matching the criteria, including:
+        Response: A list of rooms with a free seat for the whole interval, including:
             - room_number
             - room_type
             - capacity
-            - status
+            - remaining (free seats left for the whole interval)
     
     Error Responses:
-        - 400: Invalid room type or slot format
+        - 400: Invalid room type, slot format or duration
         - 400: Slot is in the past
         - 400: Slot is outside business hours (9am-6pm)
     """
   
+    @conditional_on('bookings', 'rooms')
+    def get(self, request):
+        room_type, start_time, end_time, error = parse_availability_query(request.query_params)
+        if error:
+            return Response({"error": error}, status=400)
+        data = room_availability_data(room_type, start_time, end_time)
+        if data is None:
+            data = cached_room_availability(room_type, start_time, end_time)
+        return Response(data)
+
+
+class AsyncGetRoomsView(AsyncAPIView):
+    """
+    Async ``GetRoomsView`` for ASGI deployments, on the async cache and ORM APIs.
+    
+    Only accessible by managers and administrators.
+    """
+    manager_only = True
+
+    async def get(self, request):
+        return snapshot_response(request, await aoccupied_rooms_snapshot(timezone.now()))
+
+
+class AsyncRoomAvailabilityView(AsyncAPIView):
+    """
+    Async ``RoomAvailabilityView`` for ASGI deployments; same parameters, responses and errors.
+    """
+
+    @conditional_on('bookings', 'rooms')
+    async def get(self, request):
+        room_type, start_time, end_time, error = parse_availability_query(request.query_params)
+        if error:
+            return JsonResponse({"error": error}, status=400)
+        data = None
+        if occupancy_enabled():
+            # The index may need a (sync) rebuild; warm reads never touch the database.
+            data = await sync_to_async(room_availability_data)(room_type, start_time, end_time)
+        if data is None:
+            data = await acached_room_availability(room_type, start_time, end_time)
+        return JsonResponse(data, safe=False)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AvailabilityGridView(APIView):
+    """
+    API endpoint returning the room x slot availability matrix for a date range.
+    
+    Replaces one ``rooms/available`` call per slot: every slot of every day
+    in the range is answered from a single grouped query over bookings, and
+    the matrix is streamed one room per line.
+    
+    Query Parameters:
+        room_type (str, optional): PRIVATE/CONFERENCE/SHARED, or omitted/"all" for every type
+        start (str): First day, YYYY-MM-DD
+        end (str, optional): Last day, YYYY-MM-DD (default: start); at most 31 days after start
+    
+    Returns:
+        Response: {"slots": [slot start, ...],
+                   "rooms": [{"id", "room_number", "room_type", "capacity", "remaining": [int per slot]}, ...]}
+    
+    Error Responses:
+        - 400: Invalid room type or dates
+        - 400: Range longer than 31 days
+    """
+    max_days = 31
+
+    def get(self, request):
+        room_type = (request.query_params.get('room_type') or 'all').upper()
+        if room_type == 'ALL':
+            room_types = ["PRIVATE", "CONFERENCE", "SHARED"]
+        elif room_type in ["PRIVATE", "CONFERENCE", "SHARED"]:
+            room_types = [room_type]
+        else:
+            return Response({"error": "Invalid room type. Must be one of: PRIVATE, CONFERENCE, SHARED, all"}, status=400)
+
+        try:
+            start = parse_date(request.query_params.get('start') or '')
+            end = parse_date(request.query_params.get('end') or '') or start
+        except ValueError:
+            start = end = None
+        if not start or not end or end < start:
+            return Response({"error": "Invalid date range. Use start=YYYY-MM-DD and optionally end=YYYY-MM-DD."}, status=400)
+        if (end - start).days >= self.max_days:
+            return Response({"error": f"Date range is limited to {self.max_days} days."}, status=400)
+
+        slots = grid_slots(start, end)
+        response = StreamingHttpResponse(self.stream(room_types, slots), content_type='application/json')
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+    @staticmethod
+    def stream(room_types, slots):
+        dumps = json.JSONEncoder(separators=(',', ':')).encode
+        yield '{"slots":%s,"rooms":[' % dumps([slot.isoformat() for slot in slots])
+        separator = '\n'
+        for room, remaining in availability_grid(room_types, slots):
+            yield separator + dumps({
+                'id': room.id,
+                'room_number': room.room_number,
+                'room_type': room.room_type,
+                'capacity': room.capacity,
+                'remaining': remaining,
+            })
+            separator = ',\n'
+        yield '\n]}'
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AvailabilityCacheStatsView(APIView):
+    """
+    API endpoint exposing the availability cache hit/miss counters.
+    
+    Only accessible by managers and administrators.
+    
+    Returns:
+        Response: {"hits": int, "misses": int, "hit_rate": float or null}
+    """
+    permission_classes = [IsManagerOrAdmin]
+
     def get(self, request):
-        room_type = request.query_params.get('room_type')
-        slot = request.query_params.get('slot')
-        
-        
-        start_time = parse_datetime(slot) if slot else None
-        
-      
-        if room_type not in ["PRIVATE", "CONFERENCE", "SHARED"]:
+        return Response(cache_stats())
+
+
+class UtilizationView(APIView):
+    """
+    API endpoint reporting room utilization over a date range.
+    
+    Answered from the hourly/daily rollups (``rooms/utilization.py``), so the
+    cost depends on the rooms and days in the range, not on the number of
+    bookings. Utilization is booked seat-minutes over available seat-minutes
+    within business hours. Only accessible by managers and administrators.
+    
+    Query Parameters:
+        start (str): First day, YYYY-MM-DD
+        end (str, optional): Last day, YYYY-MM-DD (default: start); at most 366 days after start
+        group_by (str, optional): room_type (default), room, day, or hour (of the day)
+        room_type (str, optional): PRIVATE/CONFERENCE/SHARED to only count those rooms
+    
+    Returns:
+        Response: {"start", "end", "group_by", "room_type",
+                   "results": [{"key", "seat_minutes", "capacity_minutes", "bookings", "utilization"}, ...]}
+    
+    Error Responses:
+        - 400: Invalid dates, range, group_by or room type
+    """
+    permission_classes = [IsManagerOrAdmin]
+
+    def get(self, request):
+        params = request.query_params
+        group_by = params.get('group_by') or 'room_type'
+        if group_by not in GROUPS:
+            return Response({"error": f"Invalid group_by. Must be one of: {', '.join(GROUPS)}"}, status=400)
+        room_type = (params.get('room_type') or '').upper() or None
+        if room_type and room_type not in ["PRIVATE", "CONFERENCE", "SHARED"]:
             return Response({"error": "Invalid room type. Must be one of: PRIVATE, CONFERENCE, SHARED"}, status=400)
-        
-    
-        if not start_time or not isinstance(start_time, datetime):
-            return Response({"error": "Invalid slot format. Use ISO 8601."}, status=400)
-        
- 
-        if start_time < datetime.now():
-            return Response({"error": "Slot is in the past."}, status=400)
-        
-        if start_time.hour < 9 or start_time.hour > 18:
-            return Response({"error": "Slot is not between 9am and 6pm."}, status=400)
-        
-
-        
-        room_type = room_type.upper()
-        available_rooms = []
-        for room in Room.objects.filter(room_type=room_type):
-            if room_type == "SHARED":
-                current_bookings = Booking.objects.filter(room=room, start_time=start_time, status="ACTIVE").count()
-                if current_bookings < room.capacity:
-                    available_rooms.append(room)
-            else:
-                if not Booking.objects.filter(room=room, start_time=start_time, status="ACTIVE").exists():
-                    available_rooms.append(room)
-        serializer = RoomSerializer(available_rooms, many=True)
-        return Response(serializer.data)
+        try:
+            start = parse_date(params.get('start') or '')
+            end = parse_date(params.get('end') or '') or start
+        except ValueError:
+            start = end = None
+        if not start or not end or end < start:
+            return Response({"error": "Invalid date range. Use start=YYYY-MM-DD and optionally end=YYYY-MM-DD."}, status=400)
+        if (end - start).days >= UTILIZATION_MAX_DAYS:
+            return Response({"error": f"Date range is limited to {UTILIZATION_MAX_DAYS} days."}, status=400)
+
+        return Response({
+            "start": start,
+            "end": end,
+            "group_by": group_by,
+            "room_type": room_type,
+            "results": utilization(group_by, start, end, room_type),
+        })
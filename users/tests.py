@@ -1,3 +1,65 @@
-from django.test import TestCase
+from unittest import mock
 
+from django.contrib.auth.models import User as AuthUser
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
 
+from users.models import User
+
+
+class UsersListingTests(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(AuthUser.objects.create_user("manager", password="manager"))
+        User.objects.bulk_create(User(name=f"user{i}", age=20 + i) for i in range(23))
+
+    def test_cursor_pagination_by_id(self):
+        ids = []
+        response = self.client.get("/api/v1/users/", {"cursor": "", "page_size": 10})
+        while True:
+            ids += [row["id"] for row in response.data["results"]]
+            if not response.data["next"]:
+                break
+            response = self.client.get(response.data["next"])
+        self.assertEqual(ids, list(User.objects.order_by("-id").values_list("id", flat=True)))
+
+    def test_page_number_pagination_is_the_default(self):
+        response = self.client.get("/api/v1/users/")
+        self.assertEqual(response.data["count"], 23)
+        self.assertEqual(len(response.data["results"]), 10)
+
+
+class CachedTokenAuthenticationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.manager = AuthUser.objects.create_user("manager", password="manager")
+        self.token = Token.objects.create(user=self.manager)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_warm_requests_skip_the_token_query(self):
+        self.assertEqual(self.client.get("/api/v1/rooms/").status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get("/api/v1/rooms/").status_code, 200)
+
+    def test_deleted_token_is_rejected(self):
+        self.client.get("/api/v1/rooms/")
+        self.token.delete()
+        response = self.client.get("/api/v1/rooms/")
+        self.assertEqual((response.status_code, response.data["detail"]), (401, "Invalid token."))
+
+    def test_user_changes_are_seen(self):
+        self.client.get("/api/v1/rooms/")
+        self.manager.username = "guest"
+        self.manager.save()
+        self.assertEqual(self.client.get("/api/v1/rooms/").status_code, 403)
+
+        self.manager.is_active = False
+        self.manager.save()
+        self.assertEqual(self.client.get("/api/v1/rooms/").status_code, 401)
+
+    def test_other_processes_see_invalidations(self):
+        self.client.get("/api/v1/rooms/")
+        # Another worker deleting the token only reaches this one through the shared counter.
+        with mock.patch("roombooking.authentication.token_cache.clear"):
+            self.token.delete()
+        self.assertEqual(self.client.get("/api/v1/rooms/").status_code, 401)
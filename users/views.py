@@ -4,7 +4,8 @@ from rest_framework import status
 from users.models import User
 from users.serializers import UserSerializer
 from roombooking.permissions import IsManagerOrAdmin
-from roombooking.utils import StandardResultsSetPagination
+from roombooking.utils import StandardResultsSetPagination, KeysetPagination
+from roombooking.versioning import conditional_on
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 
@@ -18,6 +19,7 @@ class UsersView(APIView):
     permission_classes = [IsManagerOrAdmin]
     pagination_class = StandardResultsSetPagination
     
+    @conditional_on('users')
     def get(self, request):
         """
         Retrieve a paginated list of all users.
@@ -26,9 +28,14 @@ class UsersView(APIView):
         Query Parameters:
             page: Page number (default: 1)
             page_size: Number of items per page (default: 10, max: 100)
+            cursor: Switch to cursor pagination keyed on id; send it empty for
+                the first page and follow the ``next`` link afterwards
         """
         queryset = User.objects.all().order_by('-id')
-        paginator = self.pagination_class()
+        if KeysetPagination.requested(request):
+            paginator = KeysetPagination(('-id',))
+        else:
+            paginator = self.pagination_class()
         page = paginator.paginate_queryset(queryset, request)
         serializer = UserSerializer(page, many=True)
         return paginator.get_paginated_response(serializer.data)